@@ -0,0 +1,111 @@
+from ninja import Router
+from ninja.pagination import paginate
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from typing import List, Optional
+from apps.auth.schemas import ErrorResponse
+from apps.sensors.auth import AuthBearer
+from apps.sensors.models import Sensor
+from apps.sensors.pagination import CursorPagination
+from .models import Alert, AlertRule
+from .schemas import AlertOut, AlertRuleCreate, AlertRuleOut, AlertRuleUpdate
+
+router = Router()
+auth = AuthBearer()
+
+ALERT_FIELDS = [
+    "id",
+    "rule_id",
+    "sensor_id",
+    "started_at",
+    "last_at",
+    "ended_at",
+    "readings",
+    "peak",
+]
+
+
+def rule_error(rule: AlertRule) -> Optional[str]:
+    """Return why ``rule`` cannot be evaluated, or None"""
+    if rule.kind == AlertRule.THRESHOLD:
+        if rule.lower is None and rule.upper is None:
+            return "A threshold rule needs lower, upper or both"
+        if (
+            rule.lower is not None
+            and rule.upper is not None
+            and rule.lower > rule.upper
+        ):
+            return "lower must not be greater than upper"
+    elif rule.limit is None:
+        return f"A {rule.kind} rule needs a limit"
+    if rule.window > settings.ALERTS_MAX_WINDOW:
+        return f"window must be at most {settings.ALERTS_MAX_WINDOW}"
+    return None
+
+
+@router.get("/rules/", response=List[AlertRuleOut], auth=auth)
+def list_rules(request, sensor_id: Optional[int] = None):
+    """List alert rules of your sensors"""
+    rules = AlertRule.objects.filter(sensor__owner=request.auth)
+    if sensor_id is not None:
+        rules = rules.filter(sensor_id=sensor_id)
+    return list(rules)
+
+
+@router.post("/rules/", response={201: AlertRuleOut, 400: ErrorResponse}, auth=auth)
+def create_rule(request, data: AlertRuleCreate):
+    """Create an alert rule, checked against every reading of the sensor from now on"""
+    sensor = get_object_or_404(Sensor, id=data.sensor_id, owner=request.auth)
+    rule = AlertRule(sensor=sensor, **data.dict(exclude={"sensor_id"}))
+    error = rule_error(rule)
+    if error:
+        return 400, {"detail": error}
+    rule.save()
+    return 201, rule
+
+
+@router.put(
+    "/rules/{rule_id}/", response={200: AlertRuleOut, 400: ErrorResponse}, auth=auth
+)
+def update_rule(request, rule_id: int, data: AlertRuleUpdate):
+    """Update an alert rule"""
+    rule = get_object_or_404(AlertRule, id=rule_id, sensor__owner=request.auth)
+
+    for key, value in data.dict(exclude_unset=True).items():
+        setattr(rule, key, value)
+
+    error = rule_error(rule)
+    if error:
+        return 400, {"detail": error}
+    rule.save()
+    return 200, rule
+
+
+@router.delete("/rules/{rule_id}/", response={204: None}, auth=auth)
+def delete_rule(request, rule_id: int):
+    """Delete an alert rule and its alerts"""
+    rule = get_object_or_404(AlertRule, id=rule_id, sensor__owner=request.auth)
+    rule.delete()
+    return 204, None
+
+
+@router.get("/", response=List[AlertOut], auth=auth)
+@paginate(
+    CursorPagination,
+    field="started_at",
+    page_size=settings.ALERTS_PAGE_SIZE,
+    max_page_size=settings.ALERTS_MAX_PAGE_SIZE,
+)
+def list_alerts(request, sensor_id: Optional[int] = None, open: Optional[bool] = None):
+    """
+    List alerts of your sensors, newest first
+
+    ``open=true`` keeps the alerts whose rule is still broken, ``open=false``
+    those that have ended.
+    """
+    alerts = Alert.objects.filter(sensor__owner=request.auth)
+    if sensor_id is not None:
+        alerts = alerts.filter(sensor_id=sensor_id)
+    if open is not None:
+        alerts = alerts.filter(ended_at__isnull=open)
+    return alerts.values(*ALERT_FIELDS)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class AlertsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.alerts"
+
+    def ready(self):
+        from . import receivers  # noqa: F401
@@ -0,0 +1,352 @@
+"""
+Incremental evaluation of alert rules as readings are written.
+
+``readings_created`` hands every batch of new readings to ``evaluate``. For
+each sensor with enabled rules it locks the sensor's ``AlertWindow``, drops
+readings at or before the last one evaluated, and checks the rest against
+every rule of the sensor with array operations over the whole batch:
+
+- ``threshold``: the value is below ``lower`` or above ``upper``.
+- ``rate``: the change from the previous reading, per minute, is larger
+  than ``limit`` in either direction.
+- ``zscore``: the value is more than ``limit`` standard deviations from the
+  mean of the previous ``window`` readings. The rule fires only once that
+  many readings are known.
+
+Consecutive readings breaking a rule extend its open ``Alert``; the first
+reading that satisfies the rule again closes it. Readings a rule cannot
+score (NaN) decide nothing and leave its alert as it is. Editing or
+disabling a rule closes its open alert. Afterwards the window keeps
+the last ``max(window)`` values of each metric in a ring buffer, so a batch
+costs time in proportion to its readings and the window, never to the
+sensor's history. Readings older than the last evaluated one (backfills,
+imports of history) are not evaluated.
+"""
+
+import time
+from collections import defaultdict
+from datetime import datetime
+from operator import attrgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from apps.auth.cache import TTLCache
+from apps.readings.models import Reading
+
+from .models import Alert, AlertRule, AlertWindow
+
+METRICS = ("temperature", "humidity")
+SENSORS_KEY = "sensor_ids"
+
+# Sensors with enabled rules, so that readings of other sensors cost nothing
+_rule_cache = TTLCache(1)
+
+
+class RingBuffer:
+    """A fixed-capacity float64 buffer that overwrites its oldest values"""
+
+    def __init__(self, capacity: int, values: Iterable[float] = ()):
+        self.capacity = max(capacity, 1)
+        self._data = np.empty(self.capacity)
+        self._head = 0  # where the next value goes
+        self._size = 0
+        self.extend(np.asarray(values, dtype=np.float64))
+
+    @classmethod
+    def frombytes(cls, data: bytes, capacity: int) -> "RingBuffer":
+        return cls(capacity, np.frombuffer(data, dtype=np.float64))
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, values: np.ndarray):
+        values = values[-self.capacity :]
+        end = self._head + len(values)
+        if end <= self.capacity:
+            self._data[self._head : end] = values
+        else:
+            split = self.capacity - self._head
+            self._data[self._head :] = values[:split]
+            self._data[: end - self.capacity] = values[split:]
+        self._head = end % self.capacity
+        self._size = min(self._size + len(values), self.capacity)
+
+    def values(self) -> np.ndarray:
+        """The contents from oldest to newest"""
+        if self._size < self.capacity:
+            return self._data[: self._size].copy()
+        return np.concatenate((self._data[self._head :], self._data[: self._head]))
+
+    def tobytes(self) -> bytes:
+        return self.values().tobytes()
+
+
+def rule_sensor_ids() -> frozenset:
+    """Ids of sensors with enabled rules, cached for ``ALERTS_RULES_TTL``"""
+    sensor_ids = _rule_cache.get(SENSORS_KEY)
+    if sensor_ids is None:
+        sensor_ids = frozenset(
+            AlertRule.objects.filter(enabled=True)
+            .values_list("sensor_id", flat=True)
+            .distinct()
+        )
+        _rule_cache.set(
+            SENSORS_KEY, sensor_ids, time.time() + settings.ALERTS_RULES_TTL
+        )
+    return sensor_ids
+
+
+def invalidate_rules():
+    _rule_cache.delete(SENSORS_KEY)
+
+
+def window_capacity(rules: Iterable[AlertRule]) -> int:
+    """Values per metric the rules look back on; rate rules need the last one"""
+    return max(
+        (rule.window for rule in rules if rule.kind == AlertRule.ZSCORE), default=1
+    )
+
+
+def seed_window(sensor_id: int, before: Optional[datetime] = None) -> AlertWindow:
+    """
+    Create the window of a sensor that just got its first rule from its
+    latest readings (those older than ``before``, if given), so that
+    z-scores do not wait for a full new window.
+    """
+    capacity = window_capacity(AlertRule.objects.filter(sensor_id=sensor_id))
+    readings = Reading.objects.filter(sensor_id=sensor_id)
+    if before is not None:
+        readings = readings.filter(timestamp__lt=before)
+    latest = list(
+        readings.order_by("-timestamp").values_list("timestamp", *METRICS)[:capacity]
+    )[::-1]
+    window, _ = AlertWindow.objects.get_or_create(
+        sensor_id=sensor_id,
+        defaults={
+            "last_timestamp": latest[-1][0] if latest else None,
+            **{
+                metric: np.array(
+                    [row[1 + i] for row in latest], dtype=np.float64
+                ).tobytes()
+                for i, metric in enumerate(METRICS)
+            },
+        },
+    )
+    return window
+
+
+def close_alerts(rule: AlertRule):
+    """
+    End the open alert of a rule that was edited or disabled, at the last
+    reading checked against its old definition.
+    """
+    with transaction.atomic():
+        # Taken before a concurrent ``evaluate`` can load the open alert
+        last = (
+            AlertWindow.objects.select_for_update()
+            .filter(sensor_id=rule.sensor_id)
+            .values_list("last_timestamp", flat=True)
+            .first()
+        )
+        Alert.objects.filter(rule=rule, ended_at__isnull=True).update(
+            ended_at=F("last_at") if last is None else last
+        )
+
+
+def threshold_scores(rule, values, seconds, history, last_seconds) -> np.ndarray:
+    return values
+
+
+def rate_scores(rule, values, seconds, history, last_seconds) -> np.ndarray:
+    """Change per minute since the previous reading; NaN without one"""
+    previous = np.concatenate((history[-1:] if len(history) else [np.nan], values[:-1]))
+    previous_seconds = np.concatenate(([last_seconds], seconds[:-1]))
+    return (values - previous) / (seconds - previous_seconds) * 60
+
+
+def zscore_scores(rule, values, seconds, history, last_seconds) -> np.ndarray:
+    """
+    Z-score of each value against the ``rule.window`` values before it, from
+    running sums; NaN while fewer are known or when they are all equal.
+    """
+    window = rule.window
+    full = np.concatenate((history, values))
+    # Centering keeps the running sums of squares from losing precision
+    centered = full - full.mean()
+    sums = np.concatenate(([0.0], np.cumsum(centered)))
+    squares = np.concatenate(([0.0], np.cumsum(centered**2)))
+    positions = len(history) + np.arange(len(values))
+    starts = np.maximum(positions - window, 0)
+    mean = (sums[positions] - sums[starts]) / window
+    std = np.sqrt(
+        np.maximum((squares[positions] - squares[starts]) / window - mean**2, 0)
+    )
+    ready = (positions >= window) & (std > 1e-9)
+    scores = np.full(len(values), np.nan)
+    scores[ready] = (centered[positions][ready] - mean[ready]) / std[ready]
+    return scores
+
+
+SCORES = {
+    AlertRule.THRESHOLD: threshold_scores,
+    AlertRule.RATE: rate_scores,
+    AlertRule.ZSCORE: zscore_scores,
+}
+
+
+def excess(rule: AlertRule, scores: np.ndarray) -> np.ndarray:
+    """How far each score is past the rule's limit; positive breaks the rule"""
+    if rule.kind == AlertRule.THRESHOLD:
+        below = rule.lower - scores if rule.lower is not None else -np.inf
+        above = scores - rule.upper if rule.upper is not None else -np.inf
+        return np.maximum(below, above)
+    return np.abs(scores) - rule.limit
+
+
+def runs(broken: np.ndarray) -> Iterator[Tuple[int, int]]:
+    """``(start, stop)`` of every stretch of consecutive ``True`` values"""
+    edges = np.diff(np.concatenate(([0], broken.astype(np.int8), [0])))
+    return zip(
+        np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()
+    )
+
+
+def track_alerts(
+    rule: AlertRule,
+    open_alert: Optional[Alert],
+    scores: np.ndarray,
+    timestamps: List[datetime],
+) -> Tuple[List[Alert], List[Alert]]:
+    """Return the alerts to create and the existing alerts that changed"""
+    # NaN scores neither break nor satisfy the rule: skip those readings
+    decided = ~np.isnan(scores)
+    if not decided.all():
+        scores = scores[decided]
+        timestamps = [ts for ts, keep in zip(timestamps, decided) if keep]
+        if not timestamps:
+            return [], []
+    with np.errstate(invalid="ignore"):
+        past = excess(rule, scores)
+    broken = past > 0
+    created, changed = [], []
+    if open_alert is not None and not broken[0]:
+        open_alert.ended_at = timestamps[0]
+        changed.append(open_alert)
+
+    for start, stop in runs(broken):
+        peak = start + int(np.argmax(past[start:stop]))
+        if start == 0 and open_alert is not None:
+            alert = open_alert
+            alert.readings += stop - start
+            alert.last_at = timestamps[stop - 1]
+            if past[peak] > excess(rule, np.array([alert.peak]))[0]:
+                alert.peak = float(scores[peak])
+            changed.append(alert)
+        else:
+            alert = Alert(
+                rule=rule,
+                sensor_id=rule.sensor_id,
+                started_at=timestamps[start],
+                last_at=timestamps[stop - 1],
+                readings=stop - start,
+                peak=float(scores[peak]),
+            )
+            created.append(alert)
+        if stop < len(timestamps):
+            alert.ended_at = timestamps[stop]
+    return created, changed
+
+
+def evaluate_window(
+    window: AlertWindow,
+    rules: List[AlertRule],
+    readings: List[Reading],
+    open_alerts: Dict[int, Alert],
+) -> Tuple[List[Alert], List[Alert]]:
+    """Check one sensor's new readings and move its window past them"""
+    last = window.last_timestamp
+    readings = sorted(
+        (reading for reading in readings if last is None or reading.timestamp > last),
+        key=attrgetter("timestamp"),
+    )
+    if not readings:
+        return [], []
+
+    timestamps = [reading.timestamp for reading in readings]
+    seconds = np.array([timestamp.timestamp() for timestamp in timestamps])
+    last_seconds = last.timestamp() if last is not None else np.nan
+    capacity = window_capacity(rules)
+    created, changed = [], []
+    for metric in METRICS:
+        ring = RingBuffer.frombytes(bytes(getattr(window, metric)), capacity)
+        history = ring.values()
+        values = np.array([getattr(reading, metric) for reading in readings])
+        for rule in rules:
+            if rule.metric != metric:
+                continue
+            with np.errstate(divide="ignore", invalid="ignore"):
+                scores = SCORES[rule.kind](rule, values, seconds, history, last_seconds)
+            new, updated = track_alerts(
+                rule, open_alerts.get(rule.id), scores, timestamps
+            )
+            created += new
+            changed += updated
+        ring.extend(values)
+        setattr(window, metric, ring.tobytes())
+    window.last_timestamp = timestamps[-1]
+    return created, changed
+
+
+def evaluate(readings: Iterable[Reading]):
+    """
+    Evaluate the rules of the sensors among ``readings``. Must run inside
+    the transaction that wrote them, which ``readings_created`` guarantees.
+    """
+    sensor_ids = rule_sensor_ids()
+    if not sensor_ids:
+        return
+    by_sensor = defaultdict(list)
+    for reading in readings:
+        if reading.sensor_id in sensor_ids:
+            by_sensor[reading.sensor_id].append(reading)
+    if not by_sensor:
+        return
+
+    # Concurrent batches of one sensor take turns on its window
+    windows = AlertWindow.objects.select_for_update().order_by("sensor_id")
+    locked = list(windows.filter(sensor_id__in=by_sensor))
+    missing = by_sensor.keys() - {window.sensor_id for window in locked}
+    if missing:
+        # Rules created before alerting was enabled, or windows lost
+        for sensor_id in missing:
+            first = min(reading.timestamp for reading in by_sensor[sensor_id])
+            seed_window(sensor_id, before=first)
+        locked = list(windows.filter(sensor_id__in=by_sensor))
+    windows = locked
+    rules = defaultdict(list)
+    for rule in AlertRule.objects.filter(sensor_id__in=by_sensor, enabled=True):
+        rules[rule.sensor_id].append(rule)
+    open_alerts = {
+        alert.rule_id: alert
+        for alert in Alert.objects.filter(
+            sensor_id__in=by_sensor, ended_at__isnull=True
+        )
+    }
+
+    created, changed = [], []
+    for window in windows:
+        new, updated = evaluate_window(
+            window, rules[window.sensor_id], by_sensor[window.sensor_id], open_alerts
+        )
+        created += new
+        changed += updated
+
+    AlertWindow.objects.bulk_update(windows, ["last_timestamp", *METRICS])
+    if created:
+        Alert.objects.bulk_create(created)
+    if changed:
+        Alert.objects.bulk_update(changed, ["last_at", "ended_at", "readings", "peak"])
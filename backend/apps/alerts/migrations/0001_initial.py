@@ -0,0 +1,139 @@
+# Generated by Django 4.2.11 on 2026-10-18 16:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("sensors", "0004_sensor_search_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AlertWindow",
+            fields=[
+                (
+                    "sensor",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="alert_window",
+                        serialize=False,
+                        to="sensors.sensor",
+                    ),
+                ),
+                ("last_timestamp", models.DateTimeField(blank=True, null=True)),
+                ("temperature", models.BinaryField(default=b"")),
+                ("humidity", models.BinaryField(default=b"")),
+            ],
+        ),
+        migrations.CreateModel(
+            name="AlertRule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("threshold", "Value outside [lower, upper]"),
+                            ("rate", "Change per minute beyond limit"),
+                            (
+                                "zscore",
+                                "Z-score against the previous window readings beyond limit",
+                            ),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                (
+                    "metric",
+                    models.CharField(
+                        choices=[
+                            ("temperature", "Temperature"),
+                            ("humidity", "Humidity"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("lower", models.FloatField(blank=True, null=True)),
+                ("upper", models.FloatField(blank=True, null=True)),
+                ("limit", models.FloatField(blank=True, null=True)),
+                ("window", models.PositiveIntegerField(default=60)),
+                ("enabled", models.BooleanField(default=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "sensor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="alert_rules",
+                        to="sensors.sensor",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="Alert",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("started_at", models.DateTimeField()),
+                ("last_at", models.DateTimeField()),
+                ("ended_at", models.DateTimeField(blank=True, null=True)),
+                ("readings", models.PositiveIntegerField()),
+                ("peak", models.FloatField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "rule",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="alerts",
+                        to="alerts.alertrule",
+                    ),
+                ),
+                (
+                    "sensor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="alerts",
+                        to="sensors.sensor",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-started_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["sensor", "started_at", "id"],
+                        name="alerts_aler_sensor__db3147_idx",
+                    ),
+                    models.Index(
+                        condition=models.Q(("ended_at__isnull", True)),
+                        fields=["rule"],
+                        name="alerts_alert_open_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
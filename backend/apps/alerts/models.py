@@ -0,0 +1,87 @@
+from django.db import models
+from apps.sensors.models import Sensor
+
+
+class AlertRule(models.Model):
+    """A condition on one metric of a sensor, checked as readings arrive"""
+
+    THRESHOLD = "threshold"
+    RATE = "rate"
+    ZSCORE = "zscore"
+    KIND_CHOICES = [
+        (THRESHOLD, "Value outside [lower, upper]"),
+        (RATE, "Change per minute beyond limit"),
+        (ZSCORE, "Z-score against the previous window readings beyond limit"),
+    ]
+    METRIC_CHOICES = [("temperature", "Temperature"), ("humidity", "Humidity")]
+
+    sensor = models.ForeignKey(
+        Sensor, on_delete=models.CASCADE, related_name="alert_rules"
+    )
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    metric = models.CharField(max_length=16, choices=METRIC_CHOICES)
+    # Threshold bounds; either may be left open
+    lower = models.FloatField(blank=True, null=True)
+    upper = models.FloatField(blank=True, null=True)
+    # Largest allowed absolute change per minute or absolute z-score
+    limit = models.FloatField(blank=True, null=True)
+    # Previous readings a z-score is computed against
+    window = models.PositiveIntegerField(default=60)
+    enabled = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.sensor_id} {self.metric} {self.kind}"
+
+
+class Alert(models.Model):
+    """
+    One episode of a rule being broken: consecutive readings that break it,
+    open until a reading satisfies the rule again.
+    """
+
+    rule = models.ForeignKey(AlertRule, on_delete=models.CASCADE, related_name="alerts")
+    sensor = models.ForeignKey(Sensor, on_delete=models.CASCADE, related_name="alerts")
+    started_at = models.DateTimeField()
+    last_at = models.DateTimeField()
+    # Timestamp of the first reading back within the rule; null while open
+    ended_at = models.DateTimeField(blank=True, null=True)
+    readings = models.PositiveIntegerField()
+    # Value, rate or z-score of the reading furthest past the rule's limit
+    peak = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-started_at"]
+        indexes = [
+            models.Index(fields=["sensor", "started_at", "id"]),
+            models.Index(
+                fields=["rule"],
+                condition=models.Q(ended_at__isnull=True),
+                name="alerts_alert_open_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.rule} from {self.started_at}"
+
+
+class AlertWindow(models.Model):
+    """
+    The most recent readings of a sensor that its rate and z-score rules
+    compare new readings with, kept as float64 ring buffer contents in
+    chronological order so that evaluation never reads readings history.
+    """
+
+    sensor = models.OneToOneField(
+        Sensor, on_delete=models.CASCADE, primary_key=True, related_name="alert_window"
+    )
+    last_timestamp = models.DateTimeField(blank=True, null=True)
+    temperature = models.BinaryField(default=b"")
+    humidity = models.BinaryField(default=b"")
+
+    def __str__(self):
+        return f"{self.sensor_id} until {self.last_timestamp}"
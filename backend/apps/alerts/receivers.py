@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.readings.models import Reading
+from apps.readings.signals import readings_created
+
+from .evaluation import close_alerts, evaluate, invalidate_rules, seed_window
+from .models import AlertRule
+
+
+@receiver(readings_created, sender=Reading)
+def evaluate_alert_rules(sender, readings, replaced, **kwargs):
+    if settings.ALERTS_ENABLED:
+        evaluate(readings)
+
+
+@receiver(post_save, sender=AlertRule)
+def track_rule(sender, instance, created, **kwargs):
+    invalidate_rules()
+    if created:
+        seed_window(instance.sensor_id)
+    else:
+        close_alerts(instance)
+
+
+@receiver(post_delete, sender=AlertRule)
+def forget_rule(sender, instance, **kwargs):
+    invalidate_rules()
@@ -0,0 +1,71 @@
+from pydantic import BaseModel, Field, ConfigDict, field_validator
+from datetime import datetime
+from typing import Literal, Optional
+
+Kind = Literal["threshold", "rate", "zscore"]
+Metric = Literal["temperature", "humidity"]
+
+
+class AlertRuleCreate(BaseModel):
+    sensor_id: int
+    kind: Kind
+    metric: Metric
+    lower: Optional[float] = Field(None, description="threshold: lowest allowed value")
+    upper: Optional[float] = Field(None, description="threshold: highest allowed value")
+    limit: Optional[float] = Field(
+        None,
+        gt=0,
+        description="rate: largest allowed change per minute; zscore: largest allowed absolute z-score",
+    )
+    window: int = Field(
+        60, ge=2, description="zscore: previous readings to compare with"
+    )
+    enabled: bool = True
+
+
+class AlertRuleUpdate(BaseModel):
+    kind: Optional[Kind] = None
+    metric: Optional[Metric] = None
+    lower: Optional[float] = None
+    upper: Optional[float] = None
+    limit: Optional[float] = Field(None, gt=0)
+    window: Optional[int] = Field(None, ge=2)
+    enabled: Optional[bool] = None
+
+    @field_validator("kind", "metric", "window", "enabled")
+    @classmethod
+    def not_null(cls, value):
+        # Defaults are not validated, so this only rejects an explicit null
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+
+class AlertRuleOut(BaseModel):
+    id: int
+    sensor_id: int
+    kind: str
+    metric: str
+    lower: Optional[float] = None
+    upper: Optional[float] = None
+    limit: Optional[float] = None
+    window: int
+    enabled: bool
+    created_at: datetime
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AlertOut(BaseModel):
+    id: int
+    rule_id: int
+    sensor_id: int
+    started_at: datetime
+    last_at: datetime
+    ended_at: Optional[datetime] = Field(
+        None, description="Null while the alert is open"
+    )
+    readings: int = Field(..., description="Consecutive readings that broke the rule")
+    peak: float = Field(
+        ..., description="Value, rate or z-score of the reading furthest past the limit"
+    )
+    model_config = ConfigDict(from_attributes=True)
@@ -5,3 +5,6 @@ class CustomAuthConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.auth"
     label = "custom_auth"  # This gives it a unique label to avoid conflict with django.contrib.auth
+
+    def ready(self):
+        from . import receivers  # noqa: F401
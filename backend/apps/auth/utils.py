@@ -1,10 +1,20 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from .cache import TTLCache
 
 User = get_user_model()
 
+# Fields loaded for authenticated users; anything else is deferred
+USER_CACHE_FIELDS = ("id", "email", "username")
+
+token_cache = TTLCache(settings.AUTH_TOKEN_CACHE_SIZE)
+user_cache = TTLCache(settings.AUTH_USER_CACHE_SIZE)
+
 
 def create_token(user_id: int) -> str:
     payload = {
@@ -14,21 +24,84 @@ def create_token(user_id: int) -> str:
     return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
 
 
-def decode_token(token: str):
+def decode_payload(token: str):
     try:
-        payload = jwt.decode(
+        return jwt.decode(
             token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
         )
-        return payload.get("user_id")
     except JWTError:
         return None
 
 
-def get_user_from_token(token: str):
-    user_id = decode_token(token)
-    if user_id:
-        try:
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return None
+def decode_token(token: str):
+    payload = decode_payload(token)
+    if payload:
+        return payload.get("user_id")
     return None
+
+
+def get_cached_user(user_id: int):
+    """
+    Return a ``User`` with only ``USER_CACHE_FIELDS`` loaded, served from the
+    per-process user cache when possible.
+    """
+    values = user_cache.get(user_id)
+    if values is None:
+        values = User.objects.filter(id=user_id).values_list(*USER_CACHE_FIELDS).first()
+        if values is None:
+            return None
+        user_cache.set(user_id, values, time.time() + settings.AUTH_USER_CACHE_TTL)
+    return User.from_db(DEFAULT_DB_ALIAS, USER_CACHE_FIELDS, values)
+
+
+async def aget_cached_user(user_id: int):
+    """Async version of ``get_cached_user`` using the async ORM on a cache miss"""
+    values = user_cache.get(user_id)
+    if values is None:
+        values = (
+            await User.objects.filter(id=user_id)
+            .values_list(*USER_CACHE_FIELDS)
+            .afirst()
+        )
+        if values is None:
+            return None
+        user_cache.set(user_id, values, time.time() + settings.AUTH_USER_CACHE_TTL)
+    return User.from_db(DEFAULT_DB_ALIAS, USER_CACHE_FIELDS, values)
+
+
+def _token_user_id(token: str):
+    key = hashlib.sha256(token.encode()).hexdigest()
+    user_id = token_cache.get(key)
+    if user_id is None:
+        payload = decode_payload(token)
+        user_id = payload and payload.get("user_id")
+        if not user_id:
+            return None
+        expires_at = payload.get("exp", time.time() + settings.AUTH_USER_CACHE_TTL)
+        token_cache.set(key, user_id, expires_at)
+    return user_id
+
+
+def get_user_from_token(token: str):
+    """
+    Resolve a bearer token to a user.
+
+    Verified tokens are cached by their SHA-256 digest until they expire, so
+    repeated requests skip both signature verification and the user query.
+    """
+    user_id = _token_user_id(token)
+    return user_id and get_cached_user(user_id)
+
+
+async def aget_user_from_token(token: str):
+    """Async version of ``get_user_from_token``"""
+    user_id = _token_user_id(token)
+    return user_id and await aget_cached_user(user_id)
+
+
+def invalidate_user(user_id: int):
+    user_cache.delete(user_id)
+
+
+def cache_stats() -> dict:
+    return {"token": token_cache.stats(), "user": user_cache.stats()}
@@ -0,0 +1,152 @@
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from ninja import Router
+
+from apps.auth.utils import cache_stats
+from apps.readings import stream
+from apps.readings.buffer import started_buffer
+
+from .instrumentation import registry
+from .registry import CONTENT_TYPE, render_family
+
+router = Router()
+
+BUFFER_COUNTERS = ("enqueued", "flushed", "discarded", "flushes", "failures")
+# psycopg_pool stats -> (metric, type, help); counters start out missing
+POOL_STATS = {
+    "pool_size": ("db_pool_connections", "gauge", "Connections held by the pool."),
+    "pool_available": ("db_pool_available", "gauge", "Idle connections in the pool."),
+    "requests_waiting": (
+        "db_pool_waiting",
+        "gauge",
+        "Requests waiting for a connection.",
+    ),
+    "requests_num": ("db_pool_requests_total", "counter", "Connections checked out."),
+    "requests_queued": (
+        "db_pool_requests_queued_total",
+        "counter",
+        "Checkouts that had to wait.",
+    ),
+    "requests_errors": (
+        "db_pool_requests_errors_total",
+        "counter",
+        "Checkouts that timed out or failed.",
+    ),
+    "connections_num": (
+        "db_pool_connects_total",
+        "counter",
+        "Connections opened by the pool.",
+    ),
+    "connections_lost": (
+        "db_pool_connections_lost_total",
+        "counter",
+        "Connections found broken by health checks.",
+    ),
+}
+
+
+def runtime_metrics() -> str:
+    """Auth cache, ingest buffer, stream hub and database pool state of this process"""
+    caches = cache_stats()
+    families = [
+        render_family(
+            f"auth_cache_{key}_total",
+            "counter",
+            f"Auth cache {key}.",
+            (({"cache": name}, stats[key]) for name, stats in caches.items()),
+        )
+        for key in ("hits", "misses")
+    ]
+    families.append(
+        render_family(
+            "auth_cache_entries",
+            "gauge",
+            "Entries in the auth cache.",
+            (({"cache": name}, stats["size"]) for name, stats in caches.items()),
+        )
+    )
+
+    hub = stream.hub.stats()
+    families.append(
+        render_family(
+            "readings_stream_subscribers",
+            "gauge",
+            "Open reading streams.",
+            [({}, hub["subscribers"])],
+        )
+    )
+    families.append(
+        render_family(
+            "readings_stream_dropped",
+            "gauge",
+            "Messages dropped by the open streams.",
+            [({}, hub["dropped"])],
+        )
+    )
+
+    ingest_buffer = started_buffer()
+    if ingest_buffer is not None:
+        stats = ingest_buffer.stats()
+        families.append(
+            render_family(
+                "readings_buffer_depth",
+                "gauge",
+                "Readings waiting in the ingest buffer.",
+                [({}, stats["depth"])],
+            )
+        )
+        for key in BUFFER_COUNTERS:
+            families.append(
+                render_family(
+                    f"readings_buffer_{key}_total",
+                    "counter",
+                    f"Ingest buffer {key} count.",
+                    [({}, stats[key])],
+                )
+            )
+        families.append(
+            render_family(
+                "readings_buffer_flush_seconds_total",
+                "counter",
+                "Time spent flushing the ingest buffer.",
+                [({}, stats["flush_seconds_total"])],
+            )
+        )
+
+    pool_stats = getattr(connection, "pool_stats", None)
+    stats = pool_stats() if pool_stats else {}
+    if stats:
+        for key, (name, kind, help) in POOL_STATS.items():
+            families.append(render_family(name, kind, help, [({}, stats.get(key, 0))]))
+        families.append(
+            render_family(
+                "db_pool_wait_seconds_total",
+                "counter",
+                "Time spent waiting for a connection.",
+                [({}, stats.get("requests_wait_ms", 0) / 1000)],
+            )
+        )
+    return "".join(families)
+
+
+@router.get("/", include_in_schema=False)
+def metrics(request):
+    """Request and runtime metrics of this process in the Prometheus text format"""
+    token = settings.METRICS_TOKEN
+    if not token:
+        # Routes, volumes and pool state are not for the public internet
+        if not settings.DEBUG:
+            return HttpResponse(
+                "Set METRICS_TOKEN to serve metrics with DEBUG off",
+                status=403,
+                content_type="text/plain",
+            )
+    elif not constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return HttpResponse(status=401)
+    return HttpResponse(
+        registry.render() + runtime_metrics(), content_type=CONTENT_TYPE
+    )
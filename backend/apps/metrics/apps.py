@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class MetricsConfig(AppConfig):
+    name = "apps.metrics"
+
+    def ready(self):
+        from . import receivers  # noqa: F401
@@ -0,0 +1,166 @@
+"""
+Per-request measurements and the route metrics they feed.
+
+``MetricsMiddleware`` puts a ``RequestMetrics`` in the ``current`` context
+variable for the duration of a request. While it is set:
+
+- ``record_query``, installed as an execute wrapper on every database
+  connection, counts the request's queries and the time spent in them.
+  Context variables follow the request into ``sync_to_async`` threads, so
+  queries made by async views are attributed as well.
+- ``phase(name)`` times a named step; ``AuthBearer`` reports ``auth`` and
+  ``MetricsJSONRenderer`` reports ``render``.
+- ``record_rows`` notes how many rows the response carries.
+
+``observe_request`` then records everything under the request's method and
+route pattern, so ``/api/sensors/1/readings/`` and
+``/api/sensors/2/readings/`` share ``/api/sensors/{sensor_id}/readings/``.
+"""
+
+import contextvars
+import re
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from ninja.renderers import JSONRenderer
+
+from .registry import (
+    BYTES_BUCKETS,
+    QUERY_BUCKETS,
+    ROWS_BUCKETS,
+    Counter,
+    Histogram,
+    Registry,
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+registry = Registry()
+ROUTE = ("method", "route")
+requests_total = registry.register(
+    Counter("api_requests_total", "Requests served.", ROUTE + ("status",))
+)
+request_seconds = registry.register(
+    Histogram("api_request_duration_seconds", "Time to produce a response.", ROUTE)
+)
+db_queries = registry.register(
+    Histogram(
+        "api_request_db_queries", "Database queries per request.", ROUTE, QUERY_BUCKETS
+    )
+)
+db_seconds = registry.register(
+    Histogram("api_request_db_seconds", "Time spent in database queries.", ROUTE)
+)
+phase_seconds = registry.register(
+    Histogram(
+        "api_request_phase_seconds",
+        "Time spent in a step of the request.",
+        ROUTE + ("phase",),
+    )
+)
+response_bytes = registry.register(
+    Histogram(
+        "api_response_bytes", "Size of non-streaming bodies.", ROUTE, BYTES_BUCKETS
+    )
+)
+response_rows = registry.register(
+    Histogram("api_response_rows", "Rows in a response body.", ROUTE, ROWS_BUCKETS)
+)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.phases = {}
+        self.rows: Optional[int] = None
+
+
+current: contextvars.ContextVar[Optional[RequestMetrics]] = contextvars.ContextVar(
+    "request_metrics", default=None
+)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_seconds += time.perf_counter() - started
+
+
+@contextmanager
+def phase(name: str):
+    """Add the time spent in the block to the current request's ``name`` phase"""
+    metrics = current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.phases[name] = metrics.phases.get(name, 0.0) + elapsed
+
+
+def record_rows(count: int):
+    metrics = current.get()
+    if metrics is not None:
+        metrics.rows = count
+
+
+def route_label(request) -> str:
+    """The URL pattern that served ``request``, e.g. ``/api/sensors/{sensor_id}/``"""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNMATCHED_ROUTE
+    return "/" + re.sub(r"<(?:\w+:)?(\w+)>", r"{\1}", match.route)
+
+
+def observe_request(request, response, metrics: RequestMetrics) -> float:
+    """Record a finished request and return how long it took"""
+    elapsed = time.perf_counter() - metrics.started
+    labels = (request.method, route_label(request))
+    size = None if response.streaming else len(response.content)
+    with registry.lock:
+        requests_total.inc(labels + (str(response.status_code),))
+        request_seconds.observe(labels, elapsed)
+        db_queries.observe(labels, metrics.queries)
+        db_seconds.observe(labels, metrics.db_seconds)
+        for name, seconds in metrics.phases.items():
+            phase_seconds.observe(labels + (name,), seconds)
+        if size is not None:
+            response_bytes.observe(labels, size)
+        if metrics.rows is not None:
+            response_rows.observe(labels, metrics.rows)
+    return elapsed
+
+
+def count_rows(data) -> Optional[int]:
+    """Rows in an API payload: a list, a page with ``items``, or one object"""
+    if isinstance(data, list):
+        return len(data)
+    if isinstance(data, dict):
+        items = data.get("items")
+        return len(items) if isinstance(items, list) else 1
+    return None
+
+
+class MetricsJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` that reports its time and the rows it rendered"""
+
+    def render(self, request, data, *, response_status: int):
+        with phase("render"):
+            content = super().render(request, data, response_status=response_status)
+        if response_status < 400:
+            rows = count_rows(data)
+            if rows is not None:
+                record_rows(rows)
+        return content
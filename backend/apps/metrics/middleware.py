@@ -0,0 +1,98 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .instrumentation import RequestMetrics, current, observe_request, route_label
+
+logger = logging.getLogger(__name__)
+
+# cProfile cannot run two profilers at once on Python 3.12+, so one
+# request is profiled at a time and the others are skipped
+_profile_lock = threading.Lock()
+
+
+class MetricsMiddleware:
+    """
+    Record latency, database work and response size of every request.
+
+    With ``METRICS_PROFILE_RATE`` above 0 that fraction of sync requests runs
+    under cProfile, and the profiles of requests slower than
+    ``METRICS_PROFILE_SLOW_SECONDS`` are written to ``METRICS_PROFILE_DIR``
+    for ``python -m pstats`` or snakeviz. Requests handled on the event loop
+    are not profiled because their profile would include every other
+    request running on the loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        profiler = _start_profile()
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+            if profiler:
+                profiler.disable()
+                _profile_lock.release()
+        elapsed = observe_request(request, response, metrics)
+        if profiler and elapsed >= settings.METRICS_PROFILE_SLOW_SECONDS:
+            _dump_profile(profiler, request, elapsed)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        observe_request(request, response, metrics)
+        return response
+
+
+def _start_profile():
+    rate = settings.METRICS_PROFILE_RATE
+    if rate <= 0 or random.random() >= rate:
+        return None
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _dump_profile(profiler: cProfile.Profile, request, elapsed: float):
+    route = re.sub(r"[^\w]+", "_", route_label(request)).strip("_") or "root"
+    name = (
+        f"{time.strftime('%Y%m%dT%H%M%S')}-{request.method}-{route}-"
+        f"{elapsed * 1000:.0f}ms.prof"
+    )
+    try:
+        os.makedirs(settings.METRICS_PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(os.path.join(settings.METRICS_PROFILE_DIR, name))
+    except OSError:
+        logger.exception("Could not write profile %s", name)
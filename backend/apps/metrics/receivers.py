@@ -0,0 +1,11 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .instrumentation import record_query
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    # execute_wrappers outlives reconnects of the same connection object
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -0,0 +1,221 @@
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import NotSupportedError
+from django.db.models import Count, DateTimeField, Func, Max, Min, Sum
+
+from .ingest import normalize_timestamp
+from .models import Reading, ReadingRollup
+
+BUCKET_PATTERN = re.compile(r"^(\d+)([smhd])$")
+BUCKET_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+AGGREGATE_CHOICES = ("avg", "min", "max", "count")
+METRICS = ("temperature", "humidity")
+PARTIAL_FIELDS = (
+    "count",
+    "temperature_sum",
+    "temperature_min",
+    "temperature_max",
+    "humidity_sum",
+    "humidity_min",
+    "humidity_max",
+)
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def parse_bucket(value: str) -> int:
+    """Parse a bucket width such as ``15m`` or ``1h`` into seconds"""
+    match = BUCKET_PATTERN.match(value)
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(
+            f"Invalid bucket '{value}', expected a number followed by s, m, h or d"
+        )
+    return int(match.group(1)) * BUCKET_UNITS[match.group(2)]
+
+
+def parse_aggregates(value: str) -> List[str]:
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(AGGREGATE_CHOICES))
+    if not names or unknown:
+        raise ValueError(
+            f"Invalid agg '{value}', expected a comma-separated subset of "
+            f"{', '.join(AGGREGATE_CHOICES)}"
+        )
+    return names
+
+
+class DateBin(Func):
+    """
+    Floor a timestamp to a fixed-width bucket aligned to the Unix epoch.
+
+    Compiles to ``date_bin`` on PostgreSQL and to epoch arithmetic on SQLite,
+    so both backends produce identical bucket boundaries.
+    """
+
+    output_field = DateTimeField()
+
+    def __init__(self, expression, seconds: int, **extra):
+        self.seconds = int(seconds)
+        super().__init__(expression, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(f"DateBin is not supported on {connection.vendor}")
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return (
+            f"date_bin(%s::interval, {sql}, TIMESTAMPTZ '1970-01-01 00:00:00+00')",
+            [f"{self.seconds} seconds", *params],
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return (
+            f"datetime((CAST(strftime('%%s', {sql}) AS INTEGER) / %s) * %s, 'unixepoch')",
+            [*params, self.seconds, self.seconds],
+        )
+
+
+def floor_timestamp(value: datetime, seconds: int) -> datetime:
+    step = timedelta(seconds=seconds)
+    return EPOCH + (normalize_timestamp(value) - EPOCH) // step * step
+
+
+def ceil_timestamp(value: datetime, seconds: int) -> datetime:
+    floored = floor_timestamp(value, seconds)
+    if floored == normalize_timestamp(value):
+        return floored
+    return floored + timedelta(seconds=seconds)
+
+
+def rollup_resolution(seconds: int) -> Optional[int]:
+    """Return the coarsest rollup resolution that evenly divides a bucket width"""
+    for resolution in reversed(ReadingRollup.RESOLUTIONS):
+        if seconds % resolution == 0:
+            return resolution
+    return None
+
+
+def raw_partials(queryset, seconds: int):
+    """Bucket a ``Reading`` queryset into count, sum, min and max per metric"""
+    return (
+        queryset.annotate(bucket=DateBin("timestamp", seconds))
+        .values("bucket")
+        .annotate(
+            agg_count=Count("id"),
+            agg_temperature_sum=Sum("temperature"),
+            agg_temperature_min=Min("temperature"),
+            agg_temperature_max=Max("temperature"),
+            agg_humidity_sum=Sum("humidity"),
+            agg_humidity_min=Min("humidity"),
+            agg_humidity_max=Max("humidity"),
+        )
+        .order_by("bucket")
+    )
+
+
+def rollup_partials(queryset, seconds: int):
+    """Re-bucket a ``ReadingRollup`` queryset into the same shape as ``raw_partials``"""
+    return (
+        queryset.annotate(bucket=DateBin("bucket_start", seconds))
+        .values("bucket")
+        .annotate(
+            agg_count=Sum("count"),
+            agg_temperature_sum=Sum("temperature_sum"),
+            agg_temperature_min=Min("temperature_min"),
+            agg_temperature_max=Max("temperature_max"),
+            agg_humidity_sum=Sum("humidity_sum"),
+            agg_humidity_min=Min("humidity_min"),
+            agg_humidity_max=Max("humidity_max"),
+        )
+        .order_by("bucket")
+    )
+
+
+def _merge(sources) -> Dict[datetime, dict]:
+    buckets = {}
+    for rows in sources:
+        for row in rows:
+            current = buckets.get(row["bucket"])
+            if current is None:
+                buckets[row["bucket"]] = dict(row)
+                continue
+            for field in PARTIAL_FIELDS:
+                key = f"agg_{field}"
+                if field == "count" or field.endswith("_sum"):
+                    current[key] += row[key]
+                elif field.endswith("_min"):
+                    current[key] = min(current[key], row[key])
+                else:
+                    current[key] = max(current[key], row[key])
+    return buckets
+
+
+def _finalize(partial: dict, aggregates: Iterable[str]) -> dict:
+    row = {"bucket": partial["bucket"]}
+    for name in aggregates:
+        if name == "count":
+            row["count"] = partial["agg_count"]
+            continue
+        for metric in METRICS:
+            if name == "avg":
+                value = partial[f"agg_{metric}_sum"] / partial["agg_count"]
+            else:
+                value = partial[f"agg_{metric}_{name}"]
+            row[f"{metric}_{name}"] = value
+    return row
+
+
+def bucket_readings(
+    sensor_id: int,
+    seconds: int,
+    aggregates: Iterable[str],
+    timestamp_from: Optional[datetime] = None,
+    timestamp_to: Optional[datetime] = None,
+) -> List[dict]:
+    """
+    Compute bucketed aggregates for a sensor, one dict per bucket.
+
+    When a rollup resolution divides the bucket width, whole rollup buckets
+    inside the range are read from ``ReadingRollup`` and only the unaligned
+    head and tail of the range are aggregated from raw readings.
+    """
+    readings = Reading.objects.filter(sensor_id=sensor_id)
+    resolution = None
+    if settings.READINGS_ROLLUPS_ENABLED:
+        resolution = rollup_resolution(seconds)
+
+    start = end = None
+    if resolution and timestamp_from:
+        start = ceil_timestamp(timestamp_from, resolution)
+    if resolution and timestamp_to:
+        end = floor_timestamp(timestamp_to, resolution)
+
+    if resolution is None or (start and end and start >= end):
+        if timestamp_from:
+            readings = readings.filter(timestamp__gte=timestamp_from)
+        if timestamp_to:
+            readings = readings.filter(timestamp__lte=timestamp_to)
+        sources = [raw_partials(readings, seconds)]
+    else:
+        rollups = ReadingRollup.objects.filter(
+            sensor_id=sensor_id, resolution=resolution
+        )
+        sources = []
+        if start:
+            rollups = rollups.filter(bucket_start__gte=start)
+            if start != normalize_timestamp(timestamp_from):
+                head = readings.filter(
+                    timestamp__gte=timestamp_from, timestamp__lt=start
+                )
+                sources.append(raw_partials(head, seconds))
+        if end:
+            rollups = rollups.filter(bucket_start__lt=end)
+            tail = readings.filter(timestamp__gte=end, timestamp__lte=timestamp_to)
+            sources.append(raw_partials(tail, seconds))
+        sources.append(rollup_partials(rollups, seconds))
+
+    buckets = _merge(sources)
+    return [_finalize(buckets[bucket], aggregates) for bucket in sorted(buckets)]
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class ReadingsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.readings"
+
+    def ready(self):
+        from . import receivers  # noqa: F401
@@ -0,0 +1,456 @@
+"""
+Write-behind buffer for single-reading ingest.
+
+With ``READINGS_BUFFER_ENABLED`` the create-reading endpoint validates a
+reading, hands it to the process-wide ``IngestBuffer`` and answers 202. A
+background thread group-commits queued readings through ``write_readings``
+once ``READINGS_BUFFER_MAX_BATCH`` are waiting or the oldest has waited
+``READINGS_BUFFER_MAX_DELAY`` seconds, so many small requests share one
+transaction and one fsync.
+
+``READINGS_BUFFER_DURABILITY`` decides when a request is acknowledged:
+
+- ``commit``: after the batch holding the reading has committed.
+- ``journal``: after the reading is appended and fsynced to this process's
+  journal, ``READINGS_BUFFER_JOURNAL`` suffixed with the pid. Journal fsyncs
+  are grouped the same way. Each process holds a lock on its journal and
+  empties it whenever its queue drains. On start, a process replays the
+  journals of processes that died, copying their entries into its own
+  journal before deleting them.
+- ``memory``: as soon as the reading is queued. Readings still queued are
+  lost if the process dies.
+
+A batch that fails with a data or integrity error, which would fail again,
+is written in halves until the readings that fail on their own are
+isolated. Those are rejected: their requests fail, they are logged, and with
+a journal they are appended to ``READINGS_BUFFER_JOURNAL`` suffixed with
+``.rejected``. Any other error, such as the database being unreachable, puts
+the batch back at the head of the queue and it is retried with backoff for
+as long as it takes; requests wait meanwhile and a full queue answers 503.
+
+Replays and retries are safe because readings are written with
+``on_conflict="ignore"`` on their unique ``(sensor, timestamp)``.
+"""
+
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DataError, IntegrityError, connection
+
+from apps.sensors.models import Sensor
+
+from .ingest import ON_CONFLICT_IGNORE, normalize_timestamp, write_readings
+from .models import Reading
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_COMMIT = "commit"
+DURABILITY_JOURNAL = "journal"
+DURABILITY_MEMORY = "memory"
+DURABILITY_CHOICES = (DURABILITY_COMMIT, DURABILITY_JOURNAL, DURABILITY_MEMORY)
+
+MAX_BACKOFF = 5.0
+# Errors a batch would hit again on retry, so its readings are written apart
+REJECTABLE_ERRORS = (DataError, IntegrityError)
+
+
+class BufferFull(Exception):
+    pass
+
+
+class IngestBuffer:
+    def __init__(
+        self,
+        durability: str = DURABILITY_COMMIT,
+        journal_path: Optional[str] = None,
+        max_batch: int = 1000,
+        max_delay: float = 0.05,
+        max_pending: int = 100000,
+        commit_timeout: float = 5.0,
+    ):
+        if durability not in DURABILITY_CHOICES:
+            choices = ", ".join(DURABILITY_CHOICES)
+            raise ImproperlyConfigured(
+                f"READINGS_BUFFER_DURABILITY must be one of {choices}"
+            )
+        if durability == DURABILITY_JOURNAL and not journal_path:
+            raise ImproperlyConfigured(
+                "READINGS_BUFFER_JOURNAL must be set for journal durability"
+            )
+        self.durability = durability
+        self.journal_base = journal_path if durability == DURABILITY_JOURNAL else None
+        self.journal_path = (
+            f"{self.journal_base}.{os.getpid()}" if self.journal_base else None
+        )
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.commit_timeout = commit_timeout
+
+        self._queue: deque = deque()
+        self._oldest = 0.0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        self._journal = None
+        if self.journal_path:
+            self._journal = open(self.journal_path, "ab")
+            # Tells starting processes that this journal is not an orphan
+            fcntl.flock(self._journal, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._retries = 0
+        self._written_seq = 0
+        self._synced_seq = 0
+        self._sync_lock = threading.Lock()
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.discarded = 0
+        self.flushes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.journal_syncs = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+        self.last_batch_size = 0
+
+    @classmethod
+    def from_settings(cls) -> "IngestBuffer":
+        return cls(
+            durability=settings.READINGS_BUFFER_DURABILITY,
+            journal_path=settings.READINGS_BUFFER_JOURNAL,
+            max_batch=settings.READINGS_BUFFER_MAX_BATCH,
+            max_delay=settings.READINGS_BUFFER_MAX_DELAY,
+            max_pending=settings.READINGS_BUFFER_MAX_PENDING,
+            commit_timeout=settings.READINGS_BUFFER_COMMIT_TIMEOUT,
+        )
+
+    def submit(self, sensor_id: int, temperature, humidity, timestamp) -> Reading:
+        """
+        Queue a validated reading and return once it is as durable as the
+        configured mode promises.
+
+        Raises ``BufferFull`` when ``max_pending`` readings are already
+        waiting, and ``TimeoutError`` when a commit-mode write has not
+        committed within ``commit_timeout`` (the reading stays queued).
+        """
+        reading = Reading(
+            sensor_id=sensor_id,
+            temperature=temperature,
+            humidity=humidity,
+            timestamp=normalize_timestamp(timestamp),
+        )
+        future = Future() if self.durability == DURABILITY_COMMIT else None
+
+        with self._cond:
+            if len(self._queue) >= self.max_pending:
+                raise BufferFull
+            seq = self._append_journal(reading) if self._journal else 0
+            self._enqueue(reading, future)
+
+        if self._journal:
+            self._sync_journal(seq)
+        if future:
+            future.result(timeout=self.commit_timeout)
+        return reading
+
+    def _enqueue(self, reading: Reading, future: Optional[Future] = None):
+        if not self._queue:
+            self._oldest = time.monotonic()
+            self._cond.notify()
+        self._queue.append((reading, future))
+        self.enqueued += 1
+        if len(self._queue) == self.max_batch:
+            self._cond.notify()
+
+    def _append_journal(self, reading: Reading) -> int:
+        self._journal.write(_journal_entry(reading))
+        self._written_seq += 1
+        return self._written_seq
+
+    def _sync_journal(self, seq: int):
+        # One fsync covers every entry written before it, so concurrent
+        # requests queue behind a single sync instead of each issuing one
+        with self._sync_lock:
+            if self._synced_seq >= seq:
+                return
+            with self._cond:
+                self._journal.flush()
+                target = self._written_seq
+            os.fsync(self._journal.fileno())
+            self._synced_seq = target
+            self.journal_syncs += 1
+
+    def replay(self) -> int:
+        """
+        Queue the entries left by processes that died before committing them:
+        those in this process's journal, from an earlier process with the same
+        pid, and those in every journal no live process holds a lock on
+        """
+        if not self.journal_path:
+            return 0
+        with open(self.journal_path, "rb") as journal:
+            lines = _complete_lines(journal)
+        for path in self._orphaned_journals():
+            lines += self._adopt(path)
+
+        with self._cond:
+            for line in lines:
+                sensor_id, timestamp, temperature, humidity = json.loads(line)
+                self._enqueue(
+                    Reading(
+                        sensor_id=sensor_id,
+                        temperature=temperature,
+                        humidity=humidity,
+                        timestamp=datetime.fromisoformat(timestamp),
+                    )
+                )
+        return len(lines)
+
+    def _orphaned_journals(self) -> List[str]:
+        prefix = f"{self.journal_base}."
+        paths = [
+            path
+            for path in glob.glob(f"{glob.escape(prefix)}*")
+            if path[len(prefix) :].isdigit() and path != self.journal_path
+        ]
+        # Journals were a single shared file before they were per process
+        if os.path.exists(self.journal_base):
+            paths.append(self.journal_base)
+        return paths
+
+    def _adopt(self, path: str) -> List[bytes]:
+        """Move the entries of an orphaned journal into this process's journal"""
+        try:
+            orphan = open(path, "rb")
+        except FileNotFoundError:
+            return []
+        with orphan:
+            try:
+                fcntl.flock(orphan, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return []  # its process is alive
+            if os.fstat(orphan.fileno()).st_nlink == 0:
+                return []  # another process adopted it first
+            lines = _complete_lines(orphan)
+            if lines:
+                self._journal.write(b"".join(lines))
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+            os.unlink(path)
+        return lines
+
+    def flush(self) -> int:
+        """Write up to ``max_batch`` queued readings in one transaction"""
+        with self._cond:
+            count = min(len(self._queue), self.max_batch)
+            batch = [self._queue.popleft() for _ in range(count)]
+            if self._queue:
+                self._oldest = time.monotonic()
+        if not batch:
+            return 0
+
+        started = time.perf_counter()
+        rejected = []
+        try:
+            written = self._write([reading for reading, _ in batch])
+        except Exception as error:
+            connection.close_if_unusable_or_obsolete()
+            with self._cond:
+                self.failures += 1
+            if not isinstance(error, REJECTABLE_ERRORS):
+                self._requeue(batch)
+                raise
+            try:
+                written, rejected = self._isolate(batch, error)
+            except Exception:
+                # The database went away halfway; written halves are ignored
+                # as conflicts when the batch is retried
+                connection.close_if_unusable_or_obsolete()
+                self._requeue(batch)
+                raise
+            self._reject(rejected)
+        self._retries = 0
+        elapsed = time.perf_counter() - started
+
+        failed = {id(entry) for entry, _ in rejected}
+        for entry in batch:
+            if entry[1] and id(entry) not in failed:
+                entry[1].set_result(None)
+        with self._cond:
+            self.flushes += 1
+            self.flushed += written
+            self.discarded += len(batch) - len(rejected) - written
+            self.last_batch_size = len(batch)
+            self.flush_seconds_total += elapsed
+            self.flush_seconds_max = max(self.flush_seconds_max, elapsed)
+            if self._journal and not self._queue:
+                # Everything journaled so far is committed or rejected
+                self._journal.flush()
+                self._journal.truncate(0)
+        return len(batch)
+
+    def _requeue(self, batch: list):
+        with self._cond:
+            self._retries += 1
+            self._queue.extendleft(reversed(batch))
+
+    def _isolate(self, batch: list, error: Exception) -> Tuple[int, list]:
+        """
+        Write a batch that failed with ``error`` in halves, recursively, and
+        return how many readings were written and the ``(entry, error)`` pairs
+        of the readings that fail on their own. Errors other than data and
+        integrity errors are raised.
+        """
+        if len(batch) == 1:
+            return 0, [(batch[0], error)]
+        written, rejected = 0, []
+        middle = len(batch) // 2
+        for part in (batch[:middle], batch[middle:]):
+            try:
+                written += self._write([reading for reading, _ in part])
+            except REJECTABLE_ERRORS as part_error:
+                connection.close_if_unusable_or_obsolete()
+                part_written, part_rejected = self._isolate(part, part_error)
+                written += part_written
+                rejected += part_rejected
+        return written, rejected
+
+    def _reject(self, rejected: list):
+        for (reading, future), error in rejected:
+            logger.error(
+                "Rejected buffered reading %s: %s",
+                _journal_entry(reading).decode().strip(),
+                error,
+            )
+            if future:
+                future.set_exception(error)
+        if self.journal_base and rejected:
+            with open(f"{self.journal_base}.rejected", "ab") as dead_letters:
+                for (reading, _), _ in rejected:
+                    dead_letters.write(_journal_entry(reading))
+                dead_letters.flush()
+                os.fsync(dead_letters.fileno())
+        with self._cond:
+            self.rejected += len(rejected)
+
+    def _write(self, readings: List[Reading]) -> int:
+        # Skip readings whose sensor was deleted after they were queued rather
+        # than failing the whole batch on the foreign key
+        live = set(
+            Sensor.objects.filter(
+                id__in={reading.sensor_id for reading in readings}
+            ).values_list("id", flat=True)
+        )
+        kept = [reading for reading in readings if reading.sensor_id in live]
+        write_readings(kept, on_conflict=ON_CONFLICT_IGNORE)
+        return len(kept)
+
+    def start(self):
+        replayed = self.replay()
+        if replayed:
+            logger.info("Replaying %d journaled readings", replayed)
+        self._thread = threading.Thread(
+            target=self._run, name="readings-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopping:
+                    self._cond.wait()
+                if not self._queue:
+                    break
+                while len(self._queue) < self.max_batch and not self._stopping:
+                    remaining = self._oldest + self.max_delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing buffered readings failed, will retry")
+                if self._stopping:
+                    break
+                backoff = self.max_delay * 2 ** min(self._retries, 16)
+                time.sleep(min(backoff, MAX_BACKOFF))
+        connection.close()
+
+    def stop(self, timeout: float = 30.0):
+        """Flush everything still queued and stop the flusher thread"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._queue:
+            logger.warning(
+                "%d buffered readings were not written on shutdown", len(self._queue)
+            )
+        if self._journal:
+            self._journal.close()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "durability": self.durability,
+                "depth": len(self._queue),
+                "enqueued": self.enqueued,
+                "flushed": self.flushed,
+                "discarded": self.discarded,
+                "flushes": self.flushes,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "journal_syncs": self.journal_syncs,
+                "last_batch_size": self.last_batch_size,
+                "flush_seconds_total": self.flush_seconds_total,
+                "flush_seconds_max": self.flush_seconds_max,
+            }
+
+
+def _journal_entry(reading: Reading) -> bytes:
+    entry = [
+        reading.sensor_id,
+        reading.timestamp.isoformat(),
+        reading.temperature,
+        reading.humidity,
+    ]
+    return json.dumps(entry).encode() + b"\n"
+
+
+def _complete_lines(journal) -> List[bytes]:
+    # A process that died mid-write can leave a partial last line
+    return [line for line in journal if line.endswith(b"\n")]
+
+
+_buffer: Optional[IngestBuffer] = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer() -> IngestBuffer:
+    """Return the process-wide buffer, starting its flusher on first use"""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = IngestBuffer.from_settings()
+            _buffer.start()
+            atexit.register(_buffer.stop)
+        return _buffer
+
+
+def started_buffer() -> Optional[IngestBuffer]:
+    """Return the process-wide buffer if something has started it"""
+    return _buffer
@@ -0,0 +1,92 @@
+import warnings
+from datetime import datetime
+from typing import Sequence
+
+import numpy as np
+
+# Fewest samples a series keeps: its first, its last and one in between
+MIN_POINTS = 3
+
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: pick ``points`` indices that preserve the
+    visual shape of ``y`` over ``x``.
+
+    The first and last samples are always kept. The rest are split into
+    ``points - 2`` buckets, and each bucket keeps the sample that forms the
+    largest triangle with the previously kept sample and the mean of the next
+    bucket. Each bucket is scored with one vectorized expression.
+    """
+    length = len(x)
+    if points >= length or points < 3:
+        return np.arange(length)
+
+    bounds = np.linspace(1, length - 1, points - 1).astype(np.int64)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, length - 1
+
+    previous = 0
+    for bucket in range(points - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        if bucket + 2 < len(bounds):
+            next_start, next_end = bounds[bucket + 1], bounds[bucket + 2]
+        else:
+            next_start, next_end = length - 1, length
+        mean_x = x[next_start:next_end].mean()
+        mean_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[previous] - mean_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (mean_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+
+    return selected
+
+
+def minmax(y: np.ndarray, points: int) -> np.ndarray:
+    """
+    Split ``y`` into ``points // 2`` equal buckets and keep the minimum and
+    maximum of each, so every peak and trough survives.
+    """
+    length = len(y)
+    buckets = max(points // 2, 1)
+    if points >= length:
+        return np.arange(length)
+
+    bucket_ids = np.arange(length) * buckets // length
+    order = np.lexsort((y, bucket_ids))
+    starts = np.searchsorted(bucket_ids, np.arange(buckets))
+    ends = np.append(starts[1:], length) - 1
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+
+def downsample(
+    x: np.ndarray, series: Sequence[np.ndarray], max_points: int, method: str
+) -> np.ndarray:
+    """
+    Return sorted indices of at most ``max_points`` samples that keep the
+    shape of every series; the budget is shared evenly between series, and
+    each needs at least ``MIN_POINTS``.
+    """
+    if max_points < MIN_POINTS * len(series):
+        raise ValueError(f"max_points must be at least {MIN_POINTS * len(series)}")
+    if len(x) <= max_points:
+        return np.arange(len(x))
+
+    budget = max_points // len(series)
+    selected = [
+        lttb(x, y, budget) if method == "lttb" else minmax(y, budget) for y in series
+    ]
+    return np.unique(np.concatenate(selected))
+
+
+def epoch_seconds(timestamps: Sequence[datetime]) -> np.ndarray:
+    """Seconds since the epoch of aware datetimes, converted in one pass"""
+    with warnings.catch_warnings():
+        # numpy converts aware datetimes to UTC but warns that it drops the zone
+        warnings.simplefilter("ignore", UserWarning)
+        values = np.array(timestamps, dtype="datetime64[us]")
+    return values.astype(np.int64) / 1e6
@@ -0,0 +1,90 @@
+import csv
+import io
+import itertools
+import json
+from typing import AsyncIterator, Iterable, Iterator, List, Tuple
+
+from asgiref.sync import sync_to_async
+
+EXPORT_FIELDS = ("id", "timestamp", "temperature", "humidity")
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def iso_timestamp(value) -> str:
+    return value.isoformat().replace("+00:00", "Z")
+
+
+def _batches(rows: Iterable[Tuple], size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def encode_ndjson(batch: List[Tuple]) -> str:
+    return "".join(
+        json.dumps(
+            {
+                "id": pk,
+                "timestamp": iso_timestamp(timestamp),
+                "temperature": temperature,
+                "humidity": humidity,
+            }
+        )
+        + "\n"
+        for pk, timestamp, temperature, humidity in batch
+    )
+
+
+def encode_csv(batch: List[Tuple]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        (pk, iso_timestamp(timestamp), temperature, humidity)
+        for pk, timestamp, temperature, humidity in batch
+    )
+    return buffer.getvalue()
+
+
+def _csv_header() -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_FIELDS)
+    return buffer.getvalue()
+
+
+def iter_ndjson(rows: Iterable[Tuple], batch_size: int) -> Iterator[str]:
+    """Encode ``EXPORT_FIELDS`` tuples as newline-delimited JSON, a batch at a time"""
+    for batch in _batches(rows, batch_size):
+        yield encode_ndjson(batch)
+
+
+def iter_csv(rows: Iterable[Tuple], batch_size: int) -> Iterator[str]:
+    """Encode ``EXPORT_FIELDS`` tuples as CSV with a header row, a batch at a time"""
+    yield _csv_header()
+    for batch in _batches(rows, batch_size):
+        yield encode_csv(batch)
+
+
+ENCODERS = {"ndjson": iter_ndjson, "csv": iter_csv}
+BATCH_ENCODERS = {"ndjson": encode_ndjson, "csv": encode_csv}
+
+
+async def aiter_export(
+    rows: Iterator[Tuple], format: str, batch_size: int
+) -> AsyncIterator[str]:
+    """
+    Async version of ``ENCODERS[format]`` for ASGI responses, which would
+    otherwise buffer a synchronous iterator in full before sending it.
+
+    ``rows`` is a lazy ``QuerySet.iterator()``; each batch is pulled from it
+    on the thread that owns the database connection.
+    """
+    next_batch = sync_to_async(lambda: list(itertools.islice(rows, batch_size)))
+    if format == "csv":
+        yield _csv_header()
+    encode = BATCH_ENCODERS[format]
+    while batch := await next_batch():
+        yield encode(batch)
@@ -0,0 +1,252 @@
+import csv
+import io
+import itertools
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+
+import numpy as np
+from django.db import connection, transaction
+
+from .ingest import write_readings
+from .models import Reading
+from .signals import readings_created
+
+STAGING_TABLE = "readings_import_staging"
+UTC_SUFFIXES = ("+00:00", "Z")
+
+
+@dataclass
+class ReadingFrame:
+    """A chunk of readings held as parallel NumPy columns"""
+
+    sensor_ids: np.ndarray
+    timestamps: np.ndarray  # datetime64[us], UTC
+    temperatures: np.ndarray
+    humidities: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "ReadingFrame":
+        return cls(
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype="datetime64[us]"),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.float64),
+        )
+
+    def __len__(self):
+        return len(self.sensor_ids)
+
+    def take(self, mask: np.ndarray) -> "ReadingFrame":
+        return ReadingFrame(
+            self.sensor_ids[mask],
+            self.timestamps[mask],
+            self.temperatures[mask],
+            self.humidities[mask],
+        )
+
+    def aware_timestamps(self) -> List[datetime]:
+        return [
+            value.replace(tzinfo=dt_timezone.utc)
+            for value in self.timestamps.astype("datetime64[us]").tolist()
+        ]
+
+    def to_readings(self) -> List[Reading]:
+        return [
+            Reading(
+                sensor_id=sensor_id,
+                timestamp=timestamp,
+                temperature=temperature,
+                humidity=humidity,
+            )
+            for sensor_id, timestamp, temperature, humidity in zip(
+                self.sensor_ids.tolist(),
+                self.aware_timestamps(),
+                self.temperatures.tolist(),
+                self.humidities.tolist(),
+            )
+        ]
+
+
+def parse_timestamps(values: np.ndarray) -> np.ndarray:
+    """
+    Parse ISO-8601 strings into ``datetime64[us]`` UTC values.
+
+    UTC markers are stripped and the column is converted in one NumPy call;
+    only rows carrying a non-UTC offset fall back to ``datetime.fromisoformat``.
+    Values that cannot be parsed become ``NaT``.
+    """
+    values = np.asarray(values, dtype=str)
+    for suffix in UTC_SUFFIXES:
+        values = np.char.replace(values, suffix, "")
+
+    time_part = np.char.partition(np.char.replace(values, " ", "T"), "T")[:, 2]
+    has_offset = (np.char.find(time_part, "+") >= 0) | (
+        np.char.find(time_part, "-") >= 0
+    )
+
+    parsed = np.empty(len(values), dtype="datetime64[us]")
+    try:
+        parsed[~has_offset] = values[~has_offset].astype("datetime64[us]")
+    except ValueError:
+        parsed[~has_offset] = [
+            _parse_naive(value) for value in values[~has_offset].tolist()
+        ]
+    for index in np.flatnonzero(has_offset):
+        try:
+            aware = datetime.fromisoformat(values[index])
+        except ValueError:
+            parsed[index] = np.datetime64("NaT", "us")
+            continue
+        parsed[index] = np.datetime64(
+            aware.astimezone(dt_timezone.utc).replace(tzinfo=None), "us"
+        )
+    return parsed
+
+
+def _parse_naive(value: str) -> np.datetime64:
+    try:
+        return np.datetime64(value, "us")
+    except ValueError:
+        return np.datetime64("NaT", "us")
+
+
+def parse_floats(values: List[str]) -> np.ndarray:
+    try:
+        return np.asarray(values, dtype=str).astype(np.float64)
+    except ValueError:
+        parsed = np.empty(len(values), dtype=np.float64)
+        for index, value in enumerate(values):
+            try:
+                parsed[index] = float(value)
+            except ValueError:
+                parsed[index] = np.nan
+        return parsed
+
+
+def iter_csv_chunks(
+    stream: BinaryIO, chunk_size: int, offset: int = 0
+) -> Iterator[Tuple[List[List[str]], Dict[str, int], int]]:
+    """
+    Yield ``(rows, columns, next_offset)`` for fixed-size chunks of a CSV file.
+
+    ``next_offset`` is the byte position right after the chunk, which can be
+    passed back as ``offset`` to resume an interrupted import.
+    """
+    header = next(csv.reader([stream.readline().decode()]))
+    columns = {name: index for index, name in enumerate(header)}
+    if offset:
+        stream.seek(offset)
+
+    while True:
+        lines = list(itertools.islice(stream, chunk_size))
+        if not lines:
+            return
+        rows = [row for row in csv.reader(line.decode() for line in lines) if row]
+        yield rows, columns, stream.tell()
+
+
+def build_frame(
+    rows: List[List[str]], columns: Dict[str, int], sensors: Dict[str, int]
+) -> Tuple[ReadingFrame, int]:
+    """
+    Turn raw CSV rows into a frame, dropping short rows, unknown devices,
+    malformed timestamps, non-numeric values and repeated
+    ``(sensor, timestamp)`` pairs. Returns the frame and the number of rows
+    dropped.
+    """
+    total = len(rows)
+    rows = [row for row in rows if len(row) == len(columns)]
+    if not rows:
+        return ReadingFrame.empty(), total
+
+    table = np.asarray(rows, dtype=str)
+    device_ids, inverse = np.unique(table[:, columns["device_id"]], return_inverse=True)
+    lookup = np.array(
+        [sensors.get(device_id, -1) for device_id in device_ids], dtype=np.int64
+    )
+
+    frame = ReadingFrame(
+        sensor_ids=lookup[inverse],
+        timestamps=parse_timestamps(table[:, columns["timestamp"]]),
+        temperatures=parse_floats(table[:, columns["temperature"]]),
+        humidities=parse_floats(table[:, columns["humidity"]]),
+    )
+    valid = (
+        (frame.sensor_ids >= 0)
+        & ~np.isnat(frame.timestamps)
+        & np.isfinite(frame.temperatures)
+        & np.isfinite(frame.humidities)
+    )
+    frame = frame.take(valid)
+
+    keys = np.stack([frame.sensor_ids, frame.timestamps.view(np.int64)], axis=1)
+    _, first = np.unique(keys, axis=0, return_index=True)
+    first.sort()
+    return frame.take(first), total - len(first)
+
+
+def copy_frame(frame: ReadingFrame) -> int:
+    """
+    Load a frame through ``COPY FROM STDIN`` into a temporary staging table and
+    merge it into ``readings_reading`` with ``ON CONFLICT DO NOTHING``.
+    """
+    buffer = io.StringIO()
+    timestamps = np.datetime_as_string(frame.timestamps, unit="us")
+    writer = csv.writer(buffer)
+    writer.writerows(
+        zip(
+            frame.sensor_ids.tolist(),
+            (f"{value}+00:00" for value in timestamps.tolist()),
+            frame.temperatures.tolist(),
+            frame.humidities.tolist(),
+        )
+    )
+    buffer.seek(0)
+
+    table = Reading._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} ("
+            "sensor_id bigint, timestamp timestamptz, "
+            "temperature double precision, humidity double precision"
+            ") ON COMMIT DELETE ROWS"
+        )
+        with cursor.copy(
+            f"COPY {STAGING_TABLE} (sensor_id, timestamp, temperature, humidity) "
+            "FROM STDIN WITH (FORMAT csv)"
+        ) as copy:
+            copy.write(buffer.getvalue())
+        cursor.execute(
+            f"INSERT INTO {table} (sensor_id, timestamp, temperature, humidity, created_at) "
+            f"SELECT sensor_id, timestamp, temperature, humidity, now() FROM {STAGING_TABLE} "
+            "ON CONFLICT (sensor_id, timestamp) DO NOTHING "
+            "RETURNING id, sensor_id, timestamp, temperature, humidity"
+        )
+        readings = [
+            Reading(
+                id=id,
+                sensor_id=sensor_id,
+                timestamp=timestamp,
+                temperature=temperature,
+                humidity=humidity,
+            )
+            for id, sensor_id, timestamp, temperature, humidity in cursor.fetchall()
+        ]
+        readings_created.send(sender=Reading, readings=readings, replaced=[])
+    return len(readings)
+
+
+def import_frame(frame: ReadingFrame) -> int:
+    """
+    Write a frame with the fastest path the database supports and return the
+    number of new rows.
+    """
+    if not len(frame):
+        return 0
+
+    if connection.vendor == "postgresql":
+        return copy_frame(frame)
+
+    readings = frame.to_readings()
+    return len(readings) - write_readings(readings)
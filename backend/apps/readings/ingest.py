@@ -0,0 +1,178 @@
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timezone as dt_timezone
+from typing import Iterable, List, Set, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Reading
+from .signals import readings_created
+
+ON_CONFLICT_IGNORE = "ignore"
+ON_CONFLICT_UPDATE = "update"
+ON_CONFLICT_CHOICES = (ON_CONFLICT_IGNORE, ON_CONFLICT_UPDATE)
+
+
+@dataclass
+class IngestResult:
+    accepted: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    errors: List[dict] = field(default_factory=list)
+
+    def reject(self, index: int, detail: str):
+        self.rejected += 1
+        self.errors.append({"index": index, "detail": detail})
+
+
+def normalize_timestamp(value):
+    if timezone.is_naive(value):
+        return timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def record_reading(sensor_id: int, temperature, humidity, timestamp) -> Reading:
+    """Create a single reading and notify ``readings_created`` receivers"""
+    with transaction.atomic():
+        reading = Reading.objects.create(
+            sensor_id=sensor_id,
+            temperature=temperature,
+            humidity=humidity,
+            timestamp=normalize_timestamp(timestamp),
+        )
+        readings_created.send(sender=Reading, readings=[reading], replaced=[])
+    return reading
+
+
+def ingest_readings(
+    items: Iterable[Tuple[int, object]],
+    allowed_sensor_ids: Set[int],
+    on_conflict: str = ON_CONFLICT_IGNORE,
+) -> IngestResult:
+    """
+    Validate a batch of ``(sensor_id, ReadingCreate)`` pairs in one pass and
+    write the valid ones with ``write_readings``.
+
+    Items repeating a ``(sensor, timestamp)`` pair within the batch count as
+    duplicates; with ``on_conflict="update"`` the last one wins.
+    """
+    result = IngestResult()
+    pending = {}
+
+    for index, (sensor_id, data) in enumerate(items):
+        if sensor_id not in allowed_sensor_ids:
+            result.reject(index, "Sensor not found")
+            continue
+        if not (math.isfinite(data.temperature) and math.isfinite(data.humidity)):
+            result.reject(index, "Temperature and humidity must be finite numbers")
+            continue
+
+        key = (sensor_id, normalize_timestamp(data.timestamp))
+        if key in pending:
+            result.duplicates += 1
+            if on_conflict == ON_CONFLICT_UPDATE:
+                pending[key] = data
+            continue
+        pending[key] = data
+
+    readings = [
+        Reading(
+            sensor_id=sensor_id,
+            temperature=data.temperature,
+            humidity=data.humidity,
+            timestamp=timestamp,
+        )
+        for (sensor_id, timestamp), data in pending.items()
+    ]
+    overlap = write_readings(readings, on_conflict=on_conflict)
+    result.duplicates += overlap
+    result.accepted = len(readings) - overlap
+    return result
+
+
+def write_readings(
+    readings: List[Reading], on_conflict: str = ON_CONFLICT_IGNORE
+) -> int:
+    """
+    Bulk-write readings that are unique per ``(sensor, timestamp)`` and return
+    how many of them already existed.
+
+    Rows are inserted with ``ON CONFLICT DO NOTHING RETURNING``, so only the
+    rows this write actually inserted count as new and reach
+    ``readings_created``, even when other writers insert the same pairs
+    concurrently. With ``on_conflict="update"`` the other readings then
+    overwrite the existing rows.
+    """
+    if not readings:
+        return 0
+
+    batch_size = settings.READINGS_BULK_BATCH_SIZE
+    with transaction.atomic():
+        inserted = {}
+        for start in range(0, len(readings), batch_size):
+            for id, sensor_id, timestamp, created_at in _insert_new(
+                readings[start : start + batch_size]
+            ):
+                inserted[(sensor_id, _returned_datetime(timestamp))] = (
+                    id,
+                    _returned_datetime(created_at),
+                )
+
+        fresh, replaced = [], []
+        for reading in readings:
+            row = inserted.get((reading.sensor_id, reading.timestamp))
+            if row:
+                reading.id, reading.created_at = row
+                fresh.append(reading)
+            else:
+                replaced.append(reading)
+
+        if on_conflict != ON_CONFLICT_UPDATE:
+            replaced = []
+        elif replaced:
+            Reading.objects.bulk_create(
+                replaced,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=["sensor", "timestamp"],
+                update_fields=["temperature", "humidity"],
+            )
+        readings_created.send(sender=Reading, readings=fresh, replaced=replaced)
+
+    return len(readings) - len(fresh)
+
+
+def _insert_new(readings: List[Reading]) -> List[tuple]:
+    """Insert the readings whose pair is new; return their rows' keys"""
+    ops = connection.ops
+    created_at = ops.adapt_datetimefield_value(timezone.now())
+    params = []
+    for reading in readings:
+        params += [
+            reading.sensor_id,
+            ops.adapt_datetimefield_value(reading.timestamp),
+            reading.temperature,
+            reading.humidity,
+            created_at,
+        ]
+    values = ", ".join(["(%s, %s, %s, %s, %s)"] * len(readings))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {Reading._meta.db_table} "
+            "(sensor_id, timestamp, temperature, humidity, created_at) "
+            f"VALUES {values} "
+            "ON CONFLICT (sensor_id, timestamp) DO NOTHING "
+            "RETURNING id, sensor_id, timestamp, created_at",
+            params,
+        )
+        return cursor.fetchall()
+
+
+def _returned_datetime(value) -> datetime:
+    # SQLite returns datetimes as UTC text
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    return normalize_timestamp(value)
@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.sensors.caching import bump_versions
+from apps.readings.retention import (
+    compact_sensor,
+    drop_expired_partitions,
+    retention_cutoffs,
+    table_size,
+)
+
+
+def _format_size(size):
+    if size is None:
+        return "unknown"
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete raw readings older than their retention period, keeping their "
+        "hour and day rollups"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sensor", type=int, action="append", help="Limit to these sensor ids"
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Keep this many days for every sensor instead of its own policy",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.READINGS_RETENTION_BATCH_SIZE,
+            help="Readings deleted per transaction",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Recompute rollups from raw readings before deleting them",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.READINGS_ROLLUPS_ENABLED and not options["rebuild"]:
+            raise CommandError(
+                "Rollups are disabled, so deleting raw readings would lose data; "
+                "pass --rebuild to compute them first"
+            )
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        cutoffs = retention_cutoffs(options["sensor"], options["days"])
+        size_before = table_size()
+
+        dropped = []
+        if not options["sensor"] and not options["rebuild"]:
+            dropped = drop_expired_partitions(cutoffs)
+        reclaimed = 0
+        for partition in dropped:
+            reclaimed += partition.rows
+            self.stdout.write(f"Dropped {partition.name} (~{partition.rows} rows)")
+
+        for sensor_id, cutoff in cutoffs.items():
+            deleted = compact_sensor(
+                sensor_id, cutoff, options["batch_size"], options["rebuild"]
+            )
+            reclaimed += deleted
+            if deleted:
+                self.stdout.write(
+                    f"Sensor {sensor_id}: deleted {deleted} readings "
+                    f"before {cutoff.date()}"
+                )
+
+        bump_versions(cutoffs, history=True)
+        self.stdout.write(
+            f"Table size: {_format_size(size_before)} before, "
+            f"{_format_size(table_size())} after"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Compacted {len(cutoffs)} sensors, reclaimed {reclaimed} rows"
+            )
+        )
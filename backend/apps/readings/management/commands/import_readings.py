@@ -0,0 +1,80 @@
+import resource
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from apps.sensors.models import Sensor
+from apps.readings.importer import build_frame, import_frame, iter_csv_chunks
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Stream readings from a wide CSV file into the database in bulk chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "csv_path", help="CSV with timestamp,device_id,temperature,humidity"
+        )
+        parser.add_argument(
+            "--owner",
+            required=True,
+            help="Email of the user whose sensors the device_id column refers to",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10000,
+            help="Rows parsed and written per chunk",
+        )
+        parser.add_argument(
+            "--offset",
+            type=int,
+            default=0,
+            help="Byte offset to resume from, as printed by a previous run",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(email=options["owner"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['owner']} does not exist")
+
+        sensors = dict(Sensor.objects.filter(owner=owner).values_list("name", "id"))
+        total_rows = total_inserted = total_skipped = 0
+        started = time.perf_counter()
+
+        try:
+            stream = open(options["csv_path"], "rb")
+        except OSError as e:
+            raise CommandError(f"Cannot open {options['csv_path']}: {e}")
+
+        with stream:
+            for rows, columns, offset in iter_csv_chunks(
+                stream, options["chunk_size"], options["offset"]
+            ):
+                frame, skipped = build_frame(rows, columns, sensors)
+                inserted = import_frame(frame)
+
+                total_rows += len(rows)
+                total_inserted += inserted
+                total_skipped += skipped
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{total_rows} rows, {total_inserted} inserted, "
+                    f"{total_skipped} skipped, "
+                    f"{total_rows / elapsed if elapsed else 0:.0f} rows/sec, "
+                    f"peak RSS {self._peak_rss_mb():.1f} MB, offset {offset}"
+                )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {total_inserted} of {total_rows} readings "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+        )
+
+    @staticmethod
+    def _peak_rss_mb() -> float:
+        # ru_maxrss is reported in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
@@ -0,0 +1,79 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.sensors.caching import bump_versions
+from apps.readings.partitions import (
+    add_months,
+    ensure_partitions,
+    is_partitioned,
+    list_partitions,
+    month_start,
+    split_legacy,
+)
+from apps.readings.retention import drop_expired_partitions, retention_cutoffs
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintain the monthly partitions of readings_reading: create upcoming "
+        "months, split the legacy partition and drop expired months"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=settings.READINGS_PARTITION_MONTHS_AHEAD,
+            help="Create partitions up to this many months from now",
+        )
+        parser.add_argument(
+            "--split-legacy",
+            action="store_true",
+            help="Move pre-partitioning rows into monthly partitions (locks the table)",
+        )
+        parser.add_argument(
+            "--retain-months",
+            type=int,
+            help=(
+                "Drop monthly partitions that ended more than this many months "
+                "ago and are past every sensor's retention"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            raise CommandError(
+                "readings_reading is not partitioned; this needs PostgreSQL and "
+                "migration readings 0003_partition_readings"
+            )
+
+        if options["split_legacy"]:
+            for name in split_legacy():
+                self.stdout.write(f"Created {name} from the legacy partition")
+
+        for name in ensure_partitions(options["ahead"]):
+            self.stdout.write(f"Created {name}")
+
+        if options["retain_months"] is not None:
+            before = add_months(
+                month_start(datetime.now(dt_timezone.utc)), -options["retain_months"]
+            )
+            cutoffs = retention_cutoffs()
+            dropped = drop_expired_partitions(cutoffs, before)
+            for partition in dropped:
+                self.stdout.write(f"Dropped {partition.name} (~{partition.rows} rows)")
+            if dropped:
+                bump_versions(cutoffs, history=True)
+            else:
+                self.stdout.write(
+                    "Dropped no partitions: none has expired for every sensor"
+                )
+
+        for partition in list_partitions():
+            start = partition.start.date() if partition.start else "-"
+            end = partition.end.date() if partition.end else "-"
+            self.stdout.write(
+                f"{partition.name}: {start} to {end}, ~{partition.rows} rows"
+            )
+        self.stdout.write(self.style.SUCCESS("Partitions are up to date"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_datetime
+from apps.sensors.caching import bump_versions
+from apps.sensors.models import Sensor
+from apps.readings.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute minute, hour and day rollups from raw readings"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sensor", type=int, action="append", help="Limit to these sensor ids"
+        )
+        parser.add_argument("--from", dest="start", type=parse_datetime)
+        parser.add_argument("--to", dest="end", type=parse_datetime)
+
+    def handle(self, *args, **options):
+        sensors = Sensor.objects.order_by("id").values_list("id", flat=True)
+        if options["sensor"]:
+            sensors = sensors.filter(id__in=options["sensor"])
+
+        count = 0
+        for sensor_id in sensors:
+            rebuild_rollups(sensor_id, options["start"], options["end"])
+            bump_versions([sensor_id], history=True)
+            count += 1
+            self.stdout.write(f"Rebuilt rollups for sensor {sensor_id}")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rollups for {count} sensors"))
@@ -0,0 +1,106 @@
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+import django.db.models.deletion
+
+from apps.readings.aggregation import DateBin
+
+BATCH_SIZE = 5000
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Fold the readings that existed before rollups into minute, hour and day
+    rollups, one grouped scan per resolution. New readings are folded in on
+    write from here on.
+    """
+    Reading = apps.get_model("readings", "Reading")
+    ReadingRollup = apps.get_model("readings", "ReadingRollup")
+    db = schema_editor.connection.alias
+
+    for resolution in (60, 3600, 86400):
+        buckets = (
+            Reading.objects.using(db)
+            .annotate(bucket=DateBin("timestamp", resolution))
+            .values("sensor_id", "bucket")
+            .annotate(
+                agg_count=Count("id"),
+                agg_temperature_sum=Sum("temperature"),
+                agg_temperature_min=Min("temperature"),
+                agg_temperature_max=Max("temperature"),
+                agg_humidity_sum=Sum("humidity"),
+                agg_humidity_min=Min("humidity"),
+                agg_humidity_max=Max("humidity"),
+            )
+            .order_by()
+        )
+        batch = []
+        for row in buckets.iterator(chunk_size=BATCH_SIZE):
+            batch.append(
+                ReadingRollup(
+                    sensor_id=row["sensor_id"],
+                    resolution=resolution,
+                    bucket_start=row["bucket"],
+                    count=row["agg_count"],
+                    temperature_sum=row["agg_temperature_sum"],
+                    temperature_min=row["agg_temperature_min"],
+                    temperature_max=row["agg_temperature_max"],
+                    humidity_sum=row["agg_humidity_sum"],
+                    humidity_min=row["agg_humidity_min"],
+                    humidity_max=row["agg_humidity_max"],
+                )
+            )
+            if len(batch) == BATCH_SIZE:
+                ReadingRollup.objects.using(db).bulk_create(batch)
+                batch = []
+        ReadingRollup.objects.using(db).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sensors", "0001_initial"),
+        ("readings", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReadingRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "resolution",
+                    models.PositiveIntegerField(
+                        choices=[(60, "1 minute"), (3600, "1 hour"), (86400, "1 day")]
+                    ),
+                ),
+                ("bucket_start", models.DateTimeField()),
+                ("count", models.PositiveIntegerField()),
+                ("temperature_sum", models.FloatField()),
+                ("temperature_min", models.FloatField()),
+                ("temperature_max", models.FloatField()),
+                ("humidity_sum", models.FloatField()),
+                ("humidity_min", models.FloatField()),
+                ("humidity_max", models.FloatField()),
+                (
+                    "sensor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rollups",
+                        to="sensors.sensor",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("sensor", "resolution", "bucket_start")},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
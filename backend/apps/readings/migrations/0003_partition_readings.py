@@ -0,0 +1,90 @@
+from django.db import migrations
+from django.db.migrations.exceptions import IrreversibleError
+
+TABLE = "readings_reading"
+LEGACY = "readings_reading_legacy"
+DEFAULT = "readings_reading_default"
+INDEX = "readings_re_sensor__80b023_idx"
+
+
+def partition_readings(apps, schema_editor):
+    """
+    Re-create readings_reading as a table range-partitioned by month and
+    attach the existing heap as its first partition, without copying rows.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    from django.conf import settings
+    from django.utils import timezone
+    from apps.readings.partitions import (
+        add_months,
+        bound_literal,
+        ensure_partitions,
+        month_start,
+    )
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT max(id), max(timestamp) FROM {TABLE}")
+        max_id, max_timestamp = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY}")
+        # A partition's primary key must match the parent's (id, timestamp)
+        cursor.execute(f"ALTER TABLE {LEGACY} DROP CONSTRAINT {TABLE}_pkey")
+        cursor.execute(
+            f"ALTER TABLE {LEGACY} ADD CONSTRAINT {LEGACY}_pkey PRIMARY KEY (id, timestamp)"
+        )
+        cursor.execute(f"ALTER INDEX {INDEX} RENAME TO {LEGACY}_sensor_ts_idx")
+        cursor.execute(f"ALTER TABLE {LEGACY} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+
+        # The partition key must be part of every unique constraint
+        cursor.execute(
+            f"CREATE TABLE {TABLE} ("
+            "id bigint GENERATED BY DEFAULT AS IDENTITY, "
+            "temperature double precision NOT NULL, "
+            "humidity double precision NOT NULL, "
+            "timestamp timestamp with time zone NOT NULL, "
+            "created_at timestamp with time zone NOT NULL, "
+            "sensor_id bigint NOT NULL, "
+            f"CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, timestamp), "
+            f"CONSTRAINT {TABLE}_sensor_id_timestamp_uniq UNIQUE (sensor_id, timestamp), "
+            f"CONSTRAINT {TABLE}_sensor_id_fk FOREIGN KEY (sensor_id) "
+            "REFERENCES sensors_sensor (id) DEFERRABLE INITIALLY DEFERRED"
+            ") PARTITION BY RANGE (timestamp)"
+        )
+        if max_id:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), %s)", [max_id]
+            )
+        cursor.execute(f"CREATE INDEX {INDEX} ON {TABLE} (sensor_id, timestamp)")
+
+        first_month = month_start(timezone.now())
+        if max_timestamp is not None:
+            first_month = max(first_month, add_months(month_start(max_timestamp), 1))
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {LEGACY} "
+            f"FOR VALUES FROM (MINVALUE) TO ({bound_literal(first_month)})"
+        )
+        cursor.execute(f"CREATE TABLE {DEFAULT} PARTITION OF {TABLE} DEFAULT")
+
+    ensure_partitions(settings.READINGS_PARTITION_MONTHS_AHEAD)
+
+
+def unpartition_readings(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        raise IrreversibleError(
+            "readings_reading stays partitioned; restore from a backup to undo"
+        )
+
+
+class Migration(migrations.Migration):
+
+    atomic = True
+
+    dependencies = [
+        ('readings', '0002_readingrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_readings, unpartition_readings),
+    ]
@@ -0,0 +1,55 @@
+from django.db import migrations
+
+TABLE = "readings_reading"
+UNIQUE = f"{TABLE}_sensor_id_timestamp_uniq"
+COVERING = f"{TABLE}_sensor_ts_covering_uniq"
+BRIN = f"{TABLE}_timestamp_brin"
+
+
+def add_covering_indexes(apps, schema_editor):
+    """
+    Replace the (sensor_id, timestamp) unique constraint with one that also
+    stores id, temperature and humidity, so range reads can be answered by an
+    index-only scan, and add a BRIN index on timestamp for time ranges that
+    span all sensors. Builds the new indexes on every partition while holding
+    a write lock on the table.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ADD CONSTRAINT {COVERING} "
+            "UNIQUE (sensor_id, timestamp) INCLUDE (id, temperature, humidity)"
+        )
+        cursor.execute(f"ALTER TABLE {TABLE} DROP CONSTRAINT {UNIQUE}")
+        cursor.execute(
+            f"CREATE INDEX {BRIN} ON {TABLE} USING brin (timestamp) "
+            "WITH (pages_per_range = 32)"
+        )
+
+
+def remove_covering_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP INDEX {BRIN}")
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ADD CONSTRAINT {UNIQUE} UNIQUE (sensor_id, timestamp)"
+        )
+        cursor.execute(f"ALTER TABLE {TABLE} DROP CONSTRAINT {COVERING}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("readings", "0003_partition_readings"),
+    ]
+
+    operations = [
+        # Duplicates the index behind the unique constraint
+        migrations.RemoveIndex(
+            model_name="reading",
+            name="readings_re_sensor__80b023_idx",
+        ),
+        migrations.RunPython(add_covering_indexes, remove_covering_indexes),
+    ]
@@ -13,10 +13,37 @@ class Reading(models.Model):
 
     class Meta:
         ordering = ["-timestamp"]
-        indexes = [
-            models.Index(fields=["sensor", "timestamp"]),
-        ]
+        # The unique index also serves (sensor, timestamp) range reads. On
+        # PostgreSQL migration 0004 makes it cover the reading columns and
+        # adds a BRIN index on timestamp for scans across sensors
         unique_together = [["sensor", "timestamp"]]
 
     def __str__(self):
         return f"{self.sensor.name} - {self.timestamp}"
+
+
+class ReadingRollup(models.Model):
+    """Pre-aggregated readings for one sensor over one fixed-width time bucket"""
+
+    MINUTE = 60
+    HOUR = 3600
+    DAY = 86400
+    RESOLUTIONS = (MINUTE, HOUR, DAY)
+    RESOLUTION_CHOICES = [(MINUTE, "1 minute"), (HOUR, "1 hour"), (DAY, "1 day")]
+
+    sensor = models.ForeignKey(Sensor, on_delete=models.CASCADE, related_name="rollups")
+    resolution = models.PositiveIntegerField(choices=RESOLUTION_CHOICES)
+    bucket_start = models.DateTimeField()
+    count = models.PositiveIntegerField()
+    temperature_sum = models.FloatField()
+    temperature_min = models.FloatField()
+    temperature_max = models.FloatField()
+    humidity_sum = models.FloatField()
+    humidity_min = models.FloatField()
+    humidity_max = models.FloatField()
+
+    class Meta:
+        unique_together = [["sensor", "resolution", "bucket_start"]]
+
+    def __str__(self):
+        return f"{self.sensor_id} - {self.bucket_start} ({self.resolution}s)"
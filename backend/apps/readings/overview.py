@@ -0,0 +1,163 @@
+"""
+Latest reading and recent statistics for a page of sensors.
+
+On PostgreSQL ``overview_rows`` fetches the page, then passes its ids to one
+query that joins them to a ``LATERAL`` lookup of each sensor's newest
+reading, served by the ``(sensor, timestamp)`` index, and to one grouped
+aggregate of the hourly rollups that start at or after the hour containing
+``since``, so each sensor costs a couple of dozen index entries however many
+raw readings it has. Without rollups the window is aggregated from raw
+readings. Other databases get the same columns from correlated subqueries
+(``annotate_overview``) in a single query.
+"""
+
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Max, Min, OuterRef, QuerySet, Subquery, Sum
+
+from .aggregation import METRICS, floor_timestamp
+from .models import Reading, ReadingRollup
+
+LATEST_FIELDS = ("timestamp", "temperature", "humidity")
+
+
+def _window_expressions(from_rollups: bool) -> dict:
+    if from_rollups:
+        expressions = {"count": Sum("count")}
+        for metric in METRICS:
+            expressions[f"{metric}_sum"] = Sum(f"{metric}_sum")
+            expressions[f"{metric}_min"] = Min(f"{metric}_min")
+            expressions[f"{metric}_max"] = Max(f"{metric}_max")
+        return expressions
+
+    expressions = {"count": Count("id")}
+    for metric in METRICS:
+        expressions[f"{metric}_sum"] = Sum(metric)
+        expressions[f"{metric}_min"] = Min(metric)
+        expressions[f"{metric}_max"] = Max(metric)
+    return expressions
+
+
+def annotate_overview(sensors: QuerySet, since: datetime) -> QuerySet:
+    """
+    Annotate ``sensors`` with ``latest_<field>`` for the newest reading and
+    ``window_<partial>`` aggregates for readings since ``since``.
+    """
+    latest = Reading.objects.filter(sensor_id=OuterRef("pk")).order_by("-timestamp")
+    annotations = {
+        f"latest_{field}": Subquery(latest.values(field)[:1]) for field in LATEST_FIELDS
+    }
+
+    from_rollups = settings.READINGS_ROLLUPS_ENABLED
+    if from_rollups:
+        window = ReadingRollup.objects.filter(
+            sensor_id=OuterRef("pk"),
+            resolution=ReadingRollup.HOUR,
+            bucket_start__gte=floor_timestamp(since, ReadingRollup.HOUR),
+        )
+    else:
+        window = Reading.objects.filter(sensor_id=OuterRef("pk"), timestamp__gte=since)
+    window = window.order_by().values("sensor_id")
+    for name, expression in _window_expressions(from_rollups).items():
+        annotations[f"window_{name}"] = Subquery(
+            window.annotate(value=expression).values("value")
+        )
+    return sensors.annotate(**annotations)
+
+
+OVERVIEW_ANNOTATIONS = tuple(f"latest_{field}" for field in LATEST_FIELDS) + tuple(
+    f"window_{name}" for name in _window_expressions(False)
+)
+
+OVERVIEW_SQL = """
+SELECT page.id, {latest}, {window}
+FROM unnest(%s::bigint[]) AS page (id)
+LEFT JOIN LATERAL (
+    SELECT {latest_columns} FROM {readings}
+    WHERE sensor_id = page.id ORDER BY "timestamp" DESC LIMIT 1
+) AS latest ON true
+LEFT JOIN (
+    SELECT sensor_id, {aggregates} FROM {source}
+    WHERE {condition} AND sensor_id = ANY(%s)
+    GROUP BY sensor_id
+) AS window_ ON window_.sensor_id = page.id
+"""
+
+
+def _window_aggregates(from_rollups: bool) -> dict:
+    """SQL of the window partials, from rollup partials or raw readings"""
+    aggregates = {"count": 'SUM("count")' if from_rollups else "COUNT(*)"}
+    for metric in METRICS:
+        for partial in ("sum", "min", "max"):
+            column = f"{metric}_{partial}" if from_rollups else metric
+            aggregates[f"{metric}_{partial}"] = f"{partial.upper()}({column})"
+    return aggregates
+
+
+def overview_rows(page: QuerySet, since: datetime) -> list:
+    """
+    Fetch a sliced and ordered ``values()`` page of sensors with the
+    ``OVERVIEW_ANNOTATIONS`` of each, from readings since ``since``.
+    """
+    if connection.vendor != "postgresql":
+        return list(annotate_overview(page, since))
+
+    rows = list(page)
+    if not rows:
+        return rows
+    ids = [row["id"] for row in rows]
+
+    from_rollups = settings.READINGS_ROLLUPS_ENABLED
+    if from_rollups:
+        source = ReadingRollup._meta.db_table
+        condition = "resolution = %s AND bucket_start >= %s"
+        window_params = [
+            ReadingRollup.HOUR,
+            floor_timestamp(since, ReadingRollup.HOUR),
+        ]
+    else:
+        source = Reading._meta.db_table
+        condition = '"timestamp" >= %s'
+        window_params = [since]
+    aggregates = _window_aggregates(from_rollups)
+
+    sql = OVERVIEW_SQL.format(
+        latest=", ".join(
+            f'latest."{field}" AS latest_{field}' for field in LATEST_FIELDS
+        ),
+        window=", ".join(f'window_."{name}" AS window_{name}' for name in aggregates),
+        latest_columns=", ".join(f'"{field}"' for field in LATEST_FIELDS),
+        readings=Reading._meta.db_table,
+        aggregates=", ".join(
+            f'{expression} AS "{name}"' for name, expression in aggregates.items()
+        ),
+        source=source,
+        condition=condition,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [ids, *window_params, ids])
+        columns = [column.name for column in cursor.description]
+        annotations = {row[0]: dict(zip(columns[1:], row[1:])) for row in cursor}
+    for row in rows:
+        row.update(annotations[row["id"]])
+    return rows
+
+
+def overview_to_dict(row: dict, sensor_fields) -> dict:
+    """Shape one row of ``overview_rows`` for ``SensorOverviewOut``"""
+    item = {field: row[field] for field in sensor_fields}
+    item["latest"] = None
+    if row["latest_timestamp"] is not None:
+        item["latest"] = {field: row[f"latest_{field}"] for field in LATEST_FIELDS}
+
+    item["window"] = None
+    count = row["window_count"]
+    if count:
+        item["window"] = {"count": count}
+        for metric in METRICS:
+            item["window"][f"{metric}_avg"] = row[f"window_{metric}_sum"] / count
+            item["window"][f"{metric}_min"] = row[f"window_{metric}_min"]
+            item["window"][f"{metric}_max"] = row[f"window_{metric}_max"]
+    return item
@@ -0,0 +1,110 @@
+"""
+Packed binary reading batches for constrained devices.
+
+A batch of ``application/x-sensor-batch`` is a bare array of 16-byte
+little-endian records, one per reading of a single sensor::
+
+    epoch_ms     int64    milliseconds since 1970-01-01T00:00:00Z
+    temperature  float32  degrees Celsius
+    humidity     float32  relative humidity percentage
+
+In Python: ``struct.pack("<qff", epoch_ms, temperature, humidity)`` per
+reading, or ``numpy.array(rows, dtype=RECORD).tobytes()``. The body is
+viewed in place with ``numpy.frombuffer``, validated with array operations
+and written as a ``ReadingFrame`` through ``import_frame``, the same path
+as ``import_readings`` (``COPY`` on PostgreSQL). No reading passes through
+JSON, a schema or model instances unless ``on_conflict=update`` needs
+``write_readings`` to overwrite existing rows.
+
+float32 holds six significant decimal digits, so values are rounded to six
+significant digits. A value sent as ``21.37`` is stored as ``21.37`` rather
+than the nearest float32, ``21.3700008392334``.
+"""
+
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+
+from .importer import ReadingFrame, import_frame
+from .ingest import (
+    ON_CONFLICT_IGNORE,
+    ON_CONFLICT_UPDATE,
+    IngestResult,
+    write_readings,
+)
+
+CONTENT_TYPE = "application/x-sensor-batch"
+RECORD = np.dtype([("epoch_ms", "<i8"), ("temperature", "<f4"), ("humidity", "<f4")])
+SIGNIFICANT_DIGITS = np.finfo(np.float32).precision
+
+# Python datetimes cover years 1 to 9999
+MIN_EPOCH_MS = int(datetime.min.replace(tzinfo=dt_timezone.utc).timestamp() * 1000)
+MAX_EPOCH_MS = int(datetime.max.replace(tzinfo=dt_timezone.utc).timestamp() * 1000)
+
+
+class PackedBatchError(ValueError):
+    """The body is not a whole number of records"""
+
+
+def decode(body: bytes) -> np.ndarray:
+    """View ``body`` as an array of ``RECORD`` without copying it"""
+    if len(body) % RECORD.itemsize:
+        raise PackedBatchError(
+            f"Body must be a multiple of {RECORD.itemsize} bytes, got {len(body)}"
+        )
+    return np.frombuffer(body, dtype=RECORD)
+
+
+def round_float32(values: np.ndarray) -> np.ndarray:
+    """Round float32 ``values`` to the decimals they can carry, as float64"""
+    values = values.astype(np.float64)
+    magnitude = np.floor(
+        np.log10(np.abs(values), where=values != 0, out=np.zeros_like(values))
+    )
+    scale = 10.0 ** (SIGNIFICANT_DIGITS - 1 - magnitude)
+    return np.round(values * scale) / scale
+
+
+def ingest_packed(
+    sensor_id: int, records: np.ndarray, on_conflict: str = ON_CONFLICT_IGNORE
+) -> IngestResult:
+    """
+    Validate decoded records of one sensor and write the valid ones, with the
+    same outcome as ``ingest_readings``.
+    """
+    result = IngestResult()
+    epoch_ms = records["epoch_ms"]
+    finite = np.isfinite(records["temperature"]) & np.isfinite(records["humidity"])
+    in_range = (epoch_ms >= MIN_EPOCH_MS) & (epoch_ms <= MAX_EPOCH_MS)
+    for index in np.flatnonzero(~(finite & in_range)).tolist():
+        if finite[index]:
+            result.reject(index, "Timestamp is out of range")
+        else:
+            result.reject(index, "Temperature and humidity must be finite numbers")
+
+    valid = np.flatnonzero(finite & in_range)
+    if on_conflict == ON_CONFLICT_UPDATE:
+        # The last record of a repeated timestamp wins
+        _, last = np.unique(epoch_ms[valid][::-1], return_index=True)
+        keep = valid[::-1][last]
+    else:
+        _, first = np.unique(epoch_ms[valid], return_index=True)
+        keep = valid[first]
+    result.duplicates = len(valid) - len(keep)
+
+    kept = records[keep]
+    frame = ReadingFrame(
+        sensor_ids=np.full(len(kept), sensor_id, dtype=np.int64),
+        timestamps=kept["epoch_ms"].astype("datetime64[ms]").astype("datetime64[us]"),
+        temperatures=round_float32(kept["temperature"]),
+        humidities=round_float32(kept["humidity"]),
+    )
+    if on_conflict == ON_CONFLICT_UPDATE:
+        readings = frame.to_readings()
+        overlap = write_readings(readings, on_conflict=on_conflict)
+        result.accepted = len(readings) - overlap
+    else:
+        result.accepted = import_frame(frame)
+        overlap = len(frame) - result.accepted
+    result.duplicates += overlap
+    return result
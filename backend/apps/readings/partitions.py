@@ -0,0 +1,216 @@
+"""
+Monthly range partitioning of ``readings_reading`` on PostgreSQL.
+
+Migration ``0003_partition_readings`` turns the table into a parent
+partitioned by ``timestamp``. The existing heap is attached unchanged as
+``readings_reading_legacy``, covering everything before the first monthly
+partition, so the switch does not copy any rows. Each month then gets its own
+``readings_reading_pYYYYMM`` partition. A ``readings_reading_default``
+partition catches rows beyond the last monthly partition, so inserts never
+fail for lack of one.
+
+The ``partition_readings`` command creates partitions ahead of time,
+splits the legacy partition into months and drops whole months for
+retention. On other databases these functions do nothing.
+
+Django still treats ``id`` as the primary key. In the database the key is
+``(id, timestamp)``, because PostgreSQL requires the partition key in every
+unique constraint. ``id`` values still come from a single sequence.
+"""
+
+from datetime import datetime, timezone as dt_timezone
+from typing import List, NamedTuple, Optional
+
+from django.db import connection, transaction
+
+from .models import Reading
+
+TABLE = Reading._meta.db_table
+LEGACY = f"{TABLE}_legacy"
+DEFAULT = f"{TABLE}_default"
+COLUMNS = "id, sensor_id, timestamp, temperature, humidity, created_at"
+
+
+class Partition(NamedTuple):
+    name: str
+    start: Optional[datetime]
+    end: Optional[datetime]
+    rows: int
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def bound_literal(value: datetime) -> str:
+    # Partition bounds are DDL, which cannot take bind parameters
+    return f"'{value.astimezone(dt_timezone.utc).isoformat()}'"
+
+
+def is_partitioned(using=None) -> bool:
+    using = using or connection
+    if using.vendor != "postgresql":
+        return False
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND c.relnamespace = to_regnamespace(current_schema())",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions() -> List[Partition]:
+    """Return the partitions of ``readings_reading`` ordered by start bound"""
+    if not is_partitioned():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), "
+            "greatest(c.reltuples, 0)::bigint "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+
+    partitions = [
+        Partition(name, *_bounds(bound), count) for name, bound, count in rows
+    ]
+    epoch = datetime.min.replace(tzinfo=dt_timezone.utc)
+    latest = datetime.max.replace(tzinfo=dt_timezone.utc)
+    return sorted(
+        partitions,
+        key=lambda p: (p.start or (latest if p.name == DEFAULT else epoch)),
+    )
+
+
+def _bounds(bound: str):
+    # e.g. FOR VALUES FROM ('2024-01-01 00:00:00+00') TO ('2024-02-01 00:00:00+00')
+    if bound == "DEFAULT":
+        return None, None
+    start, end = bound.split(" FROM (", 1)[1].split(") TO (")
+    return _parse_bound(start), _parse_bound(end.rstrip(")"))
+
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'")).astimezone(dt_timezone.utc)
+
+
+def create_partition(month: datetime, cursor) -> bool:
+    """
+    Create the partition for ``month`` if it is missing. Rows already routed
+    to the default partition for that month are moved into it.
+    """
+    name = partition_name(month)
+    cursor.execute("SELECT to_regclass(%s)", [name])
+    if cursor.fetchone()[0] is not None:
+        return False
+
+    end = add_months(month, 1)
+    bounds = f"FOR VALUES FROM ({bound_literal(month)}) TO ({bound_literal(end)})"
+    cursor.execute(
+        f"SELECT 1 FROM {DEFAULT} WHERE timestamp >= %s AND timestamp < %s LIMIT 1",
+        [month, end],
+    )
+    if cursor.fetchone() is None:
+        cursor.execute(f"CREATE TABLE {name} PARTITION OF {TABLE} {bounds}")
+        return True
+
+    cursor.execute(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)")
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {DEFAULT} "
+        f"WHERE timestamp >= %s AND timestamp < %s RETURNING {COLUMNS}) "
+        f"INSERT INTO {name} ({COLUMNS}) SELECT {COLUMNS} FROM moved",
+        [month, end],
+    )
+    cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} {bounds}")
+    return True
+
+
+def ensure_partitions(months_ahead: int, now: Optional[datetime] = None) -> List[str]:
+    """
+    Create the missing monthly partitions up to ``months_ahead`` months from
+    now, starting at the current month or at the end of the last partition if
+    that is earlier.
+    """
+    if not is_partitioned():
+        return []
+    now = now or datetime.now(dt_timezone.utc)
+    partitions = list_partitions()
+    ends = [p.end for p in partitions if p.end]
+    month = min(max(ends), month_start(now)) if ends else month_start(now)
+    last = add_months(month_start(now), months_ahead)
+
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        while month <= last:
+            covered = any(
+                p.end and (p.start is None or p.start <= month) and month < p.end
+                for p in partitions
+            )
+            if not covered and create_partition(month, cursor):
+                created.append(partition_name(month))
+            month = add_months(month, 1)
+    return created
+
+
+def split_legacy() -> List[str]:
+    """
+    Move the rows of the legacy partition into monthly partitions and drop it.
+
+    Runs in one transaction and locks the readings table until it commits.
+    Schedule it for a quiet period on large tables.
+    """
+    legacy = next((p for p in list_partitions() if p.name == LEGACY), None)
+    if legacy is None:
+        return []
+
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"SELECT min(timestamp) FROM {LEGACY}")
+        first = cursor.fetchone()[0]
+        cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {LEGACY}")
+        if first is not None:
+            month = month_start(first)
+            while month < legacy.end:
+                if create_partition(month, cursor):
+                    created.append(partition_name(month))
+                cursor.execute(
+                    f"INSERT INTO {TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {LEGACY} "
+                    "WHERE timestamp >= %s AND timestamp < %s",
+                    [month, add_months(month, 1)],
+                )
+                month = add_months(month, 1)
+        cursor.execute(f"DROP TABLE {LEGACY}")
+    return created
+
+
+def drop_partitions_before(cutoff: datetime) -> List[Partition]:
+    """
+    Detach and drop every monthly partition that ends on or before ``cutoff``.
+    Dropping a partition removes its rows without a row-by-row delete.
+    Rollups are stored separately and keep their aggregates.
+    """
+    dropped = [
+        p
+        for p in list_partitions()
+        if p.end and p.end <= cutoff and p.name not in (LEGACY, DEFAULT)
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        for partition in dropped:
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {partition.name}")
+            cursor.execute(f"DROP TABLE {partition.name}")
+    return dropped
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.dispatch import receiver
+
+from .models import Reading
+from .rollups import apply_readings, rebuild_replaced
+from .signals import readings_created
+from . import stream
+
+
+@receiver(readings_created, sender=Reading)
+def update_rollups(sender, readings, replaced, **kwargs):
+    if not settings.READINGS_ROLLUPS_ENABLED:
+        return
+    apply_readings(readings)
+    if replaced:
+        rebuild_replaced(replaced)
+
+
+@receiver(readings_created, sender=Reading)
+def publish_readings(sender, readings, replaced, **kwargs):
+    stream.publish([*readings, *replaced])
@@ -0,0 +1,150 @@
+"""
+Retention of raw readings.
+
+Raw readings are kept for ``READINGS_RETENTION_DAYS`` days, or for a
+sensor's own ``retention_days``. The ``compact_readings`` command then deletes
+older raw readings and their minute rollups. The hour and day rollups stay, so
+aggregates over old ranges keep working at hourly resolution and coarser.
+
+Rollups are maintained on every write, so compaction does not rebuild them
+by default. ``--rebuild`` recomputes each window from raw readings before
+deleting it, for data that was written while rollups were disabled. Once
+compacted, a range's hour and day rollups are final: ``rebuild_rollups``
+starts after the last compacted day.
+
+Rows are deleted in batches of ``batch_size``, each in its own short
+transaction, so ingest and queries on recent data are never blocked for
+long. When the table is partitioned, whole months that every sensor's cutoff
+has passed are dropped instead.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from apps.sensors.models import Sensor
+
+from .aggregation import floor_timestamp
+from .models import Reading, ReadingRollup
+from .partitions import Partition, drop_partitions_before, is_partitioned, month_start
+from .rollups import rebuild_rollups
+
+WINDOW_DAYS = 7
+
+
+def retention_cutoffs(
+    sensor_ids: Optional[Iterable[int]] = None,
+    days: Optional[int] = None,
+    now: Optional[datetime] = None,
+) -> Dict[int, datetime]:
+    """
+    Map each sensor id to the start of the day before which its raw readings
+    expire. ``days`` overrides every sensor's policy. Sensors whose retention
+    resolves to 0 keep their readings forever and are left out.
+    """
+    now = now or datetime.now(dt_timezone.utc)
+    sensors = Sensor.objects.order_by("id").values_list("id", "retention_days")
+    if sensor_ids is not None:
+        sensors = sensors.filter(id__in=list(sensor_ids))
+
+    cutoffs = {}
+    for sensor_id, retention_days in sensors:
+        keep = days if days is not None else retention_days
+        if keep is None:
+            keep = settings.READINGS_RETENTION_DAYS
+        if keep:
+            cutoffs[sensor_id] = floor_timestamp(
+                now - timedelta(days=keep), ReadingRollup.DAY
+            )
+    return cutoffs
+
+
+def compact_sensor(
+    sensor_id: int, cutoff: datetime, batch_size: int, rebuild: bool = False
+) -> int:
+    """
+    Delete a sensor's raw readings and minute rollups older than ``cutoff``
+    and return the number of readings deleted.
+
+    Works forward from the oldest reading one ``WINDOW_DAYS`` window at a
+    time, so each batch only touches a narrow time range.
+    """
+    expired = Reading.objects.filter(sensor_id=sensor_id, timestamp__lt=cutoff)
+    oldest = expired.order_by("timestamp").values_list("timestamp", flat=True).first()
+
+    deleted = 0
+    start = floor_timestamp(oldest, ReadingRollup.DAY) if oldest else cutoff
+    while start < cutoff:
+        end = min(start + timedelta(days=WINDOW_DAYS), cutoff)
+        if rebuild:
+            rebuild_rollups(sensor_id, start, end)
+        window = expired.filter(timestamp__gte=start, timestamp__lt=end)
+        while ids := list(window.values_list("id", flat=True)[:batch_size]):
+            # Keep the time bounds so PostgreSQL only visits one partition
+            deleted += window.filter(id__in=ids).delete()[0]
+        start = end
+
+    ReadingRollup.objects.filter(
+        sensor_id=sensor_id,
+        resolution=ReadingRollup.MINUTE,
+        bucket_start__lt=cutoff,
+    ).delete()
+    return deleted
+
+
+def drop_expired_partitions(
+    cutoffs: Dict[int, datetime], before: Optional[datetime] = None
+) -> List[Partition]:
+    """
+    Drop the monthly partitions that end before every sensor's cutoff, and
+    before ``before`` when given, along with the minute rollups of their
+    months.
+
+    Sensors that keep their readings forever block dropping entirely, as
+    does any sensor with no cutoff in ``cutoffs`` when it has readings.
+    """
+    if not cutoffs or not is_partitioned():
+        return []
+    if Sensor.objects.exclude(id__in=list(cutoffs)).exists():
+        return []
+    cutoff = month_start(min(cutoffs.values()))
+    if before is not None:
+        cutoff = min(cutoff, before)
+
+    with transaction.atomic():
+        dropped = drop_partitions_before(cutoff)
+        months = Q()
+        for partition in dropped:
+            months |= Q(
+                bucket_start__gte=partition.start, bucket_start__lt=partition.end
+            )
+        if dropped:
+            ReadingRollup.objects.filter(
+                months, resolution=ReadingRollup.MINUTE
+            ).delete()
+    return dropped
+
+
+def table_size() -> Optional[int]:
+    """
+    Bytes on disk used by raw readings: every partition with its indexes and
+    TOAST on PostgreSQL, the whole database file on SQLite.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT coalesce(sum(pg_total_relation_size(relid)), 0) "
+                "FROM pg_partition_tree(%s::regclass)",
+                [Reading._meta.db_table],
+            )
+        elif connection.vendor == "sqlite":
+            cursor.execute(
+                "SELECT page_count * page_size "
+                "FROM pragma_page_count(), pragma_page_size()"
+            )
+        else:
+            return None
+        return cursor.fetchone()[0]
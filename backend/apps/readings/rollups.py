@@ -0,0 +1,195 @@
+import itertools
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .aggregation import (
+    PARTIAL_FIELDS,
+    ceil_timestamp,
+    floor_timestamp,
+    raw_partials,
+    rollup_partials,
+)
+from .models import Reading, ReadingRollup
+
+
+def _partials(readings: Iterable[Reading], resolution: int) -> dict:
+    buckets = {}
+    for reading in readings:
+        key = (reading.sensor_id, floor_timestamp(reading.timestamp, resolution))
+        t, h = reading.temperature, reading.humidity
+        current = buckets.get(key)
+        if current is None:
+            buckets[key] = [1, t, t, t, h, h, h]
+            continue
+        current[0] += 1
+        current[1] += t
+        current[2] = min(current[2], t)
+        current[3] = max(current[3], t)
+        current[4] += h
+        current[5] = min(current[5], h)
+        current[6] = max(current[6], h)
+    return buckets
+
+
+def _upsert_sql() -> str:
+    quote = connection.ops.quote_name
+    table = quote(ReadingRollup._meta.db_table)
+    if connection.vendor == "postgresql":
+        least, greatest = "LEAST", "GREATEST"
+    else:
+        least, greatest = "MIN", "MAX"
+
+    updates = []
+    for field in PARTIAL_FIELDS:
+        column = quote(field)
+        if field.endswith("_min"):
+            expression = f"{least}({table}.{column}, EXCLUDED.{column})"
+        elif field.endswith("_max"):
+            expression = f"{greatest}({table}.{column}, EXCLUDED.{column})"
+        else:
+            expression = f"{table}.{column} + EXCLUDED.{column}"
+        updates.append(f"{column} = {expression}")
+
+    columns = ", ".join(
+        quote(name) for name in ("sensor_id", "resolution", "bucket_start")
+    )
+    columns += ", " + ", ".join(quote(field) for field in PARTIAL_FIELDS)
+    placeholders = ", ".join(["%s"] * (3 + len(PARTIAL_FIELDS)))
+    return (
+        f"INSERT INTO {table} ({columns}) VALUES ({placeholders}) "
+        f"ON CONFLICT ({quote('sensor_id')}, {quote('resolution')}, "
+        f"{quote('bucket_start')}) DO UPDATE SET {', '.join(updates)}"
+    )
+
+
+def apply_readings(readings: Iterable[Reading]):
+    """
+    Fold newly inserted readings into every rollup resolution with one
+    additive upsert statement per resolution.
+    """
+    readings = list(readings)
+    if not readings:
+        return
+
+    sql = _upsert_sql()
+    adapt = connection.ops.adapt_datetimefield_value
+    with connection.cursor() as cursor:
+        for resolution in ReadingRollup.RESOLUTIONS:
+            cursor.executemany(
+                sql,
+                [
+                    (sensor_id, resolution, adapt(bucket_start), *values)
+                    for (sensor_id, bucket_start), values in _partials(
+                        readings, resolution
+                    ).items()
+                ],
+            )
+
+
+def _replace(sensor_id: int, resolution: int, start, end, rows):
+    existing = ReadingRollup.objects.filter(sensor_id=sensor_id, resolution=resolution)
+    if start:
+        existing = existing.filter(bucket_start__gte=start)
+    if end:
+        existing = existing.filter(bucket_start__lt=end)
+    existing.delete()
+
+    rollups = (
+        ReadingRollup(
+            sensor_id=sensor_id,
+            resolution=resolution,
+            bucket_start=row["bucket"],
+            **{field: row[f"agg_{field}"] for field in PARTIAL_FIELDS},
+        )
+        for row in rows.iterator()
+    )
+    batch_size = settings.READINGS_BULK_BATCH_SIZE
+    while batch := list(itertools.islice(rollups, batch_size)):
+        ReadingRollup.objects.bulk_create(batch)
+
+
+def compacted_until(sensor_id: int) -> Optional[datetime]:
+    """
+    The day up to which a sensor's raw readings were compacted away, or None.
+
+    Compaction deletes raw readings with their minute rollups and keeps the
+    hour and day rollups, so days with a day rollup before the first minute
+    rollup are all that is left of compacted readings.
+    """
+    rollups = ReadingRollup.objects.filter(sensor_id=sensor_id)
+    first_minute = (
+        rollups.filter(resolution=ReadingRollup.MINUTE)
+        .order_by("bucket_start")
+        .values_list("bucket_start", flat=True)
+        .first()
+    )
+    days = rollups.filter(resolution=ReadingRollup.DAY)
+    if first_minute is not None:
+        days = days.filter(
+            bucket_start__lt=floor_timestamp(first_minute, ReadingRollup.DAY)
+        )
+    last_day = (
+        days.order_by("-bucket_start").values_list("bucket_start", flat=True).first()
+    )
+    if last_day is None:
+        return None
+    return last_day + timedelta(seconds=ReadingRollup.DAY)
+
+
+def rebuild_rollups(sensor_id: int, start=None, end=None):
+    """
+    Recompute a sensor's rollups in ``[start, end)`` from its raw readings.
+
+    The bounds are widened to whole days so every resolution covers the same
+    span. Minute rollups come from raw readings and each coarser resolution is
+    derived from the one below it. Days before ``compacted_until`` are left
+    alone: their raw readings are gone and their rollups cannot be rebuilt.
+    """
+    if start:
+        start = floor_timestamp(start, ReadingRollup.DAY)
+    if end:
+        end = ceil_timestamp(end, ReadingRollup.DAY)
+    compacted = compacted_until(sensor_id)
+    if compacted is not None and (start is None or start < compacted):
+        start = compacted
+    if start and end and start >= end:
+        return
+
+    readings = Reading.objects.filter(sensor_id=sensor_id)
+    if start:
+        readings = readings.filter(timestamp__gte=start)
+    if end:
+        readings = readings.filter(timestamp__lt=end)
+
+    finest, *coarser = ReadingRollup.RESOLUTIONS
+    with transaction.atomic():
+        _replace(sensor_id, finest, start, end, raw_partials(readings, finest))
+        previous = finest
+        for resolution in coarser:
+            source = ReadingRollup.objects.filter(
+                sensor_id=sensor_id, resolution=previous
+            )
+            if start:
+                source = source.filter(bucket_start__gte=start)
+            if end:
+                source = source.filter(bucket_start__lt=end)
+            _replace(
+                sensor_id, resolution, start, end, rollup_partials(source, resolution)
+            )
+            previous = resolution
+
+
+def rebuild_replaced(readings: Iterable[Reading]):
+    """Rebuild the days touched by readings that overwrote existing rows"""
+    spans = defaultdict(list)
+    for reading in readings:
+        spans[reading.sensor_id].append(reading.timestamp)
+    for sensor_id, timestamps in spans.items():
+        end = floor_timestamp(max(timestamps), ReadingRollup.DAY)
+        rebuild_rollups(
+            sensor_id, min(timestamps), end + timedelta(seconds=ReadingRollup.DAY)
+        )
@@ -0,0 +1,8 @@
+from django.dispatch import Signal
+
+# Sent inside the writing transaction after readings have been stored,
+# whichever path wrote them. Receivers get ``readings``, the newly inserted
+# ``Reading`` instances, and ``replaced``, readings that overwrote an existing
+# ``(sensor, timestamp)`` row. Instances always carry ``sensor_id``,
+# ``timestamp``, ``temperature`` and ``humidity`` but may lack a primary key.
+readings_created = Signal()
@@ -0,0 +1,386 @@
+"""
+In-process fan-out of newly written readings to live subscribers.
+
+Every write path sends ``readings_created``; the ``publish_readings``
+receiver hands the committed readings to ``hub``, which copies them into a
+bounded queue per subscriber. A subscriber that falls behind loses its oldest
+messages rather than holding up the writer or growing without bound.
+
+With ``READINGS_STREAM_BACKEND = "postgres"`` readings are sent with
+``pg_notify`` instead, and a listener thread in each process republishes
+them to its local hub, so a stream opened on one worker sees writes made on
+any other. Each process holds a shared advisory lock per sensor it streams,
+and writers only notify about sensors whose lock someone holds: ``NOTIFY``
+serializes every committing transaction, so writes nobody watches skip it.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections, transaction
+
+from .export import iso_timestamp
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "readings"
+# NOTIFY payloads are limited to 8000 bytes; a reading encodes to ~120
+NOTIFY_BATCH_SIZE = 50
+# Advisory locks marking streamed sensors take one bigint key, this tag in the
+# top 16 bits and the sensor id below it, so ids must stay under 2**48
+WATCH_LOCK_KEY = 0x5354
+WATCH_ID_BITS = 48
+LISTEN_MAX_BACKOFF = 60.0
+
+
+class Subscription:
+    """A bounded queue of messages for one stream, dropping the oldest when full"""
+
+    def __init__(self, hub: "Hub", sensor_id: int, maxsize: int):
+        self.hub = hub
+        self.sensor_id = sensor_id
+        self.dropped = 0
+        self._queue: deque = deque(maxlen=maxsize)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_ready: Optional[asyncio.Event] = None
+
+    def put(self, messages: Iterable[dict]):
+        with self._lock:
+            for message in messages:
+                if len(self._queue) == self._queue.maxlen:
+                    self.dropped += 1
+                self._queue.append(message)
+        self._ready.set()
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._async_ready.set)
+            except RuntimeError:
+                # The stream's event loop has shut down without closing it
+                self.close()
+
+    def drain(self) -> List[dict]:
+        with self._lock:
+            self._ready.clear()
+            if self._async_ready is not None:
+                self._async_ready.clear()
+            messages = list(self._queue)
+            self._queue.clear()
+        return messages
+
+    def get(self, timeout: float) -> List[dict]:
+        """Wait up to ``timeout`` seconds for messages and return all of them"""
+        self._ready.wait(timeout)
+        return self.drain()
+
+    async def aget(self, timeout: float) -> List[dict]:
+        """Async version of ``get`` that does not block the event loop"""
+        if self._loop is None:
+            self._async_ready = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+            if self._queue:
+                self._async_ready.set()
+        try:
+            await asyncio.wait_for(self._async_ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.drain()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+    """Routes published messages to the subscriptions of each sensor"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._subscriptions: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, sensor_id: int) -> Subscription:
+        subscription = Subscription(self, sensor_id, self.maxsize)
+        with self._lock:
+            self._subscriptions[sensor_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.sensor_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.sensor_id]
+
+    def has_subscribers(self, sensor_id: int) -> bool:
+        return sensor_id in self._subscriptions
+
+    def publish(self, sensor_id: int, messages: List[dict]):
+        with self._lock:
+            subscribers = list(self._subscriptions.get(sensor_id, ()))
+        for subscription in subscribers:
+            subscription.put(messages)
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscribers = [s for group in self._subscriptions.values() for s in group]
+        return {
+            "sensors": len({s.sensor_id for s in subscribers}),
+            "subscribers": len(subscribers),
+            "dropped": sum(s.dropped for s in subscribers),
+        }
+
+
+hub = Hub(settings.READINGS_STREAM_QUEUE_SIZE)
+
+
+def reading_message(reading) -> dict:
+    return {
+        "id": reading.pk,
+        "sensor_id": reading.sensor_id,
+        "timestamp": iso_timestamp(reading.timestamp),
+        "temperature": reading.temperature,
+        "humidity": reading.humidity,
+    }
+
+
+def publish(readings: Iterable):
+    """
+    Publish readings once the surrounding transaction commits.
+
+    Called from inside the writing transaction, so subscribers never see
+    readings that are later rolled back.
+    """
+    by_sensor = defaultdict(list)
+    for reading in readings:
+        by_sensor[reading.sensor_id].append(reading)
+    postgres = settings.READINGS_STREAM_BACKEND == "postgres"
+    if postgres:
+        watched = _watched(by_sensor) if by_sensor else set()
+    else:
+        watched = {
+            sensor_id for sensor_id in by_sensor if hub.has_subscribers(sensor_id)
+        }
+    if not watched:
+        return
+    grouped = {
+        sensor_id: [reading_message(reading) for reading in by_sensor[sensor_id]]
+        for sensor_id in watched
+    }
+
+    if postgres:
+        # NOTIFY is transactional: it is only delivered if the write commits
+        _notify(grouped)
+        return
+
+    def deliver():
+        for sensor_id, messages in grouped.items():
+            hub.publish(sensor_id, messages)
+
+    transaction.on_commit(deliver, robust=True)
+
+
+def _watch_key(sensor_id: int) -> int:
+    return WATCH_LOCK_KEY << WATCH_ID_BITS | sensor_id
+
+
+def _watched(sensor_ids: Iterable[int]) -> Set[int]:
+    """The sensors some process streams, from the advisory locks it holds"""
+    # pg_locks splits a bigint key into its high (classid) and low (objid)
+    # 32 bits and marks it with objsubid = 1
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT DISTINCT (classid::bigint << 32 | objid::bigint) FROM pg_locks "
+            "WHERE locktype = 'advisory' AND granted AND objsubid = 1 "
+            "AND database = (SELECT oid FROM pg_database "
+            "WHERE datname = current_database()) "
+            "AND (classid::bigint << 32 | objid::bigint) = ANY(%s)",
+            [[_watch_key(sensor_id) for sensor_id in sensor_ids]],
+        )
+        mask = (1 << WATCH_ID_BITS) - 1
+        return {key & mask for (key,) in cursor.fetchall()}
+
+
+def _notify(grouped: Dict[int, List[dict]]):
+    payloads = [
+        json.dumps([sensor_id, messages[start : start + NOTIFY_BATCH_SIZE]])
+        for sensor_id, messages in grouped.items()
+        for start in range(0, len(messages), NOTIFY_BATCH_SIZE)
+    ]
+    with connection.cursor() as cursor:
+        for payload in payloads:
+            cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, payload])
+
+
+def _connect():
+    """A connection of its own: session locks and LISTEN would hold a pooled one"""
+    wrapper = connections["default"]
+    return wrapper.Database.connect(**wrapper.get_connection_params(), autocommit=True)
+
+
+class Watches:
+    """The advisory locks of the sensors this process streams"""
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def add(self, sensor_id: int):
+        with self._lock:
+            self._counts[sensor_id] += 1
+            if self._counts[sensor_id] == 1:
+                self._execute("SELECT pg_advisory_lock_shared(%s)", sensor_id)
+
+    def discard(self, sensor_id: int):
+        with self._lock:
+            self._counts[sensor_id] -= 1
+            if self._counts[sensor_id] <= 0:
+                del self._counts[sensor_id]
+                self._execute("SELECT pg_advisory_unlock_shared(%s)", sensor_id)
+
+    def restore(self):
+        """Take the locks again on a new connection if the old one broke"""
+        with self._lock:
+            if self._connection is None or self._connection.broken:
+                self._reconnect()
+
+    def _execute(self, sql: str, sensor_id: int):
+        # A new connection takes the locks of the counted sensors by itself
+        try:
+            if self._connection is None or self._connection.broken:
+                self._reconnect()
+            else:
+                self._connection.execute(sql, [_watch_key(sensor_id)])
+        except Exception:
+            # The listener calls ``restore`` when it reconnects
+            logger.exception(
+                "Could not update the stream watch of sensor %s", sensor_id
+            )
+
+    def _reconnect(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        if not self._counts:
+            return
+        raw = _connect()
+        for sensor_id in self._counts:
+            raw.execute("SELECT pg_advisory_lock_shared(%s)", [_watch_key(sensor_id)])
+        self._connection = raw
+
+
+watches = Watches()
+_listener: Optional[threading.Thread] = None
+_listener_lock = threading.Lock()
+
+
+def ensure_listener():
+    """Start this process's ``LISTEN`` thread when the postgres backend is on"""
+    global _listener
+    if settings.READINGS_STREAM_BACKEND != "postgres":
+        return
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(
+                target=_listen, name="readings-listener", daemon=True
+            )
+            _listener.start()
+
+
+def _listen():
+    """Relay notifications to the hub, reconnecting with backoff when they stop"""
+    delay = 1.0
+    while True:
+        try:
+            raw = _connect()
+        except Exception:
+            logger.exception("Readings listener could not connect")
+        else:
+            try:
+                raw.execute(f"LISTEN {CHANNEL}")
+                watches.restore()
+                delay = 1.0
+                for notify in raw.notifies():
+                    sensor_id, messages = json.loads(notify.payload)
+                    hub.publish(sensor_id, messages)
+            except Exception:
+                logger.exception("Readings listener stopped")
+            finally:
+                raw.close()
+        logger.warning("Restarting the readings listener in %.0fs", delay)
+        time.sleep(delay)
+        delay = min(delay * 2, LISTEN_MAX_BACKOFF)
+
+
+def _subscribe(sensor_id: int) -> Subscription:
+    subscription = hub.subscribe(sensor_id)
+    if settings.READINGS_STREAM_BACKEND == "postgres":
+        watches.add(sensor_id)
+    return subscription
+
+
+def _unsubscribe(subscription: Subscription):
+    subscription.close()
+    if settings.READINGS_STREAM_BACKEND == "postgres":
+        watches.discard(subscription.sensor_id)
+
+
+def format_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _frames(messages: List[dict], dropped: int) -> Iterator[str]:
+    if dropped:
+        yield format_event("dropped", {"count": dropped})
+    if messages:
+        yield format_event("readings", messages)
+    elif not dropped:
+        # Comment line: keeps proxies from closing an idle connection
+        yield ": heartbeat\n\n"
+
+
+def iter_events(sensor_id: int, heartbeat: float) -> Iterator[str]:
+    """
+    Subscribe to a sensor and yield SSE frames until the client disconnects.
+
+    New readings arrive as ``readings`` events holding a list; a ``dropped``
+    event tells the client that it fell behind and should refetch the range.
+    The subscription is made on the first iteration, so a response that is
+    never consumed leaves nothing behind.
+    """
+    ensure_listener()
+    subscription = _subscribe(sensor_id)
+    try:
+        yield ": connected\n\n"
+        reported = 0
+        while True:
+            messages = subscription.get(heartbeat)
+            dropped, reported = subscription.dropped - reported, subscription.dropped
+            yield from _frames(messages, dropped)
+    finally:
+        _unsubscribe(subscription)
+
+
+async def aiter_events(sensor_id: int, heartbeat: float) -> AsyncIterator[str]:
+    """Async version of ``iter_events``"""
+    ensure_listener()
+    subscription = await sync_to_async(_subscribe)(sensor_id)
+    try:
+        yield ": connected\n\n"
+        reported = 0
+        while True:
+            messages = await subscription.aget(heartbeat)
+            dropped, reported = subscription.dropped - reported, subscription.dropped
+            for frame in _frames(messages, dropped):
+                yield frame
+    finally:
+        await sync_to_async(_unsubscribe)(subscription)
@@ -0,0 +1,377 @@
+"""
+Async versions of the sensor and reading endpoints, served when the API runs
+under ASGI (see ``config/asgi.py``).
+
+Routes, parameters and responses match ``apps.sensors.api``. Reads and simple
+writes use the async ORM so a request waiting on the database does not hold
+a worker thread. Work that needs a transaction (ingest, rollup-backed
+aggregation) is delegated to the sync helpers with ``sync_to_async``.
+Validation, pagination and response building come from
+``apps.sensors.endpoints``, shared with the sync router.
+"""
+
+from asgiref.sync import sync_to_async
+from ninja import Query, Router
+from django.http import Http404
+from django.conf import settings
+from typing import List, Literal, Optional
+from dataclasses import asdict
+from datetime import datetime
+from .models import Sensor
+from apps.auth.schemas import ErrorResponse
+from apps.readings.ingest import ingest_readings, record_reading
+from apps.readings.packed import CONTENT_TYPE as PACKED_CONTENT_TYPE, ingest_packed
+from apps.readings import stream
+from apps.readings.export import aiter_export
+from apps.readings.aggregation import bucket_readings, parse_aggregates, parse_bucket
+from apps.readings.overview import overview_to_dict
+from .schemas import (
+    SensorCreate,
+    SensorUpdate,
+    SensorOut,
+    SensorPageOut,
+    SensorOverviewPageOut,
+    ReadingCreate,
+    ReadingOut,
+    ReadingQueuedOut,
+    SensorReadingCreate,
+    ReadingBatchOut,
+    ReadingBucketOut,
+    ReadingPageOut,
+)
+from .auth import AsyncAuthBearer, AsyncTokenQuery
+from .caching import cache_response, readings_scope
+from .endpoints import (
+    DOWNSAMPLE_MIN_POINTS,
+    PACKED_BATCH_OPENAPI,
+    accepts_msgpack,
+    aowned_sensor_id,
+    batch_body,
+    batch_too_large,
+    buffer_reading,
+    columns_response,
+    downsample_range,
+    export_response,
+    export_rows,
+    ingest_buffer_stats,
+    overview_page,
+    reading_pages,
+    readings_in_range,
+    sensor_pages,
+    stream_response,
+)
+from .search import filter_sensors, rank_sensors
+from .serializers import (
+    COLUMNAR_FIELDS,
+    READING_FIELDS,
+    SENSOR_FIELDS,
+    reading_to_dict,
+    sensor_to_dict,
+)
+
+router = Router()
+auth = AsyncAuthBearer()
+
+
+async def _get_sensor(request, sensor_id: int) -> Sensor:
+    try:
+        return await Sensor.objects.aget(id=sensor_id, owner=request.auth)
+    except Sensor.DoesNotExist:
+        raise Http404("No Sensor matches the given query.")
+
+
+@router.get("/", response=SensorPageOut, auth=auth)
+async def list_sensors(
+    request,
+    q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+):
+    """List all sensors with optional search by name or model"""
+    sensors = Sensor.objects.filter(owner=request.auth)
+
+    if q:
+        sensors = filter_sensors(sensors, q)
+
+    items, next_cursor = await sensor_pages.apage(
+        sensors.values(*SENSOR_FIELDS), cursor, limit
+    )
+    return {"items": items, "next": next_cursor}
+
+
+@router.post("/", response={201: SensorOut}, auth=auth)
+async def create_sensor(request, data: SensorCreate):
+    """Create a new sensor"""
+    sensor = await Sensor.objects.acreate(
+        owner=request.auth,
+        name=data.name,
+        model=data.model,
+        description=data.description,
+        retention_days=data.retention_days,
+    )
+    return 201, sensor_to_dict(sensor)
+
+
+@router.get("/search/", response=List[SensorOut], auth=auth)
+async def search_sensors(
+    request,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(
+        settings.SENSORS_PAGE_SIZE, ge=1, le=settings.SENSORS_MAX_PAGE_SIZE
+    ),
+):
+    """Find sensors by name or model, best matches first"""
+    sensors = rank_sensors(Sensor.objects.filter(owner=request.auth), q)
+    return [row async for row in sensors.values(*SENSOR_FIELDS)[:limit]]
+
+
+@router.get("/overview/", response=SensorOverviewPageOut, auth=auth)
+async def sensor_overview(
+    request,
+    q: Optional[str] = None,
+    hours: int = Query(24, ge=1, le=24 * 7),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+):
+    """List sensors with their latest reading and statistics over recent hours"""
+    sensors = Sensor.objects.filter(owner=request.auth)
+
+    if q:
+        sensors = filter_sensors(sensors, q)
+
+    rows, next_cursor = await sync_to_async(overview_page)(
+        sensors, hours, cursor, limit
+    )
+    return {
+        "items": [overview_to_dict(row, SENSOR_FIELDS) for row in rows],
+        "next": next_cursor,
+    }
+
+
+@router.get("/{sensor_id}/", response=SensorOut, auth=auth)
+@cache_response(SensorOut)
+async def get_sensor(request, sensor_id: int):
+    """Get sensor details"""
+    return sensor_to_dict(await _get_sensor(request, sensor_id))
+
+
+@router.put("/{sensor_id}/", response=SensorOut, auth=auth)
+async def update_sensor(request, sensor_id: int, data: SensorUpdate):
+    """Update sensor"""
+    sensor = await _get_sensor(request, sensor_id)
+
+    for key, value in data.dict(exclude_unset=True).items():
+        setattr(sensor, key, value)
+
+    await sensor.asave()
+    return sensor_to_dict(sensor)
+
+
+@router.delete("/{sensor_id}/", response={204: None}, auth=auth)
+async def delete_sensor(request, sensor_id: int):
+    """Delete sensor and all its readings"""
+    sensor = await _get_sensor(request, sensor_id)
+    await sensor.adelete()
+    return 204, None
+
+
+@router.get(
+    "/{sensor_id}/readings/",
+    response={200: ReadingPageOut, 400: ErrorResponse},
+    auth=auth,
+)
+@cache_response(ReadingPageOut, readings_scope)
+async def list_readings(
+    request,
+    sensor_id: int,
+    timestamp_from: Optional[datetime] = None,
+    timestamp_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    layout: Literal["rows", "columnar"] = "rows",
+    max_points: Optional[int] = Query(
+        None, ge=DOWNSAMPLE_MIN_POINTS, le=settings.READINGS_MAX_POINTS
+    ),
+    method: Literal["lttb", "minmax"] = "lttb",
+):
+    """List readings for a sensor with optional date range filter"""
+    sensor_id = await aowned_sensor_id(request, sensor_id)
+    readings = readings_in_range(sensor_id, timestamp_from, timestamp_to)
+    wants_msgpack = accepts_msgpack(request)
+    columnar = layout == "columnar" or wants_msgpack
+
+    if max_points:
+        fields = COLUMNAR_FIELDS if columnar else READING_FIELDS
+        rows, error = await sync_to_async(downsample_range)(
+            readings, fields, max_points, method
+        )
+        if error:
+            return error
+        next_cursor = None
+        if not columnar:
+            items = [dict(zip(READING_FIELDS, row)) for row in rows]
+            return {"items": items, "next": None}
+    elif not columnar:
+        items, next_cursor = await reading_pages.apage(
+            readings.values(*READING_FIELDS), cursor, limit
+        )
+        return {"items": items, "next": next_cursor}
+    else:
+        rows, next_cursor = await reading_pages.apage(
+            readings.values_list(*COLUMNAR_FIELDS),
+            cursor,
+            limit,
+            key=lambda row: (row[1], row[0]),
+        )
+    return columns_response(sensor_id, rows, next_cursor, wants_msgpack)
+
+
+@router.post(
+    "/{sensor_id}/readings/",
+    response={
+        201: ReadingOut,
+        202: ReadingQueuedOut,
+        400: ErrorResponse,
+        503: ErrorResponse,
+    },
+    auth=auth,
+)
+async def create_reading(request, sensor_id: int, data: ReadingCreate):
+    """Create a new reading for a sensor"""
+    sensor_id = await aowned_sensor_id(request, sensor_id)
+    if settings.READINGS_BUFFER_ENABLED:
+        # Off the shared ORM thread: waiting for a journal sync or a group
+        # commit must not stall other requests' queries
+        return await sync_to_async(buffer_reading, thread_sensitive=False)(
+            sensor_id, data
+        )
+
+    reading = await sync_to_async(record_reading)(
+        sensor_id,
+        temperature=data.temperature,
+        humidity=data.humidity,
+        timestamp=data.timestamp,
+    )
+    return 201, reading_to_dict(reading)
+
+
+@router.get("/readings/buffer/", auth=auth)
+async def buffer_stats(request):
+    """Queue depth and flush timings of this process's ingest buffer"""
+    return ingest_buffer_stats()
+
+
+@router.post(
+    "/{sensor_id}/readings/batch/",
+    response={200: ReadingBatchOut, 400: ErrorResponse},
+    auth=auth,
+    openapi_extra=PACKED_BATCH_OPENAPI,
+)
+async def create_readings_batch(
+    request,
+    sensor_id: int,
+    data: Optional[List[ReadingCreate]] = None,
+    on_conflict: Literal["ignore", "update"] = "ignore",
+):
+    """
+    Create many readings for a sensor in one round trip.
+
+    Besides a JSON list, the body can be packed ``application/x-sensor-batch``
+    records (see ``apps.readings.packed``), which skip JSON and schema parsing.
+    """
+    sensor_id = await aowned_sensor_id(request, sensor_id)
+    data, error = batch_body(request, data)
+    if error:
+        return error
+    if request.content_type == PACKED_CONTENT_TYPE:
+        result = await sync_to_async(ingest_packed)(
+            sensor_id, data, on_conflict=on_conflict
+        )
+        return asdict(result)
+
+    result = await sync_to_async(ingest_readings)(
+        [(sensor_id, item) for item in data], {sensor_id}, on_conflict=on_conflict
+    )
+    return asdict(result)
+
+
+@router.post(
+    "/readings/batch/",
+    response={200: ReadingBatchOut, 400: ErrorResponse},
+    auth=auth,
+)
+async def create_readings_batch_multi(
+    request,
+    data: List[SensorReadingCreate],
+    on_conflict: Literal["ignore", "update"] = "ignore",
+):
+    """Create readings for several sensors in one round trip"""
+    error = batch_too_large(len(data))
+    if error:
+        return error
+
+    owned = {
+        pk
+        async for pk in Sensor.objects.filter(
+            owner=request.auth, id__in={item.sensor_id for item in data}
+        ).values_list("id", flat=True)
+    }
+    result = await sync_to_async(ingest_readings)(
+        [(item.sensor_id, item) for item in data], owned, on_conflict=on_conflict
+    )
+    return asdict(result)
+
+
+@router.get(
+    "/{sensor_id}/readings/aggregate/",
+    response={200: List[ReadingBucketOut], 400: ErrorResponse},
+    auth=auth,
+    exclude_none=True,
+)
+@cache_response(List[ReadingBucketOut], readings_scope, exclude_none=True)
+async def aggregate_readings(
+    request,
+    sensor_id: int,
+    bucket: str = "1h",
+    agg: str = "avg,min,max,count",
+    timestamp_from: Optional[datetime] = None,
+    timestamp_to: Optional[datetime] = None,
+):
+    """Aggregate temperature and humidity into fixed time buckets"""
+    sensor_id = await aowned_sensor_id(request, sensor_id)
+    try:
+        seconds = parse_bucket(bucket)
+        aggregates = parse_aggregates(agg)
+    except ValueError as e:
+        return 400, {"detail": str(e)}
+
+    return await sync_to_async(bucket_readings)(
+        sensor_id, seconds, aggregates, timestamp_from, timestamp_to
+    )
+
+
+@router.get("/{sensor_id}/readings/export/", auth=auth)
+async def export_readings(
+    request,
+    sensor_id: int,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    timestamp_from: Optional[datetime] = None,
+    timestamp_to: Optional[datetime] = None,
+):
+    """Stream all readings in a range as NDJSON or CSV"""
+    sensor_id = await aowned_sensor_id(request, sensor_id)
+    rows = export_rows(sensor_id, timestamp_from, timestamp_to)
+    return export_response(
+        sensor_id,
+        format,
+        aiter_export(rows, format, settings.READINGS_EXPORT_CHUNK_SIZE),
+    )
+
+
+@router.get("/{sensor_id}/readings/stream/", auth=[auth, AsyncTokenQuery()])
+async def stream_readings(request, sensor_id: int):
+    """Push readings to the client as Server-Sent Events as they are written"""
+    sensor_id = await aowned_sensor_id(request, sensor_id)
+    return stream_response(
+        stream.aiter_events(sensor_id, settings.READINGS_STREAM_HEARTBEAT)
+    )
@@ -1,10 +1,44 @@
-from ninja.security import HttpBearer
-from apps.auth.utils import get_user_from_token
+from ninja.security import APIKeyQuery, HttpBearer
+from apps.auth.utils import aget_user_from_token, get_user_from_token
+from apps.metrics.instrumentation import phase
 
 
 class AuthBearer(HttpBearer):
     def authenticate(self, request, token):
-        user = get_user_from_token(token)
+        with phase("auth"):
+            user = get_user_from_token(token)
         if user:
             return user
         return None
+
+
+class AsyncAuthBearer(HttpBearer):
+    async def authenticate(self, request, token):
+        with phase("auth"):
+            user = await aget_user_from_token(token)
+        if user:
+            return user
+        return None
+
+
+class TokenQuery(APIKeyQuery):
+    """
+    Bearer token passed as ``?token=``, for clients such as ``EventSource``
+    that cannot set an Authorization header.
+    """
+
+    param_name = "token"
+
+    def authenticate(self, request, key):
+        if key:
+            return get_user_from_token(key)
+        return None
+
+
+class AsyncTokenQuery(APIKeyQuery):
+    param_name = "token"
+
+    async def authenticate(self, request, key):
+        if key:
+            return await aget_user_from_token(key)
+        return None
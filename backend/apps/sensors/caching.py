@@ -0,0 +1,188 @@
+"""
+Response cache and conditional GET for sensor and reading endpoints.
+
+``cache_response`` wraps a view whose output depends only on the requesting
+owner, the URL and one sensor's data. Every response gets an ``ETag``
+derived from those and from a version counter per sensor kept in the
+``SENSORS_CACHE_ALIAS`` cache. A request whose ``If-None-Match`` matches
+gets ``304`` and a request for a response already in the cache gets the
+stored bytes. Neither case runs a query or serializes anything.
+
+Each sensor has two counters:
+
+- ``live`` is bumped by every write to its readings and by changes to the
+  sensor row.
+- ``history`` is only bumped by changes to the sensor row and by writes of
+  readings older than ``SENSORS_CACHE_LIVE_WINDOW`` seconds.
+
+A range that ended before that window uses ``history``, so closed ranges
+stay cached while new readings keep arriving. A write that could change
+such a range is necessarily older than the window, so it bumps
+``history``.
+
+Counters start from a timestamp instead of 0, so a counter that was
+evicted never returns to a value whose responses are still cached.
+Management commands write through the same cache, so it must be shared
+(Redis) when several processes serve the API or write readings.
+"""
+
+import asyncio
+import functools
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.crypto import salted_hmac
+from django.utils.http import parse_etags
+from pydantic import TypeAdapter
+
+from apps.readings.ingest import normalize_timestamp
+
+LIVE = "live"
+HISTORY = "history"
+
+
+def _cache():
+    return caches[settings.SENSORS_CACHE_ALIAS]
+
+
+def _version_key(sensor_id: int, scope: str) -> str:
+    return f"sensor-version:{sensor_id}:{scope}"
+
+
+def sensor_version(sensor_id: int, scope: str) -> int:
+    cache = _cache()
+    key = _version_key(sensor_id, scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_versions(sensor_ids: Iterable[int], history: bool = False):
+    """Invalidate cached responses of ``sensor_ids``; ``history`` includes closed ranges"""
+    if not settings.SENSORS_CACHE_ENABLED:
+        return
+    cache = _cache()
+    scopes = (LIVE, HISTORY) if history else (LIVE,)
+    for sensor_id in set(sensor_ids):
+        for scope in scopes:
+            key = _version_key(sensor_id, scope)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, time.time_ns(), None)
+
+
+def live_since() -> datetime:
+    """Readings at or after this time may only change live responses"""
+    return datetime.now(dt_timezone.utc) - timedelta(
+        seconds=settings.SENSORS_CACHE_LIVE_WINDOW
+    )
+
+
+def readings_scope(kwargs) -> str:
+    """Closed ranges depend on ``history``, anything reaching the present on ``live``"""
+    timestamp_to = kwargs.get("timestamp_to")
+    if timestamp_to and normalize_timestamp(timestamp_to) < live_since():
+        return HISTORY
+    return LIVE
+
+
+def _etag(request, sensor_id: int, scope: str) -> str:
+    version = sensor_version(sensor_id, scope)
+    value = ":".join(
+        (
+            str(request.auth.pk),
+            str(version),
+            request.headers.get("Accept", ""),
+            request.path,
+            request.GET.urlencode(),
+        )
+    )
+    # Keyed with SECRET_KEY so clients cannot forge a matching If-None-Match
+    return f'"{salted_hmac("sensors.caching", value).hexdigest()[:32]}"'
+
+
+def _cached_response(request, etag: str) -> Optional[HttpResponse]:
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        return _with_etag(HttpResponseNotModified(), etag)
+    entry = _cache().get(f"response:{etag}")
+    if entry is None:
+        return None
+    content_type, content = entry
+    return _with_etag(HttpResponse(content, content_type=content_type), etag)
+
+
+def _store_response(result, adapter, exclude_none: bool, etag: str):
+    if isinstance(result, tuple):
+        return result
+    if isinstance(result, HttpResponse):
+        if result.status_code != 200 or result.streaming:
+            return result
+        response = result
+    else:
+        data = adapter.dump_python(
+            adapter.validate_python(result), exclude_none=exclude_none
+        )
+        response = JsonResponse(data, safe=False)
+    _cache().set(
+        f"response:{etag}",
+        (response["Content-Type"], response.content),
+        settings.SENSORS_CACHE_TIMEOUT,
+    )
+    return _with_etag(response, etag)
+
+
+def _with_etag(response: HttpResponse, etag: str) -> HttpResponse:
+    response["ETag"] = etag
+    # Let browsers keep the response but revalidate it on every use
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def cache_response(schema, scope=lambda kwargs: HISTORY, exclude_none: bool = False):
+    """
+    Cache a ``sensor_id`` view's 200 responses, validated against ``schema``.
+    ``scope(kwargs)`` returns the counter the view's output depends on.
+    """
+    adapter = TypeAdapter(schema)
+
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+
+            @functools.wraps(view)
+            async def async_wrapper(request, **kwargs):
+                if not settings.SENSORS_CACHE_ENABLED:
+                    return await view(request, **kwargs)
+                etag = await sync_to_async(_etag)(
+                    request, kwargs["sensor_id"], scope(kwargs)
+                )
+                cached = await sync_to_async(_cached_response)(request, etag)
+                if cached is not None:
+                    return cached
+                result = await view(request, **kwargs)
+                return await sync_to_async(_store_response)(
+                    result, adapter, exclude_none, etag
+                )
+
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, **kwargs):
+            if not settings.SENSORS_CACHE_ENABLED:
+                return view(request, **kwargs)
+            etag = _etag(request, kwargs["sensor_id"], scope(kwargs))
+            cached = _cached_response(request, etag)
+            if cached is not None:
+                return cached
+            return _store_response(view(request, **kwargs), adapter, exclude_none, etag)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,226 @@
+"""
+Request handling shared by the sensor routers.
+
+``apps.sensors.api`` serves these endpoints under WSGI and
+``apps.sensors.async_api`` under ASGI. Both keep only what differs between
+the two, the route definitions and how they reach the database, and share
+the pagination, validation, downsampling and response building below.
+"""
+
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Optional
+
+import msgpack
+import numpy as np
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+
+from apps.metrics.instrumentation import record_rows
+from apps.readings.buffer import BufferFull, get_buffer
+from apps.readings.downsampling import MIN_POINTS, downsample, epoch_seconds
+from apps.readings.export import CONTENT_TYPES, EXPORT_FIELDS
+from apps.readings.models import Reading
+from apps.readings.overview import overview_rows
+from apps.readings.packed import (
+    CONTENT_TYPE as PACKED_CONTENT_TYPE,
+    PackedBatchError,
+    decode as decode_packed,
+)
+
+from .models import Sensor
+from .pagination import CursorPagination
+from .schemas import ReadingCreate
+from .serializers import SENSOR_FIELDS, readings_to_columns
+
+sensor_pages = CursorPagination(
+    field="created_at",
+    page_size=settings.SENSORS_PAGE_SIZE,
+    max_page_size=settings.SENSORS_MAX_PAGE_SIZE,
+)
+reading_pages = CursorPagination(
+    field="timestamp",
+    page_size=settings.READINGS_PAGE_SIZE,
+    max_page_size=settings.READINGS_MAX_PAGE_SIZE,
+)
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+# Temperature and humidity each keep at least MIN_POINTS samples
+DOWNSAMPLE_MIN_POINTS = 2 * MIN_POINTS
+
+# ReadingsParser leaves packed bodies to the view, so document them here
+PACKED_BATCH_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            PACKED_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}}
+        },
+    }
+}
+
+
+def owned_sensor_id(request, sensor_id: int) -> int:
+    """Check ownership with an id-only lookup instead of loading the sensor row"""
+    if not Sensor.objects.filter(id=sensor_id, owner=request.auth).exists():
+        raise Http404("No Sensor matches the given query.")
+    return sensor_id
+
+
+async def aowned_sensor_id(request, sensor_id: int) -> int:
+    """Async version of ``owned_sensor_id``"""
+    if not await Sensor.objects.filter(id=sensor_id, owner=request.auth).aexists():
+        raise Http404("No Sensor matches the given query.")
+    return sensor_id
+
+
+def overview_page(sensors, hours: int, cursor: Optional[str], limit: Optional[int]):
+    since = datetime.now(dt_timezone.utc) - timedelta(hours=hours)
+    return sensor_pages.page(
+        sensors.values(*SENSOR_FIELDS),
+        cursor,
+        limit,
+        fetch=lambda page: overview_rows(page, since),
+    )
+
+
+def readings_in_range(sensor_id: int, timestamp_from, timestamp_to):
+    readings = Reading.objects.filter(sensor_id=sensor_id)
+    if timestamp_from:
+        readings = readings.filter(timestamp__gte=timestamp_from)
+    if timestamp_to:
+        readings = readings.filter(timestamp__lte=timestamp_to)
+    return readings
+
+
+def accepts_msgpack(request) -> bool:
+    accept = request.headers.get("Accept", "")
+    return any(content_type in accept for content_type in MSGPACK_TYPES)
+
+
+def columns_response(sensor_id: int, rows, next_cursor, wants_msgpack: bool):
+    payload = {"sensor_id": sensor_id, **readings_to_columns(rows), "next": next_cursor}
+    record_rows(len(rows))
+    if wants_msgpack:
+        return HttpResponse(msgpack.packb(payload), content_type=MSGPACK_TYPES[0])
+    return JsonResponse(payload)
+
+
+def downsample_range(readings, fields, max_points: int, method: str):
+    """
+    Return the ``fields`` tuples of a range that preserve its shape, newest
+    first, and an error response if the range holds more readings than
+    ``READINGS_DOWNSAMPLE_MAX_ROWS``.
+
+    Rows are streamed into per-field columns, and the query stops one row past
+    the limit, so an oversized range is never loaded in full.
+    """
+    limit = settings.READINGS_DOWNSAMPLE_MAX_ROWS
+    rows = (
+        readings.order_by("timestamp")
+        .values_list(*fields)[: limit + 1]
+        .iterator(chunk_size=settings.READINGS_EXPORT_CHUNK_SIZE)
+    )
+    columns = [[] for _ in fields]
+    for count, row in enumerate(rows):
+        if count == limit:
+            return None, (
+                400,
+                {
+                    "detail": f"Range holds more than {limit} readings, "
+                    "narrow it or use the aggregate endpoint"
+                },
+            )
+        for column, value in zip(columns, row):
+            column.append(value)
+
+    columns = dict(zip(fields, columns))
+    if len(columns["timestamp"]) <= max_points:
+        selected = range(len(columns["timestamp"]))
+    else:
+        selected = downsample(
+            epoch_seconds(columns["timestamp"]),
+            [np.asarray(columns["temperature"]), np.asarray(columns["humidity"])],
+            max_points,
+            method,
+        ).tolist()
+    return [
+        tuple(columns[field][index] for field in fields) for index in selected[::-1]
+    ], None
+
+
+def buffer_reading(sensor_id: int, data: ReadingCreate):
+    """Queue a reading on the write-behind buffer and answer 202"""
+    if not (math.isfinite(data.temperature) and math.isfinite(data.humidity)):
+        return 400, {"detail": "Temperature and humidity must be finite numbers"}
+
+    ingest_buffer = get_buffer()
+    try:
+        reading = ingest_buffer.submit(
+            sensor_id,
+            temperature=data.temperature,
+            humidity=data.humidity,
+            timestamp=data.timestamp,
+        )
+    except BufferFull:
+        return 503, {"detail": "Ingest buffer is full, retry later"}
+    except TimeoutError:
+        return 503, {"detail": "Reading is queued but not committed yet"}
+    return 202, {
+        "sensor_id": sensor_id,
+        "temperature": reading.temperature,
+        "humidity": reading.humidity,
+        "timestamp": reading.timestamp,
+        "durability": ingest_buffer.durability,
+    }
+
+
+def ingest_buffer_stats() -> dict:
+    if not settings.READINGS_BUFFER_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, **get_buffer().stats()}
+
+
+def batch_too_large(size: int):
+    limit = settings.READINGS_BATCH_MAX_SIZE
+    if size > limit:
+        return 400, {"detail": f"Batch exceeds the maximum of {limit} readings"}
+    return None
+
+
+def batch_body(request, data):
+    """
+    Return the packed records or JSON items of a batch request, and an error
+    response if the body is missing, malformed or too large.
+    """
+    if request.content_type == PACKED_CONTENT_TYPE:
+        try:
+            data = decode_packed(request.body)
+        except PackedBatchError as e:
+            return None, (400, {"detail": str(e)})
+    elif data is None:
+        return None, (400, {"detail": "Request body is required"})
+    return data, batch_too_large(len(data))
+
+
+def export_rows(sensor_id: int, timestamp_from, timestamp_to):
+    return (
+        readings_in_range(sensor_id, timestamp_from, timestamp_to)
+        .order_by("timestamp")
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=settings.READINGS_EXPORT_CHUNK_SIZE)
+    )
+
+
+def export_response(sensor_id: int, format: str, content) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[format])
+    response["Content-Disposition"] = (
+        f'attachment; filename="sensor-{sensor_id}-readings.{format}"'
+    )
+    return response
+
+
+def stream_response(content) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(content, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
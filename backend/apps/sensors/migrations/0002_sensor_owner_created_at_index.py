@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sensors", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="sensor",
+            index=models.Index(
+                fields=["owner", "created_at", "id"],
+                name="sensors_sen_owner_i_e03616_idx",
+            ),
+        ),
+    ]
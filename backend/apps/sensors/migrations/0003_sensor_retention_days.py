@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sensors", "0002_sensor_owner_created_at_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sensor",
+            name="retention_days",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
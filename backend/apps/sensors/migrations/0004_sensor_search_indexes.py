@@ -0,0 +1,39 @@
+from django.db import migrations
+
+TABLE = "sensors_sensor"
+COLUMNS = ("name", "model")
+
+
+def create_search_indexes(apps, schema_editor):
+    """
+    Trigram indexes on UPPER(name::text) and UPPER(model::text), the expressions
+    Django's icontains lookup compares on PostgreSQL.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for column in COLUMNS:
+            cursor.execute(
+                f"CREATE INDEX {TABLE}_{column}_trgm ON {TABLE} "
+                f"USING gin (UPPER({column}::text) gin_trgm_ops)"
+            )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for column in COLUMNS:
+            cursor.execute(f"DROP INDEX {TABLE}_{column}_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sensors", "0003_sensor_retention_days"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
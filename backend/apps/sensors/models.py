@@ -9,6 +9,8 @@ class Sensor(models.Model):
     name = models.CharField(max_length=100)
     model = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
+    # Days of raw readings to keep; None falls back to READINGS_RETENTION_DAYS
+    retention_days = models.PositiveIntegerField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -17,6 +19,7 @@ class Sensor(models.Model):
         indexes = [
             models.Index(fields=["owner", "name"]),
             models.Index(fields=["model"]),
+            models.Index(fields=["owner", "created_at", "id"]),
         ]
 
     def __str__(self):
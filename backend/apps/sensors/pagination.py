@@ -0,0 +1,118 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from django.db.models import Q, QuerySet
+from ninja import Field, Schema
+from ninja.errors import HttpError
+from ninja.pagination import PaginationBase
+
+
+class CursorPagination(PaginationBase):
+    """
+    Keyset pagination over ``(field, id)`` in descending order.
+
+    Each page is a range scan starting right after the last row of the
+    previous one, so deep pages cost the same as the first. The cursor is an
+    opaque token encoding that last ``(field, id)`` pair.
+    """
+
+    class Input(Schema):
+        cursor: Optional[str] = Field(None, description="Token from a previous page")
+        limit: Optional[int] = Field(None, ge=1, description="Page size")
+
+    class Output(Schema):
+        items: List[Any]
+        next: Optional[str] = None
+
+    def __init__(
+        self,
+        field: str,
+        page_size: int,
+        max_page_size: int,
+        **kwargs: Any,
+    ) -> None:
+        self.field = field
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        super().__init__(**kwargs)
+
+    def paginate_queryset(
+        self, queryset: QuerySet, pagination: Input, **params: Any
+    ) -> Any:
+        items, next_cursor = self.page(queryset, pagination.cursor, pagination.limit)
+        return {"items": items, "next": next_cursor}
+
+    def page(
+        self,
+        queryset: QuerySet,
+        cursor: Optional[str],
+        limit: Optional[int],
+        key: Optional[Callable[[Any], Tuple[datetime, int]]] = None,
+        fetch: Callable[[QuerySet], list] = list,
+    ) -> Tuple[list, Optional[str]]:
+        """
+        Return one page of ``queryset`` and the cursor of the next page.
+
+        ``key`` extracts ``(field, id)`` from a row; by default rows may be
+        model instances or ``values()`` dicts. ``fetch`` runs the sliced and
+        ordered queryset and returns its rows.
+        """
+        queryset, limit = self._slice(queryset, cursor, limit)
+        return self._split(fetch(queryset), limit, key)
+
+    async def apage(
+        self,
+        queryset: QuerySet,
+        cursor: Optional[str],
+        limit: Optional[int],
+        key: Optional[Callable[[Any], Tuple[datetime, int]]] = None,
+    ) -> Tuple[list, Optional[str]]:
+        """Async version of ``page`` that fetches rows with the async ORM"""
+        queryset, limit = self._slice(queryset, cursor, limit)
+        return self._split([row async for row in queryset], limit, key)
+
+    def _slice(
+        self, queryset: QuerySet, cursor: Optional[str], limit: Optional[int]
+    ) -> Tuple[QuerySet, int]:
+        limit = min(limit or self.page_size, self.max_page_size)
+        queryset = queryset.order_by(f"-{self.field}", "-id")
+
+        if cursor:
+            value, pk = self._decode(cursor)
+            # The plain upper bound is redundant with the keyset condition but
+            # lets PostgreSQL prune partitions that start after the cursor
+            queryset = queryset.filter(**{f"{self.field}__lte": value}).filter(
+                Q(**{f"{self.field}__lt": value})
+                | Q(**{self.field: value, "id__lt": pk})
+            )
+        return queryset[: limit + 1], limit
+
+    def _split(
+        self, rows: list, limit: int, key: Optional[Callable]
+    ) -> Tuple[list, Optional[str]]:
+        items = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = self._encode(*(key or self._key)(items[-1]))
+        return items, next_cursor
+
+    def _key(self, row: Any) -> Tuple[datetime, int]:
+        if isinstance(row, dict):
+            return row[self.field], row["id"]
+        return getattr(row, self.field), row.id
+
+    @staticmethod
+    def _encode(value: datetime, pk: int) -> str:
+        raw = json.dumps([value.isoformat(), pk]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def _decode(cursor: str) -> Tuple[datetime, int]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            value, pk = json.loads(base64.urlsafe_b64decode(padded))
+            return datetime.fromisoformat(value), int(pk)
+        except (ValueError, TypeError):
+            raise HttpError(400, "Invalid cursor")
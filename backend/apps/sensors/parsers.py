@@ -0,0 +1,16 @@
+from ninja.parser import Parser
+
+from apps.readings.packed import CONTENT_TYPE as PACKED_CONTENT_TYPE
+
+
+class ReadingsParser(Parser):
+    """
+    The default JSON parser, except that packed reading batches are left
+    undecoded. Their body parameter is then ``None`` and the view reads
+    ``request.body`` itself (see ``apps.readings.packed``).
+    """
+
+    def parse_body(self, request):
+        if request.content_type == PACKED_CONTENT_TYPE:
+            return None
+        return super().parse_body(request)
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.readings.models import Reading
+from apps.readings.signals import readings_created
+
+from .caching import bump_versions, live_since
+from .models import Sensor
+
+
+@receiver(post_save, sender=Sensor)
+@receiver(post_delete, sender=Sensor)
+def invalidate_sensor(sender, instance, **kwargs):
+    if not settings.SENSORS_CACHE_ENABLED:
+        return
+    transaction.on_commit(lambda: bump_versions([instance.pk], history=True))
+
+
+@receiver(readings_created, sender=Reading)
+def invalidate_readings(sender, readings, replaced, **kwargs):
+    if not settings.SENSORS_CACHE_ENABLED:
+        return
+    since = live_since()
+    live, history = set(), set()
+    for reading in [*readings, *replaced]:
+        (history if reading.timestamp < since else live).add(reading.sensor_id)
+
+    def bump():
+        bump_versions(live - history)
+        bump_versions(history, history=True)
+
+    transaction.on_commit(bump, robust=True)
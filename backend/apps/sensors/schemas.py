@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class SensorCreate(BaseModel):
@@ -11,12 +11,16 @@ class SensorCreate(BaseModel):
         ..., min_length=1, max_length=100, description="Sensor model name"
     )
     description: Optional[str] = Field(None, description="Optional sensor description")
+    retention_days: Optional[int] = Field(
+        None, ge=1, description="Days of raw readings to keep before compaction"
+    )
 
 
 class SensorUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=100)
     model: Optional[str] = Field(None, min_length=1, max_length=100)
     description: Optional[str] = None
+    retention_days: Optional[int] = Field(None, ge=1)
 
 
 class SensorOut(BaseModel):
@@ -24,6 +28,7 @@ class SensorOut(BaseModel):
     name: str
     model: str
     description: Optional[str] = None
+    retention_days: Optional[int] = None
     owner_id: int
     created_at: datetime
     updated_at: datetime
@@ -35,6 +40,14 @@ class ReadingCreate(BaseModel):
     timestamp: datetime = Field(..., description="Reading timestamp")
 
 
+class ReadingQueuedOut(BaseModel):
+    sensor_id: int
+    temperature: float
+    humidity: float
+    timestamp: datetime
+    durability: str = Field(..., description="commit, journal or memory")
+
+
 class ReadingOut(BaseModel):
     id: int
     sensor_id: int
@@ -42,3 +55,72 @@ class ReadingOut(BaseModel):
     humidity: float
     timestamp: datetime
     created_at: datetime
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SensorReadingCreate(ReadingCreate):
+    sensor_id: int = Field(..., description="Sensor the reading belongs to")
+
+
+class ReadingBatchError(BaseModel):
+    index: int = Field(..., description="Position of the item in the submitted batch")
+    detail: str
+
+
+class ReadingBatchOut(BaseModel):
+    accepted: int = Field(..., description="Readings written as new rows")
+    duplicates: int = Field(
+        ...,
+        description="Readings whose (sensor, timestamp) already existed or was repeated in the batch",
+    )
+    rejected: int = Field(..., description="Readings that failed validation")
+    errors: List[ReadingBatchError] = []
+
+
+class ReadingBucketOut(BaseModel):
+    bucket: datetime = Field(..., description="Start of the time bucket")
+    count: Optional[int] = None
+    temperature_avg: Optional[float] = None
+    temperature_min: Optional[float] = None
+    temperature_max: Optional[float] = None
+    humidity_avg: Optional[float] = None
+    humidity_min: Optional[float] = None
+    humidity_max: Optional[float] = None
+
+
+class ReadingPageOut(BaseModel):
+    items: List[ReadingOut]
+    next: Optional[str] = Field(None, description="Cursor of the next page")
+
+
+class SensorPageOut(BaseModel):
+    items: List[SensorOut]
+    next: Optional[str] = Field(None, description="Cursor of the next page")
+
+
+class LatestReadingOut(BaseModel):
+    timestamp: datetime
+    temperature: float
+    humidity: float
+
+
+class ReadingWindowOut(BaseModel):
+    count: int
+    temperature_avg: float
+    temperature_min: float
+    temperature_max: float
+    humidity_avg: float
+    humidity_min: float
+    humidity_max: float
+
+
+class SensorOverviewOut(SensorOut):
+    latest: Optional[LatestReadingOut] = Field(None, description="Newest reading")
+    window: Optional[ReadingWindowOut] = Field(
+        None, description="Statistics over the requested number of hours"
+    )
+
+
+class SensorOverviewPageOut(BaseModel):
+    items: List[SensorOverviewOut]
+    next: Optional[str] = Field(None, description="Cursor of the next page")
@@ -0,0 +1,55 @@
+"""
+Sensor search by name and model.
+
+``filter_sensors`` keeps sensors whose name or model contains the query,
+ignoring case. Django compiles that to ``UPPER(col) LIKE UPPER('%q%')``, which
+PostgreSQL answers from the ``gin_trgm_ops`` indexes on ``UPPER(name)`` and
+``UPPER(model)`` created by migration ``sensors 0004_sensor_search_indexes``
+instead of scanning every sensor of the account.
+
+``rank_sensors`` orders matches for the search endpoint: exact names first,
+then name prefixes, then model prefixes, then everything else. Within each
+tier, PostgreSQL sorts by trigram similarity of the name. On other backends
+the tier is followed by the name.
+"""
+
+from django.db import NotSupportedError
+from django.db.models import Case, F, FloatField, Func, IntegerField, Q, QuerySet
+from django.db.models import Value, When
+
+
+class Similarity(Func):
+    """``pg_trgm`` similarity between an expression and a string, 0 to 1"""
+
+    output_field = FloatField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(f"Similarity is not supported on {connection.vendor}")
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, function="similarity", **extra_context
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return "0.0", []
+
+
+def filter_sensors(sensors: QuerySet, q: str) -> QuerySet:
+    return sensors.filter(Q(name__icontains=q) | Q(model__icontains=q))
+
+
+def rank_sensors(sensors: QuerySet, q: str) -> QuerySet:
+    """Filter ``sensors`` by ``q`` and order the matches best first"""
+    tier = Case(
+        When(name__iexact=q, then=Value(3)),
+        When(name__istartswith=q, then=Value(2)),
+        When(model__istartswith=q, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return (
+        filter_sensors(sensors, q)
+        .annotate(tier=tier, similarity=Similarity(F("name"), Value(q)))
+        .order_by("-tier", "-similarity", "name", "id")
+    )
@@ -0,0 +1,54 @@
+"""
+Plain-dict serializers shared by the sensor and reading endpoints.
+
+Foreign keys are read through their ``*_id`` attributes so building a
+response never dereferences ``sensor.owner`` or ``reading.sensor``. List
+endpoints project the same columns with ``values()`` and skip model
+instantiation entirely.
+"""
+
+SENSOR_FIELDS = (
+    "id",
+    "name",
+    "model",
+    "description",
+    "retention_days",
+    "owner_id",
+    "created_at",
+    "updated_at",
+)
+READING_FIELDS = (
+    "id",
+    "sensor_id",
+    "temperature",
+    "humidity",
+    "timestamp",
+    "created_at",
+)
+
+
+def sensor_to_dict(sensor) -> dict:
+    return {field: getattr(sensor, field) for field in SENSOR_FIELDS}
+
+
+def reading_to_dict(reading) -> dict:
+    return {field: getattr(reading, field) for field in READING_FIELDS}
+
+
+COLUMNAR_FIELDS = ("id", "timestamp", "temperature", "humidity")
+
+
+def readings_to_columns(rows) -> dict:
+    """
+    Turn ``values_list(*COLUMNAR_FIELDS)`` tuples into parallel arrays, with
+    timestamps as epoch milliseconds.
+    """
+    if not rows:
+        return {field: [] for field in COLUMNAR_FIELDS}
+    ids, timestamps, temperatures, humidities = zip(*rows)
+    return {
+        "id": list(ids),
+        "timestamp": [round(value.timestamp() * 1000) for value in timestamps],
+        "temperature": list(temperatures),
+        "humidity": list(humidities),
+    }
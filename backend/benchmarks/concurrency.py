@@ -0,0 +1,116 @@
+"""
+Compare the WSGI and ASGI request paths under concurrent load.
+
+Start the server under test, then point this script at it:
+
+    python manage.py runserver --noreload 0.0.0.0:8000            # WSGI
+    uvicorn config.asgi:application --host 0.0.0.0 --port 8000    # ASGI
+
+    python benchmarks/concurrency.py --url http://localhost:8000 \\
+        --token <jwt> --sensor <id> --concurrency 64 --requests 2000
+
+Each worker alternates dashboard reads (a readings page plus an aggregate)
+with single-reading ingests, depending on ``--scenario``. Only the standard
+library is used so the script runs anywhere the API is reachable.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+SCENARIOS = ("dashboard", "ingest", "mixed")
+
+
+def _request(url: str, token: str, body=None) -> int:
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(
+        url,
+        data=data,
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        },
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def _calls(args):
+    base = f"{args.url.rstrip('/')}/api/sensors/{args.sensor}/readings/"
+    start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    counter = iter(range(10**9))
+    lock = threading.Lock()
+
+    def dashboard():
+        if random.random() < 0.5:
+            return _request(f"{base}?limit=100", args.token)
+        return _request(f"{base}aggregate/?bucket=1h", args.token)
+
+    def ingest():
+        with lock:
+            offset = next(counter)
+        body = {
+            "temperature": round(random.uniform(15, 25), 2),
+            "humidity": round(random.uniform(30, 60), 2),
+            "timestamp": (start + timedelta(milliseconds=offset)).isoformat(),
+        }
+        return _request(base, args.token, body)
+
+    if args.scenario == "dashboard":
+        return [dashboard]
+    if args.scenario == "ingest":
+        return [ingest]
+    return [dashboard, ingest]
+
+
+def run(args) -> dict:
+    calls = _calls(args)
+    latencies, statuses = [], []
+
+    def one(index: int):
+        started = time.perf_counter()
+        status = calls[index % len(calls)]()
+        latencies.append(time.perf_counter() - started)
+        statuses.append(status)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "scenario": args.scenario,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "errors": sum(1 for status in statuses if status >= 400),
+        "rps": round(args.requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--sensor", type=int, required=True)
+    parser.add_argument("--scenario", choices=SCENARIOS, default="mixed")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000)
+    print(json.dumps(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Synthetic benchmark data: N users × M sensors × K readings.
+
+    python benchmarks/dataset.py --users 20 --sensors 10 --readings 10000
+
+Users are ``bench-<n>@example.com`` with password ``BENCH_PASSWORD``;
+sensors get a name and model drawn from a small vocabulary so that search
+has realistic selectivity. Readings end now, ``--step`` seconds apart, and
+go through ``write_readings`` so rollups are maintained exactly as live
+ingest would maintain them. Running it again adds only what is missing.
+``--reset`` deletes every benchmark user (and with them their sensors and
+readings) first.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.contrib.auth.hashers import make_password  # noqa: E402
+
+from apps.auth.utils import create_token  # noqa: E402
+from apps.readings.ingest import write_readings  # noqa: E402
+from apps.readings.models import Reading  # noqa: E402
+from apps.sensors.models import Sensor  # noqa: E402
+
+User = get_user_model()
+
+EMAIL = "bench-{}@example.com"
+EMAIL_PATTERN = r"^bench-\d+@example\.com$"
+BENCH_PASSWORD = "bench-password"
+NAMES = ("greenhouse", "cellar", "attic", "garage", "office", "lab", "barn")
+MODELS = ("EnviroSense", "ClimaTrack", "AeroMonitor", "HydroTherm", "EcoStat")
+WRITE_CHUNK = 5000
+
+
+def bench_users():
+    return User.objects.filter(email__regex=EMAIL_PATTERN).order_by("id")
+
+
+def reset():
+    bench_users().delete()
+
+
+def generate(
+    users: int,
+    sensors: int,
+    readings: int,
+    step: int = 60,
+    seed: int = 0,
+    stdout=sys.stdout,
+):
+    """Create whatever is missing of ``users`` × ``sensors`` × ``readings``"""
+    rng = random.Random(seed)
+    password = make_password(BENCH_PASSWORD)
+    existing = set(bench_users().values_list("email", flat=True))
+    User.objects.bulk_create(
+        User(email=EMAIL.format(i), username=f"bench-{i}", password=password)
+        for i in range(users)
+        if EMAIL.format(i) not in existing
+    )
+
+    owners = list(bench_users()[:users])
+    owned = {}
+    for sensor in Sensor.objects.filter(owner__in=owners).order_by("id"):
+        owned.setdefault(sensor.owner_id, []).append(sensor)
+    Sensor.objects.bulk_create(
+        Sensor(
+            owner=owner,
+            name=f"{rng.choice(NAMES)}-{owner.id}-{i}",
+            model=rng.choice(MODELS),
+        )
+        for owner in owners
+        for i in range(len(owned.get(owner.id, [])), sensors)
+    )
+
+    end = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    started = time.perf_counter()
+    written = 0
+    for sensor in Sensor.objects.filter(owner__in=owners).order_by("id"):
+        missing = readings - Reading.objects.filter(sensor=sensor).count()
+        if missing <= 0:
+            continue
+        # Continue below the oldest reading so that reruns only add rows
+        oldest = (
+            Reading.objects.filter(sensor=sensor)
+            .order_by("timestamp")
+            .values_list("timestamp", flat=True)
+            .first()
+        )
+        first = (oldest or end + timedelta(seconds=step)) - timedelta(seconds=step)
+        batch = []
+        for n in range(missing):
+            batch.append(
+                Reading(
+                    sensor=sensor,
+                    timestamp=first - timedelta(seconds=n * step),
+                    temperature=round(20 + 5 * rng.random(), 2),
+                    humidity=round(40 + 20 * rng.random(), 2),
+                )
+            )
+            if len(batch) == WRITE_CHUNK:
+                write_readings(batch)
+                written += len(batch)
+                batch = []
+        write_readings(batch)
+        written += len(batch)
+        print(f"{sensor.name}: {missing} readings", file=stdout, flush=True)
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Wrote {written} readings in {elapsed:.1f}s "
+        f"({written / max(elapsed, 1e-9):.0f}/s)",
+        file=stdout,
+    )
+
+
+def fixture(users: int = None) -> list:
+    """
+    Return ``[{"user_id", "email", "token", "sensors"}, ...]`` for the
+    benchmark users, with a fresh token each.
+    """
+    owners = list(bench_users().values_list("id", "email"))[:users]
+    sensors = {}
+    for sensor_id, owner_id in (
+        Sensor.objects.filter(owner_id__in=[owner_id for owner_id, _ in owners])
+        .order_by("id")
+        .values_list("id", "owner_id")
+    ):
+        sensors.setdefault(owner_id, []).append(sensor_id)
+    return [
+        {
+            "user_id": user_id,
+            "email": email,
+            "token": create_token(user_id),
+            "sensors": sensors.get(user_id, []),
+        }
+        for user_id, email in owners
+        if sensors.get(user_id)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--sensors", type=int, default=5, help="Sensors per user")
+    parser.add_argument(
+        "--readings", type=int, default=10000, help="Readings per sensor"
+    )
+    parser.add_argument("--step", type=int, default=60, help="Seconds between readings")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reset", action="store_true")
+    args = parser.parse_args()
+
+    if args.reset:
+        reset()
+    generate(args.users, args.sensors, args.readings, args.step, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Measure time-range reads on readings_reading before and after the index
+changes of migration readings 0004_tune_reading_indexes.
+
+Seed a dataset once, then compare both index sets on it:
+
+    python benchmarks/indexes.py --seed 5000000 --sensors 50
+    python benchmarks/indexes.py --compare --runs 200
+
+``--compare`` migrates readings back to 0003 (the plain ``(sensor,
+timestamp)`` index next to the unique constraint), measures, migrates
+forward again and measures once more. Each query prints its p50 and p99
+latency and the plan of one representative run. Use a disposable
+database: seeding inserts millions of rows and the comparison rebuilds
+indexes on the whole table.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Avg, Count  # noqa: E402
+
+from apps.readings.aggregation import raw_partials  # noqa: E402
+from apps.readings.models import Reading  # noqa: E402
+from apps.sensors.models import Sensor  # noqa: E402
+
+BEFORE = "0003_partition_readings"
+AFTER = "0004_tune_reading_indexes"
+OWNER = "bench@example.com"
+SEED_CHUNK = 1_000_000
+COLUMNS = ("id", "timestamp", "temperature", "humidity")
+
+
+def seed(rows: int, sensors: int, step: int):
+    """Insert ``rows`` readings spread over ``sensors`` sensors, newest now"""
+    owner, _ = get_user_model().objects.get_or_create(
+        email=OWNER, defaults={"username": "bench"}
+    )
+    ids = [
+        Sensor.objects.create(owner=owner, name=f"bench-{i}", model="bench").id
+        for i in range(sensors)
+    ]
+    per_sensor = rows // sensors
+    end = datetime.now(timezone.utc).replace(microsecond=0)
+    chunk = max(SEED_CHUNK // sensors, 1)
+
+    # Oldest first and all sensors per instant, the order live ingest writes in
+    with connection.cursor() as cursor:
+        for first in range(per_sensor, 0, -chunk):
+            last = max(first - chunk + 1, 1)
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    "INSERT INTO readings_reading "
+                    "(sensor_id, timestamp, temperature, humidity, created_at) "
+                    "SELECT s.id, %s - n * %s * interval '1 second', "
+                    "20 + 5 * sin(n / 360.0) + random(), "
+                    "50 + 10 * cos(n / 720.0) + random(), now() "
+                    "FROM generate_series(%s, %s, -1) n "
+                    "CROSS JOIN unnest(%s::bigint[]) s(id)",
+                    [end, step, first, last, ids],
+                )
+            else:
+                cursor.execute(
+                    "WITH RECURSIVE n(i) AS (SELECT %s UNION ALL "
+                    "SELECT i - 1 FROM n WHERE i > %s) "
+                    "INSERT INTO readings_reading "
+                    "(sensor_id, timestamp, temperature, humidity, created_at) "
+                    "SELECT s.id, datetime(%s, '-' || (n.i * %s) || ' seconds'), "
+                    "20 + 5 * sin(n.i / 360.0) + abs(random() %% 1000) / 1000.0, "
+                    "50 + 10 * cos(n.i / 720.0) + abs(random() %% 1000) / 1000.0, "
+                    "datetime('now') FROM n CROSS JOIN sensors_sensor s "
+                    "WHERE s.owner_id = %s",
+                    [first, last, end.strftime("%Y-%m-%d %H:%M:%S"), step, owner.id],
+                )
+            print(f"Seeded {(per_sensor - last + 1) * sensors} readings", flush=True)
+    analyze()
+
+
+def analyze():
+    with connection.cursor() as cursor:
+        # Index-only scans need the visibility map that VACUUM maintains
+        cursor.execute(
+            "VACUUM ANALYZE readings_reading"
+            if connection.vendor == "postgresql"
+            else "ANALYZE"
+        )
+
+
+def queries(rng: random.Random):
+    """Yield ``(name, queryset factory)`` pairs; each factory picks new bounds"""
+    sensors = list(
+        Sensor.objects.filter(owner__email=OWNER).values_list("id", flat=True)
+    )
+    if not sensors:
+        sys.exit("No benchmark data; run with --seed first")
+    readings = Reading.objects.filter(sensor_id__in=sensors)
+    first = readings.order_by("timestamp").values_list("timestamp", flat=True)[0]
+    last = readings.order_by("-timestamp").values_list("timestamp", flat=True)[0]
+
+    def window(hours):
+        span = max((last - first).total_seconds() - hours * 3600, 0)
+        start = first + timedelta(seconds=rng.uniform(0, span))
+        return start, start + timedelta(hours=hours)
+
+    def latest_page():
+        sensor = rng.choice(sensors)
+        return (
+            Reading.objects.filter(sensor_id=sensor)
+            .order_by("-timestamp", "-id")
+            .values_list(*COLUMNS)[:500]
+        )
+
+    def sensor_day():
+        start, end = window(24)
+        return (
+            Reading.objects.filter(
+                sensor_id=rng.choice(sensors), timestamp__gte=start, timestamp__lt=end
+            )
+            .order_by("-timestamp", "-id")
+            .values_list(*COLUMNS)
+        )
+
+    def sensor_week_hourly():
+        start, end = window(24 * 7)
+        return raw_partials(
+            Reading.objects.filter(
+                sensor_id=rng.choice(sensors), timestamp__gte=start, timestamp__lt=end
+            ),
+            3600,
+        )
+
+    def all_sensors_hour():
+        start, end = window(1)
+        return (
+            Reading.objects.filter(timestamp__gte=start, timestamp__lt=end)
+            .values("sensor_id")
+            .annotate(count=Count("id"), temperature=Avg("temperature"))
+            .order_by()
+        )
+
+    return [
+        ("latest_page", latest_page),
+        ("sensor_day", sensor_day),
+        ("sensor_week_hourly", sensor_week_hourly),
+        ("all_sensors_hour", all_sensors_hour),
+    ]
+
+
+def explain(queryset) -> str:
+    if connection.vendor == "postgresql":
+        return queryset.explain(analyze=True, buffers=True)
+    return queryset.explain()
+
+
+def measure(runs: int, label: str) -> dict:
+    rng = random.Random(42)
+    results = {}
+    for name, factory in queries(rng):
+        latencies = []
+        for _ in range(runs):
+            queryset = factory()
+            started = time.perf_counter()
+            list(queryset)
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        results[name] = (
+            statistics.median(latencies) * 1000,
+            latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000,
+        )
+        print(f"\n[{label}] {name}\n{explain(factory())}", flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seed", type=int, help="Insert this many readings first")
+    parser.add_argument("--sensors", type=int, default=50)
+    parser.add_argument("--step", type=int, default=60, help="Seconds between readings")
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help=f"Measure at readings {BEFORE}, then at {AFTER}",
+    )
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.seed, args.sensors, args.step)
+
+    phases = {}
+    if args.compare:
+        call_command("migrate", "readings", BEFORE, verbosity=0)
+        analyze()
+        phases["before"] = measure(args.runs, "before")
+        call_command("migrate", "readings", verbosity=0)
+        analyze()
+    phase = "after" if args.compare else "current"
+    phases[phase] = measure(args.runs, phase)
+
+    print(f"\n{'query':<22}" + "".join(f"{p + ' p50/p99 ms':>26}" for p in phases))
+    for name in next(iter(phases.values())):
+        cells = "".join(
+            f"{f'{p50:.2f} / {p99:.2f}':>26}"
+            for p50, p99 in (phases[phase][name] for phase in phases)
+        )
+        print(f"{name:<22}{cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Compare request latency with new, persistent and pooled database connections.
+
+Generate data once, then let the script start one server per mode:
+
+    python benchmarks/dataset.py --users 20 --sensors 10 --readings 1000
+    python benchmarks/pool.py --concurrency 8 --requests 2000
+
+Modes:
+
+- ``connect`` opens a connection for every request (``CONN_MAX_AGE=0``).
+- ``persistent`` keeps one connection per thread (``CONN_MAX_AGE=60``).
+- ``pool`` borrows connections from the psycopg pool (``DATABASE_POOL``).
+
+Each mode runs ``uvicorn config.asgi:application`` with the current
+settings module on ``--port``, drives it over HTTP with a scenario of
+benchmarks/suite.py and prints throughput, p50/p95/p99 latency and the
+number of server connections left open afterwards. ``sensor_detail`` is
+the default because a single-row read makes connection setup the largest
+part of each request.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import suite  # sets up Django
+
+from django.db import connection  # noqa: E402
+
+MODES = {
+    "connect": {"DATABASE_POOL": "False", "DATABASE_CONN_MAX_AGE": "0"},
+    "persistent": {"DATABASE_POOL": "False", "DATABASE_CONN_MAX_AGE": "60"},
+    "pool": {"DATABASE_POOL": "True"},
+}
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def uvicorn_command(port: int) -> list:
+    return [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "config.asgi:application",
+        "--port",
+        str(port),
+        "--log-level",
+        "warning",
+    ]
+
+
+def start_server(port: int, env: dict, command=None) -> subprocess.Popen:
+    """Run ``command`` (uvicorn by default) and return once it answers"""
+    server = subprocess.Popen(
+        command or uvicorn_command(port),
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env},
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"Server exited with status {server.returncode}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/api/metrics/", timeout=1)
+            return server
+        except urllib.error.HTTPError:
+            # Any response means the server is up, even a 401 for METRICS_TOKEN
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.terminate()
+    sys.exit("Server did not start within 30 seconds")
+
+
+def open_connections() -> int:
+    """Connections to this database other than our own"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM pg_stat_activity"
+            " WHERE datname = current_database() AND pid <> pg_backend_pid()"
+        )
+        return cursor.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", action="append", choices=MODES)
+    parser.add_argument("--scenario", default="sensor_detail", choices=suite.SCENARIOS)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, help="Use only the first N bench users")
+    parser.add_argument("--batch", type=int, default=100, help="Readings per ingest")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    if connection.vendor != "postgresql":
+        sys.exit("Connection modes only differ on PostgreSQL")
+    users = suite.dataset.fixture(args.users)
+    if not users:
+        sys.exit("No benchmark data; run benchmarks/dataset.py first")
+    connection.close()
+
+    results = {}
+    for mode in args.mode or MODES:
+        server = start_server(args.port, MODES[mode])
+        try:
+            target = suite.HttpTarget(f"http://127.0.0.1:{args.port}", server.pid)
+            results[mode] = suite.run_scenario(target, args.scenario, users, args)
+            results[mode]["server_connections"] = open_connections()
+            connection.close()
+        finally:
+            server.terminate()
+            server.wait()
+        print(json.dumps({"mode": mode, **results[mode]}))
+
+    print(
+        f"\n{'mode':<12}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'conns':>7}"
+    )
+    for mode, result in results.items():
+        print(
+            f"{mode:<12}{result['rps']:>9}{result['p50_ms']:>9}"
+            f"{result['p95_ms']:>9}{result['p99_ms']:>9}"
+            f"{result['server_connections']:>7}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {"scenario": args.scenario, "concurrency": args.concurrency, **results},
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
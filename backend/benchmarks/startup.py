@@ -0,0 +1,163 @@
+"""
+Compare startup time, memory and throughput of the server profiles.
+
+Generate data once, then let the script start each profile in turn:
+
+    python benchmarks/dataset.py --users 20 --sensors 10 --readings 1000
+    python benchmarks/startup.py --workers 4
+
+Profiles:
+
+- ``dev`` is a single ``uvicorn config.asgi:application`` process with
+  ``DEBUG`` on, as docker-compose.yml runs it (without ``--reload``).
+- ``gunicorn`` runs config/gunicorn.conf.py with uvicorn workers, each
+  importing Django itself (``WEB_PRELOAD=False``).
+- ``gunicorn-preload`` imports Django and the URLconf once in the master.
+- ``gthread-preload`` serves ``config.wsgi`` from threaded workers.
+
+Each profile is started ``--runs`` times. ``ready_s`` is the median time
+from launch to the first response. ``cold_ms`` is the slowest of
+``--workers`` concurrent first requests, which land on fresh workers.
+``pss_mb`` is the proportional memory of the master and its workers, which
+counts pages shared after a fork once. Last, a scenario of
+benchmarks/suite.py runs against the warm server.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pool  # sets up Django
+import suite
+
+PATH = "/api/metrics/"
+PROFILES = ("dev", "gunicorn", "gunicorn-preload", "gthread-preload")
+
+
+def profiles(workers: int, port: int) -> dict:
+    gunicorn = [sys.executable, "-m", "gunicorn", "-c", "config/gunicorn.conf.py"]
+    server = {"PORT": str(port), "WEB_CONCURRENCY": str(workers)}
+    return {
+        "dev": (pool.uvicorn_command(port), {"DEBUG": "True"}),
+        "gunicorn": (gunicorn, {**server, "WEB_PRELOAD": "False"}),
+        "gunicorn-preload": (gunicorn, {**server, "WEB_PRELOAD": "True"}),
+        "gthread-preload": (
+            gunicorn,
+            {**server, "WEB_PRELOAD": "True", "WEB_INTERFACE": "wsgi"},
+        ),
+    }
+
+
+def first_request_ms(port: int) -> float:
+    # A new connection each, so that the requests spread over the workers
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    started = time.perf_counter()
+    conn.request("GET", PATH)
+    conn.getresponse().read()
+    conn.close()
+    return (time.perf_counter() - started) * 1000
+
+
+def process_tree(pid: int) -> list:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(child) for child in f.read().split()]
+    except OSError:
+        return [pid]
+    return [pid] + [
+        grandchild for child in children for grandchild in process_tree(child)
+    ]
+
+
+def pss_mb(pid: int) -> float:
+    total = 0
+    for process in process_tree(pid):
+        try:
+            with open(f"/proc/{process}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Pss:"):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return total / 1024
+
+
+def stop(server):
+    server.terminate()
+    server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--profile", action="append", choices=PROFILES)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--scenario", default="dashboard", choices=suite.SCENARIOS)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, help="Use only the first N bench users")
+    parser.add_argument("--batch", type=int, default=100, help="Readings per ingest")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    users = suite.dataset.fixture(args.users)
+    if not users:
+        sys.exit("No benchmark data; run benchmarks/dataset.py first")
+    suite.connection.close()
+    available = profiles(args.workers, args.port)
+
+    results = {}
+    for name in args.profile or PROFILES:
+        command, env = available[name]
+        ready, cold = [], []
+        for run in range(args.runs):
+            started = time.perf_counter()
+            server = pool.start_server(args.port, env, command)
+            ready.append(time.perf_counter() - started)
+            try:
+                with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                    cold.append(
+                        max(executor.map(first_request_ms, [args.port] * args.workers))
+                    )
+                if run < args.runs - 1:
+                    continue
+                target = suite.HttpTarget(f"http://127.0.0.1:{args.port}")
+                result = suite.run_scenario(target, args.scenario, users, args)
+                result.pop("queries_per_request")
+                result.pop("peak_rss_mb")
+                results[name] = {
+                    "ready_s": round(statistics.median(ready), 2),
+                    "cold_ms": round(statistics.median(cold), 1),
+                    "pss_mb": round(pss_mb(server.pid), 1),
+                    **result,
+                }
+            finally:
+                stop(server)
+        print(json.dumps({"profile": name, **results[name]}))
+
+    print(
+        f"\n{'profile':<18}{'ready s':>9}{'cold ms':>9}{'pss MB':>9}"
+        f"{'rps':>9}{'p50 ms':>9}{'p99 ms':>9}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<18}{result['ready_s']:>9}{result['cold_ms']:>9}"
+            f"{result['pss_mb']:>9}{result['rps']:>9}{result['p50_ms']:>9}"
+            f"{result['p99_ms']:>9}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"workers": args.workers, **results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
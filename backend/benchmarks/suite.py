@@ -0,0 +1,406 @@
+"""
+Scripted load scenarios for the API, with results compared to a baseline.
+
+Generate data once, then run the scenarios in-process (Django test client,
+full middleware and URL configuration, no network) or against a server:
+
+    python benchmarks/dataset.py --users 20 --sensors 10 --readings 10000
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --url http://localhost:8000 --server-pid <pid>
+
+Scenarios:
+
+- ``ingest_burst`` posts batches of readings with fresh timestamps.
+- ``ingest_packed`` posts the same batches as ``application/x-sensor-batch``.
+- ``dashboard`` mixes the sensor overview, a day of readings and a week of
+  hourly aggregates for random sensors.
+- ``sensor_detail`` fetches single sensors, the cheapest authenticated read.
+- ``search`` runs ranked search and ``q`` filtering with short prefixes.
+- ``auth`` spreads sensor listings over every benchmark user's token and
+  logs in with a password on every tenth request.
+
+Each scenario records throughput, p50/p95/p99 latency, queries per request
+(in-process only) and the peak RSS of the process serving requests (this
+process, or ``--server-pid``; the peak never goes down, so later scenarios
+report at least the earlier peak). ``--baseline`` compares the results to
+a file written by ``--save-baseline`` and exits with status 1 when
+throughput drops, latency or memory grows by more than ``--tolerance``,
+or any scenario issues more queries per request than before. Baselines
+are only comparable on the same machine, settings and dataset.
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+import dataset  # sets up Django
+import numpy as np
+
+from django.db import connection, connections  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from apps.readings.models import Reading  # noqa: E402
+from apps.readings.packed import CONTENT_TYPE as PACKED_CONTENT_TYPE  # noqa: E402
+from apps.readings.packed import RECORD  # noqa: E402
+
+PERCENTILES = (50, 95, 99)
+# Metric name -> whether a higher value is better
+COMPARED = {
+    "rps": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "peak_rss_mb": False,
+}
+
+
+def encode_body(body):
+    """Return ``(data, content_type)``; bytes are packed reading batches"""
+    if isinstance(body, bytes):
+        return body, PACKED_CONTENT_TYPE
+    return json.dumps(body).encode(), "application/json"
+
+
+class InProcessTarget:
+    """Call the API through Django's test client in this process"""
+
+    name = "in-process"
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, token=None, body=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = Client(raise_request_exception=False)
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        with CaptureQueriesContext(connection) as queries:
+            if body is None:
+                response = getattr(client, method)(path, **headers)
+            else:
+                data, content_type = encode_body(body)
+                response = getattr(client, method)(
+                    path, data, content_type=content_type, **headers
+                )
+        return response.status_code, len(queries)
+
+    def peak_rss_mb(self):
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def close(self):
+        connections.close_all()
+
+
+class HttpTarget:
+    """Call a running server over keep-alive HTTP connections, one per thread"""
+
+    name = "http"
+
+    def __init__(self, url: str, server_pid=None):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.server_pid = server_pid
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(
+                self.host, self.port, timeout=30
+            )
+        return conn
+
+    def request(self, method: str, path: str, token=None, body=None):
+        data, content_type = encode_body(body) if body is not None else (None, None)
+        headers = {"Content-Type": content_type or "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method.upper(), path, body=data, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                return response.status, None
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed an idle keep-alive connection; reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+
+    def peak_rss_mb(self):
+        if not self.server_pid:
+            return None
+        with open(f"/proc/{self.server_pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+        return None
+
+    def close(self):
+        pass
+
+
+def ingest_burst(rng, users, args):
+    # Milliseconds apart from now on, so no run collides with an earlier one
+    start = datetime.now(timezone.utc) + timedelta(days=1)
+    counter = itertools.count()
+
+    def call():
+        user = rng.choice(users)
+        offset = next(counter) * args.batch
+        body = [
+            {
+                "temperature": round(rng.uniform(15, 25), 2),
+                "humidity": round(rng.uniform(30, 60), 2),
+                "timestamp": (start + timedelta(milliseconds=offset + i)).isoformat(),
+            }
+            for i in range(args.batch)
+        ]
+        path = f"/api/sensors/{rng.choice(user['sensors'])}/readings/batch/"
+        return "post", path, user["token"], body
+
+    return call
+
+
+def ingest_packed(rng, users, args):
+    # A day further out than ingest_burst, so that both can run in one suite
+    start = datetime.now(timezone.utc) + timedelta(days=2)
+    start_ms = int(start.timestamp() * 1000)
+    counter = itertools.count()
+
+    def call():
+        user = rng.choice(users)
+        records = np.empty(args.batch, dtype=RECORD)
+        records["epoch_ms"] = (
+            start_ms + next(counter) * args.batch + np.arange(args.batch)
+        )
+        records["temperature"] = [round(rng.uniform(15, 25), 2) for _ in records]
+        records["humidity"] = [round(rng.uniform(30, 60), 2) for _ in records]
+        path = f"/api/sensors/{rng.choice(user['sensors'])}/readings/batch/"
+        return "post", path, user["token"], records.tobytes()
+
+    return call
+
+
+def dashboard(rng, users, args):
+    newest = Reading.objects.order_by("-timestamp").values_list("timestamp", flat=True)
+    end = newest.first() or datetime.now(timezone.utc)
+
+    def call():
+        user = rng.choice(users)
+        sensor = rng.choice(user["sensors"])
+        kind = rng.randrange(3)
+        if kind == 0:
+            return "get", "/api/sensors/overview/?hours=24", user["token"], None
+        if kind == 1:
+            since = (end - timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            path = f"/api/sensors/{sensor}/readings/?limit=500&timestamp_from={since}"
+            return "get", path, user["token"], None
+        since = (end - timedelta(days=7)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        path = (
+            f"/api/sensors/{sensor}/readings/aggregate/"
+            f"?bucket=1h&agg=avg,min,max&timestamp_from={since}"
+        )
+        return "get", path, user["token"], None
+
+    return call
+
+
+def sensor_detail(rng, users, args):
+    def call():
+        user = rng.choice(users)
+        path = f"/api/sensors/{rng.choice(user['sensors'])}/"
+        return "get", path, user["token"], None
+
+    return call
+
+
+def search(rng, users, args):
+    words = dataset.NAMES + dataset.MODELS
+
+    def call():
+        user = rng.choice(users)
+        word = rng.choice(words)
+        q = word[: rng.randint(2, len(word))]
+        if rng.random() < 0.5:
+            return "get", f"/api/sensors/search/?q={q}&limit=20", user["token"], None
+        return "get", f"/api/sensors/?q={q}", user["token"], None
+
+    return call
+
+
+def auth(rng, users, args):
+    def call():
+        user = rng.choice(users)
+        if rng.random() < 0.1:
+            body = {"email": user["email"], "password": dataset.BENCH_PASSWORD}
+            return "post", "/api/auth/token/", None, body
+        return "get", "/api/sensors/", user["token"], None
+
+    return call
+
+
+SCENARIOS = {
+    "ingest_burst": ingest_burst,
+    "ingest_packed": ingest_packed,
+    "dashboard": dashboard,
+    "sensor_detail": sensor_detail,
+    "search": search,
+    "auth": auth,
+}
+
+
+def percentile(ordered: list, p: int) -> float:
+    return ordered[max(math.ceil(len(ordered) * p / 100) - 1, 0)]
+
+
+def run_scenario(target, name: str, users: list, args) -> dict:
+    rng = random.Random(args.seed)
+    call = SCENARIOS[name](rng, users, args)
+    lock = threading.Lock()
+    # Draw every request up front so that threads share no random state
+    calls = [call() for _ in range(args.warmup + args.requests)]
+    warmup, measured = calls[: args.warmup], calls[args.warmup :]
+    for spec in warmup:
+        target.request(*spec)
+
+    latencies, statuses, queries = [], [], []
+
+    def one(spec):
+        started = time.perf_counter()
+        status, count = target.request(*spec)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses.append(status)
+            if count is not None:
+                queries.append(count)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, measured))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = {
+        "requests": len(measured),
+        "errors": sum(1 for status in statuses if status >= 400),
+        "rps": round(len(measured) / elapsed, 1),
+    }
+    for p in PERCENTILES:
+        result[f"p{p}_ms"] = round(percentile(latencies, p) * 1000, 2)
+    result["queries_per_request"] = (
+        round(sum(queries) / len(queries), 2) if queries else None
+    )
+    rss = target.peak_rss_mb()
+    result["peak_rss_mb"] = round(rss, 1) if rss is not None else None
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Return ``(scenario, metric, baseline, current)`` for every regression"""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = before.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            limit = old * (1 - tolerance) if higher_is_better else old * (1 + tolerance)
+            if new < limit if higher_is_better else new > limit:
+                regressions.append((name, metric, old, new))
+        old, new = before.get("queries_per_request"), current["queries_per_request"]
+        # Query counts are deterministic, so any increase is a regression
+        if old is not None and new is not None and new > old + 0.01:
+            regressions.append((name, "queries_per_request", old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="Benchmark a running server instead")
+    parser.add_argument("--server-pid", type=int, help="Server process for peak RSS")
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=SCENARIOS,
+        help="Run only this scenario; repeatable",
+    )
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--users", type=int, help="Use only the first N bench users")
+    parser.add_argument("--batch", type=int, default=100, help="Readings per ingest")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare the results to this JSON file")
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Overwrite --baseline with these results instead of comparing",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    users = dataset.fixture(args.users)
+    if not users:
+        sys.exit("No benchmark data; run benchmarks/dataset.py first")
+    target = HttpTarget(args.url, args.server_pid) if args.url else InProcessTarget()
+
+    results = {
+        "meta": {
+            "target": args.url or target.name,
+            "vendor": connection.vendor,
+            "settings": os.environ["DJANGO_SETTINGS_MODULE"],
+            "python": platform.python_version(),
+            "users": len(users),
+            "sensors": sum(len(user["sensors"]) for user in users),
+            "concurrency": args.concurrency,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+        "scenarios": {},
+    }
+    try:
+        for name in args.scenario or SCENARIOS:
+            results["scenarios"][name] = run_scenario(target, name, users, args)
+            print(json.dumps({"scenario": name, **results["scenarios"][name]}))
+    finally:
+        target.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+    elif args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, metric, old, new in regressions:
+            print(f"REGRESSION {name} {metric}: {old} -> {new}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# Serve the async sensors router; config/urls.py picks it from this setting
+os.environ.setdefault("API_ASYNC", "True")
+application = get_asgi_application()
@@ -0,0 +1,81 @@
+"""
+Production server: gunicorn managing uvicorn (ASGI) or threaded (WSGI) workers.
+
+    gunicorn -c config/gunicorn.conf.py
+
+Everything is configured from the environment:
+
+- ``WEB_INTERFACE``: ``asgi`` (default) serves ``config.asgi`` with uvicorn
+  workers, ``wsgi`` serves ``config.wsgi`` with threaded sync workers.
+- ``WEB_CONCURRENCY``: worker processes, one per CPU by default.
+- ``WEB_THREADS``: threads per WSGI worker (4). ASGI workers run one event
+  loop and hand ORM calls to threads of their own.
+- ``WEB_PRELOAD``: import Django once in the master before forking (True),
+  so workers start faster and share the imported code's memory.
+- ``WEB_TIMEOUT`` / ``WEB_GRACEFUL_TIMEOUT``: seconds before a silent worker
+  is killed, and seconds a stopping worker gets to finish its requests.
+- ``WEB_MAX_REQUESTS``: restart a worker after this many requests (0 never),
+  with up to 10% jitter so workers do not restart together.
+- ``PORT``: port to bind on all interfaces (8000).
+
+``DEBUG`` defaults to ``False`` here. ``kill -HUP`` restarts the workers
+gracefully. With preloading the code is loaded by the master, so deploy new
+code by restarting the server (or ``USR2`` then ``QUIT`` the old master).
+"""
+
+import multiprocessing
+import os
+
+os.environ.setdefault("DEBUG", "False")
+
+interface = os.environ.get("WEB_INTERFACE", "asgi")
+if interface == "asgi":
+    wsgi_app = "config.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+elif interface == "wsgi":
+    wsgi_app = "config.wsgi:application"
+    worker_class = "gthread"
+    threads = int(os.environ.get("WEB_THREADS", "4"))
+else:
+    raise ValueError(f"WEB_INTERFACE must be asgi or wsgi, not {interface!r}")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+preload_app = os.environ.get("WEB_PRELOAD", "True") == "True"
+timeout = int(os.environ.get("WEB_TIMEOUT", "30"))
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", "1000"))
+max_requests_jitter = max_requests // 10
+
+
+def _close_connections():
+    from django.apps import apps
+
+    if not apps.ready:
+        return
+    from django.db import connections
+
+    from config.postgresql.base import DatabaseWrapper
+
+    connections.close_all()
+    DatabaseWrapper.close_pools()
+
+
+def when_ready(server):
+    # Import the URLconf, and with it every API module, once in the master
+    # instead of on the first request of every worker
+    if server.cfg.preload_app:
+        from django.urls import get_resolver
+
+        get_resolver().url_patterns
+
+
+def pre_fork(server, worker):
+    # A connection or pool opened while preloading would be shared by every
+    # worker; drop them so that each worker opens its own
+    _close_connections()
+
+
+def worker_exit(server, worker):
+    _close_connections()
@@ -0,0 +1,47 @@
+"""
+Middleware that only pages outside the API need.
+
+The API authenticates with bearer tokens and never reads sessions, Django's
+``request.user`` or messages, yet every request would still pay for them in
+a flat ``MIDDLEWARE`` list. ``BrowserMiddleware`` runs the middleware listed
+in ``BROWSER_MIDDLEWARE`` around the rest of the chain for every path except
+those under ``API_PATH_PREFIX``, which skip straight past them.
+
+The wrapped middleware only take part through ``__call__``. Django collects
+``process_view``, ``process_exception`` and ``process_template_response``
+hooks from ``MIDDLEWARE`` alone, so middleware that define them are refused.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+HOOKS = ("process_view", "process_exception", "process_template_response")
+
+
+class BrowserMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.API_PATH_PREFIX
+        handler = get_response
+        for path in reversed(settings.BROWSER_MIDDLEWARE):
+            middleware = import_string(path)
+            hooks = [hook for hook in HOOKS if hasattr(middleware, hook)]
+            if hooks:
+                raise ImproperlyConfigured(
+                    f"{path} defines {', '.join(hooks)}; list it in MIDDLEWARE"
+                )
+            # MiddlewareMixin follows the sync or async mode of its get_response
+            handler = middleware(handler)
+        self.browser_response = handler
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if request.path_info.startswith(self.prefix):
+            return self.get_response(request)
+        return self.browser_response(request)
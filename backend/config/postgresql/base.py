@@ -0,0 +1,117 @@
+"""
+PostgreSQL backend that borrows connections from a psycopg 3 pool.
+
+Django 4.2 opens a new connection for every request unless ``CONN_MAX_AGE``
+keeps one per thread. Under ASGI each request runs its queries on a thread of
+its own, so persistent connections are rarely reused there. With
+``OPTIONS["pool"]`` set, this backend checks a connection out of one
+``psycopg_pool.ConnectionPool`` per process and database and returns it
+when Django closes the connection at the end of the request. Sync views and
+the async ORM's worker threads therefore share the same warm connections.
+
+``OPTIONS["pool"]`` is ``True`` or a dict of ``ConnectionPool`` arguments
+(``min_size``, ``max_size``, ``timeout``, ``max_idle``, ``max_lifetime``...).
+With ``CONN_HEALTH_CHECKS`` the pool checks each connection before handing
+it out. Pooling requires ``CONN_MAX_AGE = 0``, the same as Django 5.1's
+built-in pool, which this class can be replaced with after an upgrade.
+"""
+
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+
+
+class DatabaseCreation(base.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Pooled connections to the test database would block DROP DATABASE
+        type(self.connection).close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    # (alias, database name) -> ConnectionPool, shared by every thread; the
+    # name is part of the key because the test runner renames the database
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        options = self.settings_dict["OPTIONS"].get("pool")
+        if not options or self.alias == NO_DB_ALIAS:
+            return None
+        if not base.is_psycopg3:
+            raise ImproperlyConfigured("Connection pooling requires psycopg 3")
+        if self.settings_dict["CONN_MAX_AGE"]:
+            raise ImproperlyConfigured(
+                "Pooled connections must not be persistent; set CONN_MAX_AGE to 0"
+            )
+
+        key = (self.alias, self.settings_dict["NAME"])
+        with self._pools_lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                from psycopg_pool import ConnectionPool
+
+                kwargs = self.get_connection_params()
+                # Django sets the mode it wants after checking a connection out
+                kwargs["autocommit"] = True
+                pool = self._pools[key] = ConnectionPool(
+                    kwargs=kwargs,
+                    name=self.alias,
+                    open=False,
+                    check=(
+                        ConnectionPool.check_connection
+                        if self.settings_dict["CONN_HEALTH_CHECKS"]
+                        else None
+                    ),
+                    **({} if options is True else options),
+                )
+                pool.open()
+        return pool
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop("pool", None)
+        return params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connection = pool.getconn()
+        self._checked_out_from = pool
+        level = self.settings_dict["OPTIONS"].get("isolation_level")
+        self.isolation_level = base.IsolationLevel(
+            base.IsolationLevel.READ_COMMITTED if level is None else level
+        )
+        if level is not None:
+            connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        pool = getattr(self, "_checked_out_from", None)
+        if self.connection is None or pool is None:
+            return super()._close()
+        self._checked_out_from = None
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
+
+    def pool_stats(self) -> dict:
+        """Usage counters of this process's pool, empty without a pool"""
+        pool = self.pool
+        return pool.get_stats() if pool is not None else {}
+
+    @classmethod
+    def close_pools(cls, name=None):
+        """Close the pools of database ``name``, or all of them"""
+        with cls._pools_lock:
+            keys = [key for key in cls._pools if name is None or key[1] == name]
+            pools = [cls._pools.pop(key) for key in keys]
+        for pool in pools:
+            pool.close()
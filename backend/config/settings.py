@@ -5,7 +5,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.environ.get("SECRET_KEY", "django-insecure-dev-key")
 DEBUG = os.environ.get("DEBUG", "True") == "True"
-ALLOWED_HOSTS = ["*"]
+ALLOWED_HOSTS = os.environ.get("ALLOWED_HOSTS", "*").split(",")
 
 INSTALLED_APPS = [
     "django.contrib.admin",
@@ -16,20 +16,32 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "corsheaders",
     "apps.auth.apps.CustomAuthConfig",
-    "apps.sensors",
-    "apps.readings",
+    "apps.sensors.apps.SensorsConfig",
+    "apps.readings.apps.ReadingsConfig",
+    "apps.metrics.apps.MetricsConfig",
+    "apps.alerts.apps.AlertsConfig",
 ]
 
 MIDDLEWARE = [
+    "apps.metrics.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
+    "config.middleware.BrowserMiddleware",
+]
+
+# Run by BrowserMiddleware for the admin only; the API authenticates with
+# bearer tokens and needs no sessions, request.user or messages
+API_PATH_PREFIX = "/api/"
+BROWSER_MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+# The admin checks look for these middleware in MIDDLEWARE only
+SILENCED_SYSTEM_CHECKS = ["admin.E408", "admin.E409", "admin.E410"]
 
 ROOT_URLCONF = "config.urls"
 
@@ -37,8 +49,17 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # Compile each template once per process, also with DEBUG on
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                )
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -50,17 +71,39 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "config.wsgi.application"
+ASGI_APPLICATION = "config.asgi.application"
+
+# Serve apps.sensors.async_api instead of apps.sensors.api; set by config/asgi.py
+API_ASYNC = os.environ.get("API_ASYNC", "False") == "True"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        # django.db.backends.postgresql plus a psycopg 3 pool, see config/postgresql
+        "ENGINE": "config.postgresql",
         "NAME": os.environ.get("DATABASE_NAME", "sensordb"),
         "USER": os.environ.get("DATABASE_USER", "sensoruser"),
         "PASSWORD": os.environ.get("DATABASE_PASSWORD", "sensorpass"),
         "HOST": os.environ.get("DATABASE_HOST", "db"),
         "PORT": os.environ.get("DATABASE_PORT", "5432"),
+        # Used when the pool is off: keep each thread's connection this long
+        "CONN_MAX_AGE": int(os.environ.get("DATABASE_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
+# Each process holds up to DATABASE_POOL_MAX_SIZE connections, so keep
+# processes x max size below the server's max_connections
+if os.environ.get("DATABASE_POOL", "True") == "True":
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.environ.get("DATABASE_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.environ.get("DATABASE_POOL_MAX_SIZE", "10")),
+            # Seconds a request waits for a free connection before failing
+            "timeout": float(os.environ.get("DATABASE_POOL_TIMEOUT", "10")),
+            "max_idle": 300,
+            "max_lifetime": 3600,
+        }
+    }
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -86,3 +129,73 @@ CORS_ALLOW_CREDENTIALS = True
 JWT_SECRET = os.environ.get("JWT_SECRET", "your-secret-key-change-in-prod")
 JWT_ALGORITHM = "HS256"
 JWT_EXP_DELTA_SECONDS = 86400
+
+READINGS_BATCH_MAX_SIZE = int(os.environ.get("READINGS_BATCH_MAX_SIZE", "5000"))
+READINGS_BULK_BATCH_SIZE = int(os.environ.get("READINGS_BULK_BATCH_SIZE", "1000"))
+READINGS_ROLLUPS_ENABLED = os.environ.get("READINGS_ROLLUPS_ENABLED", "True") == "True"
+
+SENSORS_PAGE_SIZE = 10
+SENSORS_MAX_PAGE_SIZE = 100
+READINGS_PAGE_SIZE = 500
+READINGS_MAX_PAGE_SIZE = 5000
+READINGS_EXPORT_CHUNK_SIZE = 2000
+READINGS_MAX_POINTS = 10000
+# Largest range max_points downsamples; longer ranges answer 400
+READINGS_DOWNSAMPLE_MAX_ROWS = 1_000_000
+READINGS_PARTITION_MONTHS_AHEAD = 3
+# Raw readings older than this are compacted to rollups by compact_readings;
+# 0 keeps them forever. Sensors can override it with retention_days.
+READINGS_RETENTION_DAYS = int(os.environ.get("READINGS_RETENTION_DAYS", "90"))
+READINGS_RETENTION_BATCH_SIZE = 5000
+
+# "local" fans out within one process; "postgres" relays through LISTEN/NOTIFY
+READINGS_STREAM_BACKEND = os.environ.get("READINGS_STREAM_BACKEND", "local")
+READINGS_STREAM_QUEUE_SIZE = 1000
+READINGS_STREAM_HEARTBEAT = 15
+
+# Write-behind buffer for POST /sensors/{id}/readings/, see apps/readings/buffer.py
+READINGS_BUFFER_ENABLED = os.environ.get("READINGS_BUFFER_ENABLED", "False") == "True"
+READINGS_BUFFER_DURABILITY = os.environ.get("READINGS_BUFFER_DURABILITY", "commit")
+READINGS_BUFFER_JOURNAL = os.environ.get("READINGS_BUFFER_JOURNAL", "")
+READINGS_BUFFER_MAX_BATCH = int(os.environ.get("READINGS_BUFFER_MAX_BATCH", "1000"))
+READINGS_BUFFER_MAX_DELAY = float(os.environ.get("READINGS_BUFFER_MAX_DELAY", "0.05"))
+READINGS_BUFFER_MAX_PENDING = 100000
+READINGS_BUFFER_COMMIT_TIMEOUT = 5.0
+
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+if os.environ.get("CACHE_URL"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["CACHE_URL"],
+    }
+
+# Response cache and ETags for sensor and reading GETs, see apps/sensors/caching.py.
+# Needs a cache shared by every process that serves the API or writes readings.
+SENSORS_CACHE_ENABLED = os.environ.get("SENSORS_CACHE_ENABLED", "False") == "True"
+SENSORS_CACHE_ALIAS = "default"
+SENSORS_CACHE_TIMEOUT = 300
+SENSORS_CACHE_LIVE_WINDOW = 300
+
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_USER_CACHE_SIZE = 10000
+AUTH_USER_CACHE_TTL = 300
+
+# Request metrics served at /api/metrics/, see apps/metrics/instrumentation.py
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "True") == "True"
+# When set, scrapers must send "Authorization: Bearer <METRICS_TOKEN>"; with
+# DEBUG off the endpoint answers 403 until it is set
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Fraction of requests to profile; profiles slower than the threshold are kept
+METRICS_PROFILE_RATE = float(os.environ.get("METRICS_PROFILE_RATE", "0"))
+METRICS_PROFILE_SLOW_SECONDS = float(
+    os.environ.get("METRICS_PROFILE_SLOW_SECONDS", "0.5")
+)
+METRICS_PROFILE_DIR = os.environ.get("METRICS_PROFILE_DIR", "/tmp/api-profiles")
+
+# Alert rules checked as readings are written, see apps/alerts/evaluation.py
+ALERTS_ENABLED = os.environ.get("ALERTS_ENABLED", "True") == "True"
+# Seconds other workers may take to notice a sensor's first rule or last deletion
+ALERTS_RULES_TTL = 30
+ALERTS_MAX_WINDOW = 1000
+ALERTS_PAGE_SIZE = 50
+ALERTS_MAX_PAGE_SIZE = 500
@@ -1,13 +1,29 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 from ninja import NinjaAPI
+from apps.alerts.api import router as alerts_router
 from apps.auth.api import router as auth_router
-from apps.sensors.api import router as sensors_router
+from apps.metrics.api import router as metrics_router
+from apps.metrics.instrumentation import MetricsJSONRenderer
+from apps.sensors.parsers import ReadingsParser
 
-api = NinjaAPI(title="Sensor Readings API", version="1.0.0")
+if settings.API_ASYNC:
+    from apps.sensors.async_api import router as sensors_router
+else:
+    from apps.sensors.api import router as sensors_router
+
+api = NinjaAPI(
+    title="Sensor Readings API",
+    version="1.0.0",
+    renderer=MetricsJSONRenderer(),
+    parser=ReadingsParser(),
+)
 
 api.add_router("/auth/", auth_router, tags=["Authentication"])
 api.add_router("/sensors/", sensors_router, tags=["Sensors"])
+api.add_router("/metrics/", metrics_router, tags=["Metrics"])
+api.add_router("/alerts/", alerts_router, tags=["Alerts"])
 
 urlpatterns = [
     path("admin/", admin.site.urls),
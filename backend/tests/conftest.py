@@ -1,18 +1,40 @@
+import os
 import pytest
 from django.contrib.auth import get_user_model
 from ninja.testing import TestClient
 from ninja import NinjaAPI
+from apps.alerts.api import router as alerts_router
+from apps.alerts.evaluation import invalidate_rules, rule_sensor_ids
 from apps.auth.api import router as auth_router
 from apps.sensors.api import router as sensors_router
-from apps.auth.utils import create_token
+from apps.metrics.api import router as metrics_router
+from apps.metrics.instrumentation import MetricsJSONRenderer
+from apps.sensors.parsers import ReadingsParser
+from apps.auth.utils import create_token, token_cache, user_cache
 
 User = get_user_model()
 
+# test_api is mounted both by TestClient and by the URLconf of test_metrics
+os.environ.setdefault("NINJA_SKIP_REGISTRY", "1")
+
 test_api = NinjaAPI(
-    title="Test Sensor Readings API", version="1.0.0", urls_namespace="testapi"
+    title="Test Sensor Readings API",
+    version="1.0.0",
+    urls_namespace="testapi",
+    renderer=MetricsJSONRenderer(),
+    parser=ReadingsParser(),
 )
 test_api.add_router("/auth/", auth_router, tags=["Authentication"])
 test_api.add_router("/sensors/", sensors_router, tags=["Sensors"])
+test_api.add_router("/metrics/", metrics_router, tags=["Metrics"])
+test_api.add_router("/alerts/", alerts_router, tags=["Alerts"])
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    token_cache.clear()
+    user_cache.clear()
+    invalidate_rules()
 
 
 @pytest.fixture(scope="session")
@@ -32,3 +54,23 @@ def auth_user():
 @pytest.fixture
 def auth_token(auth_user):
     return create_token(auth_user.id)
+
+
+@pytest.fixture
+def assert_max_queries(client, auth_token, django_assert_max_num_queries):
+    """
+    Return ``check(method, path, limit, **kwargs)``, which calls an endpoint
+    with warm auth and alert rule caches and fails if it issues more than
+    ``limit`` queries.
+    """
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    client.get("/sensors/", headers=headers)
+    rule_sensor_ids()
+
+    def check(method, path, limit, **kwargs):
+        with django_assert_max_num_queries(limit):
+            response = getattr(client, method)(path, headers=headers, **kwargs)
+        assert response.status_code < 400
+        return response
+
+    return check
@@ -0,0 +1,259 @@
+import numpy as np
+import pytest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.contrib.auth import get_user_model
+from apps.alerts.evaluation import RingBuffer, track_alerts
+from apps.alerts.models import Alert, AlertRule, AlertWindow
+from apps.sensors.models import Sensor
+
+User = get_user_model()
+
+BASE = datetime(2024, 1, 15, 10, 0, tzinfo=dt_timezone.utc)
+
+
+def minute(n):
+    return BASE + timedelta(minutes=n)
+
+
+@pytest.fixture
+def sensor(auth_user):
+    return Sensor.objects.create(owner=auth_user, name="Alerting", model="A1")
+
+
+@pytest.fixture
+def headers(auth_token):
+    return {"Authorization": f"Bearer {auth_token}"}
+
+
+def post_batch(client, sensor, headers, readings):
+    return client.post(
+        f"/sensors/{sensor.id}/readings/batch/",
+        json=[
+            {"temperature": t, "humidity": h, "timestamp": minute(n).isoformat()}
+            for n, t, h in readings
+        ],
+        headers=headers,
+    )
+
+
+def alerts(rule):
+    return list(
+        Alert.objects.filter(rule=rule)
+        .order_by("started_at")
+        .values_list("started_at", "last_at", "ended_at", "readings", "peak")
+    )
+
+
+def test_ring_buffer_keeps_the_latest_values():
+    ring = RingBuffer(4, [1.0, 2.0, 3.0])
+    ring.extend(np.array([4.0, 5.0]))
+    assert ring.values().tolist() == [2.0, 3.0, 4.0, 5.0]
+
+    ring.extend(np.arange(10.0, 16.0))
+    assert ring.values().tolist() == [12.0, 13.0, 14.0, 15.0]
+    assert RingBuffer.frombytes(ring.tobytes(), 3).values().tolist() == [
+        13.0,
+        14.0,
+        15.0,
+    ]
+
+
+def test_nan_scores_leave_alerts_unchanged():
+    rule = AlertRule(id=1, sensor_id=1, kind=AlertRule.THRESHOLD, upper=25.0)
+    open_alert = Alert(rule=rule, started_at=minute(0), last_at=minute(0), readings=1)
+    open_alert.peak = 26.0
+
+    created, changed = track_alerts(
+        rule,
+        open_alert,
+        np.array([np.nan, 30.0, np.nan, 20.0, np.nan]),
+        [minute(n) for n in range(1, 6)],
+    )
+
+    assert created == [] and changed == [open_alert]
+    assert (open_alert.readings, open_alert.peak) == (2, 30.0)
+    assert (open_alert.last_at, open_alert.ended_at) == (minute(2), minute(4))
+    assert track_alerts(rule, None, np.array([np.nan]), [minute(6)]) == ([], [])
+
+
+@pytest.mark.django_db
+def test_threshold_alerts_span_batches(client, sensor, headers):
+    rule = AlertRule.objects.create(
+        sensor=sensor, kind=AlertRule.THRESHOLD, metric="temperature", upper=25.0
+    )
+
+    post_batch(
+        client,
+        sensor,
+        headers,
+        [
+            (4, 27.0, 50.0),
+            (0, 20.0, 50.0),
+            (1, 26.0, 50.0),
+            (2, 28.0, 50.0),
+            (3, 22.0, 50.0),
+        ],
+    )
+    assert alerts(rule) == [
+        (minute(1), minute(2), minute(3), 2, 28.0),
+        (minute(4), minute(4), None, 1, 27.0),
+    ]
+
+    client.post(
+        f"/sensors/{sensor.id}/readings/",
+        json={
+            "temperature": 29.0,
+            "humidity": 50.0,
+            "timestamp": minute(5).isoformat(),
+        },
+        headers=headers,
+    )
+    # Late readings are not evaluated
+    post_batch(client, sensor, headers, [(-1, 40.0, 50.0), (6, 21.0, 50.0)])
+
+    assert alerts(rule)[1] == (minute(4), minute(5), minute(6), 2, 29.0)
+    assert AlertWindow.objects.get(sensor=sensor).last_timestamp == minute(6)
+
+
+@pytest.mark.django_db
+def test_rate_and_zscore_alerts(client, sensor, headers):
+    # Readings from before the rules exist fill the z-score window
+    post_batch(client, sensor, headers, [(n, 20.0 + n % 2, 50.0) for n in range(5)])
+    zscore = AlertRule.objects.create(
+        sensor=sensor, kind=AlertRule.ZSCORE, metric="temperature", limit=3.0, window=5
+    )
+    rate = AlertRule.objects.create(
+        sensor=sensor, kind=AlertRule.RATE, metric="humidity", limit=5.0
+    )
+
+    post_batch(client, sensor, headers, [(5, 30.0, 51.0), (6, 20.0, 53.0)])
+    post_batch(client, sensor, headers, [(7, 21.0, 62.0), (9, 20.0, 66.0)])
+
+    # 20, 21, 20, 21, 20 have mean 20.4 and standard deviation 0.49
+    [(started_at, _, ended_at, readings, peak)] = alerts(zscore)
+    assert (started_at, ended_at, readings) == (minute(5), minute(6), 1)
+    assert peak == pytest.approx(9.6 / 0.4899, rel=1e-3)
+    # +9 in the minute before 7, then +4 over the two minutes before 9
+    assert alerts(rate) == [(minute(7), minute(7), minute(9), 1, 9.0)]
+
+
+@pytest.mark.django_db
+def test_alert_rules_api(client, sensor, headers):
+    rule = {"sensor_id": sensor.id, "kind": "threshold", "metric": "humidity"}
+    response = client.post("/alerts/rules/", json=rule, headers=headers)
+    assert response.status_code == 400
+    assert response.json() == {"detail": "A threshold rule needs lower, upper or both"}
+
+    response = client.post(
+        "/alerts/rules/", json={**rule, "lower": 30.0, "upper": 70.0}, headers=headers
+    )
+    assert response.status_code == 201
+    rule_id = response.json()["id"]
+
+    other = User.objects.create_user(
+        email="other@example.com", username="other", password="pass"
+    )
+    foreign = Sensor.objects.create(owner=other, name="Foreign", model="F1")
+    response = client.post(
+        "/alerts/rules/",
+        json={**rule, "sensor_id": foreign.id, "upper": 1.0},
+        headers=headers,
+    )
+    assert response.status_code == 404
+
+    response = client.put(
+        f"/alerts/rules/{rule_id}/", json={"kind": "zscore"}, headers=headers
+    )
+    assert response.json() == {"detail": "A zscore rule needs a limit"}
+    response = client.put(
+        f"/alerts/rules/{rule_id}/", json={"lower": 40.0}, headers=headers
+    )
+    assert response.json()["lower"] == 40.0
+
+    response = client.get(f"/alerts/rules/?sensor_id={sensor.id}", headers=headers)
+    assert [item["id"] for item in response.json()] == [rule_id]
+
+    response = client.delete(f"/alerts/rules/{rule_id}/", headers=headers)
+    assert response.status_code == 204
+    assert not AlertRule.objects.exists()
+
+
+@pytest.mark.django_db
+def test_list_alerts(client, sensor, headers):
+    AlertRule.objects.create(
+        sensor=sensor, kind=AlertRule.THRESHOLD, metric="temperature", lower=0.0
+    )
+    post_batch(
+        client,
+        sensor,
+        headers,
+        [
+            (0, -1.0, 50.0),
+            (1, 5.0, 50.0),
+            (2, -2.0, 50.0),
+            (3, 5.0, 50.0),
+            (4, -3.0, 50.0),
+        ],
+    )
+
+    response = client.get("/alerts/?limit=2", headers=headers)
+    page = response.json()
+    assert [item["peak"] for item in page["items"]] == [-3.0, -2.0]
+    response = client.get(f"/alerts/?cursor={page['next']}", headers=headers)
+    assert [item["peak"] for item in response.json()["items"]] == [-1.0]
+
+    response = client.get("/alerts/?open=true", headers=headers)
+    [alert] = response.json()["items"]
+    assert (alert["started_at"], alert["ended_at"]) == ("2024-01-15T10:04:00Z", None)
+
+
+@pytest.mark.django_db
+def test_editing_a_rule_closes_its_alert(client, sensor, headers):
+    rule = AlertRule.objects.create(
+        sensor=sensor, kind=AlertRule.THRESHOLD, metric="temperature", upper=25.0
+    )
+    post_batch(client, sensor, headers, [(0, 30.0, 50.0), (1, 31.0, 50.0)])
+    assert alerts(rule)[0][2] is None
+
+    response = client.put(
+        f"/alerts/rules/{rule.id}/", json={"enabled": False}, headers=headers
+    )
+    assert response.status_code == 200
+    assert alerts(rule) == [(minute(0), minute(1), minute(1), 2, 31.0)]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("field", ["kind", "metric", "window", "enabled"])
+def test_rule_fields_cannot_be_set_to_null(client, sensor, headers, field):
+    rule = AlertRule.objects.create(
+        sensor=sensor, kind=AlertRule.THRESHOLD, metric="temperature", upper=25.0
+    )
+
+    response = client.put(
+        f"/alerts/rules/{rule.id}/", json={field: None}, headers=headers
+    )
+    assert response.status_code == 422
+
+    # Nullable bounds can still be cleared
+    response = client.put(
+        f"/alerts/rules/{rule.id}/",
+        json={"lower": 0.0, "upper": None},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["upper"] is None
+
+
+@pytest.mark.django_db
+def test_missing_windows_are_created(client, sensor, headers):
+    post_batch(client, sensor, headers, [(0, 20.0, 50.0)])
+    rule = AlertRule.objects.create(
+        sensor=sensor, kind=AlertRule.RATE, metric="temperature", limit=5.0
+    )
+    AlertWindow.objects.all().delete()
+
+    post_batch(client, sensor, headers, [(1, 30.0, 50.0), (2, 31.0, 50.0)])
+
+    # The new window starts from the reading before the batch
+    assert alerts(rule) == [(minute(1), minute(1), minute(2), 1, 10.0)]
+    assert AlertWindow.objects.get(sensor=sensor).last_timestamp == minute(2)
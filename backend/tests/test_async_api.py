@@ -0,0 +1,182 @@
+import struct
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import path
+from ninja import NinjaAPI
+from ninja.testing import TestAsyncClient
+from apps.sensors.async_api import router as async_sensors_router
+from apps.sensors.models import Sensor
+from apps.sensors.parsers import ReadingsParser
+from apps.readings.export import aiter_export, iter_csv
+from apps.readings.packed import CONTENT_TYPE as PACKED_CONTENT_TYPE
+from apps.readings.models import Reading
+
+async_api = NinjaAPI(
+    title="Async Sensor Readings API",
+    version="1.0.0",
+    urls_namespace="asyncapi",
+    parser=ReadingsParser(),
+)
+async_api.add_router("/sensors/", async_sensors_router, tags=["Sensors"])
+
+# For tests that need real requests rather than TestAsyncClient's mocks
+urlpatterns = [path("api/", async_api.urls)]
+
+
+@pytest.fixture(scope="session")
+def async_client():
+    client = TestAsyncClient(async_api)
+
+    def call(method, path, **kwargs):
+        return async_to_sync(getattr(client, method))(path, **kwargs)
+
+    return call
+
+
+@pytest.mark.django_db
+def test_async_sensor_crud(async_client, auth_user, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    created = async_client(
+        "post", "/sensors/", json={"name": "Async", "model": "A1"}, headers=headers
+    )
+    assert created.status_code == 201
+    sensor_id = created.json()["id"]
+
+    listed = async_client("get", "/sensors/?q=async", headers=headers).json()
+    assert [item["id"] for item in listed["items"]] == [sensor_id]
+    assert listed["next"] is None
+
+    found = async_client("get", "/sensors/search/?q=asy", headers=headers).json()
+    assert [item["id"] for item in found] == [sensor_id]
+
+    overview = async_client("get", "/sensors/overview/", headers=headers).json()
+    assert [(item["id"], item["latest"]) for item in overview["items"]] == [
+        (sensor_id, None)
+    ]
+
+    updated = async_client(
+        "put", f"/sensors/{sensor_id}/", json={"model": "A2"}, headers=headers
+    )
+    assert updated.json()["model"] == "A2"
+
+    assert (
+        async_client("delete", f"/sensors/{sensor_id}/", headers=headers).status_code
+        == 204
+    )
+    assert not Sensor.objects.filter(id=sensor_id).exists()
+
+
+@pytest.mark.django_db
+def test_async_readings(async_client, auth_user, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    sensor = Sensor.objects.create(owner=auth_user, name="S", model="M")
+
+    created = async_client(
+        "post",
+        f"/sensors/{sensor.id}/readings/",
+        json={
+            "temperature": 21.5,
+            "humidity": 40.0,
+            "timestamp": "2024-01-15T10:00:00Z",
+        },
+        headers=headers,
+    )
+    batch = async_client(
+        "post",
+        f"/sensors/{sensor.id}/readings/batch/",
+        json=[
+            {
+                "temperature": 22.0,
+                "humidity": 41.0,
+                "timestamp": "2024-01-15T10:01:00Z",
+            },
+            {
+                "temperature": 23.0,
+                "humidity": 42.0,
+                "timestamp": "2024-01-15T10:00:00Z",
+            },
+        ],
+        headers=headers,
+    )
+    page = async_client(
+        "get", f"/sensors/{sensor.id}/readings/?limit=1", headers=headers
+    ).json()
+
+    assert created.status_code == 201
+    assert batch.json()["accepted"] == 1
+    assert batch.json()["duplicates"] == 1
+    assert Reading.objects.filter(sensor=sensor).count() == 2
+    assert page["items"][0]["temperature"] == 22.0
+    assert page["next"]
+
+    downsampled = async_client(
+        "get", f"/sensors/{sensor.id}/readings/?max_points=6", headers=headers
+    ).json()
+    assert [item["temperature"] for item in downsampled["items"]] == [22.0, 21.5]
+
+
+@pytest.mark.urls(__name__)
+@pytest.mark.django_db
+def test_async_packed_batch(auth_user, auth_token):
+    sensor = Sensor.objects.create(owner=auth_user, name="S", model="M")
+    body = struct.pack("<qff", 1705312800000, 22.5, 41.0) * 2
+
+    async def post():
+        return await AsyncClient().post(
+            f"/api/sensors/{sensor.id}/readings/batch/",
+            body,
+            content_type=PACKED_CONTENT_TYPE,
+            headers={"Authorization": f"Bearer {auth_token}"},
+        )
+
+    response = async_to_sync(post)()
+
+    assert response.status_code == 200
+    assert response.json()["accepted"] == 1
+    assert response.json()["duplicates"] == 1
+    reading = Reading.objects.get(sensor=sensor)
+    assert (reading.timestamp.isoformat(), reading.temperature) == (
+        "2024-01-15T10:00:00+00:00",
+        22.5,
+    )
+
+
+@pytest.mark.django_db
+def test_async_auth_and_ownership(async_client, auth_user, auth_token):
+    other = Sensor.objects.create(
+        owner=type(auth_user).objects.create_user(
+            email="other@example.com", username="other", password="pass"
+        ),
+        name="Other",
+        model="M",
+    )
+
+    assert async_client("get", "/sensors/").status_code == 401
+    assert (
+        async_client(
+            "get", "/sensors/", headers={"Authorization": "Bearer invalid"}
+        ).status_code
+        == 401
+    )
+    response = async_client(
+        "get",
+        f"/sensors/{other.id}/readings/",
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_async_export_matches_sync_encoder(auth_user):
+    sensor = Sensor.objects.create(owner=auth_user, name="S", model="M")
+    Reading.objects.create(
+        sensor=sensor, temperature=20.0, humidity=50.0, timestamp="2024-01-15T10:00Z"
+    )
+    rows = Reading.objects.values_list("id", "timestamp", "temperature", "humidity")
+
+    async def collect():
+        return [chunk async for chunk in aiter_export(rows.iterator(), "csv", 1)]
+
+    assert "".join(async_to_sync(collect)()) == "".join(iter_csv(rows, 1))
@@ -1,5 +1,6 @@
 import pytest
 from django.contrib.auth import get_user_model
+from apps.auth.utils import cache_stats
 
 User = get_user_model()
 
@@ -59,3 +60,28 @@ def test_login_invalid_credentials(client):
     )
 
     assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_token_auth_is_cached(client, auth_user, auth_token, django_assert_num_queries):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    client.get("/sensors/", headers=headers)
+
+    # Only the sensor list query remains once the user is cached
+    with django_assert_num_queries(1):
+        response = client.get("/sensors/", headers=headers)
+
+    assert response.status_code == 200
+    assert cache_stats()["token"]["hits"] == 1
+    assert cache_stats()["user"]["hits"] == 1
+
+
+@pytest.mark.django_db
+def test_cached_user_is_invalidated(client, auth_user, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    client.get("/sensors/", headers=headers)
+
+    auth_user.delete()
+    response = client.get("/sensors/", headers=headers)
+
+    assert response.status_code == 401
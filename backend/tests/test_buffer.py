@@ -0,0 +1,192 @@
+import fcntl
+import json
+import pytest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from apps.readings import buffer as buffer_module
+from apps.readings.buffer import BufferFull, IngestBuffer
+from apps.readings.models import Reading
+from apps.sensors.models import Sensor
+from django.db import InterfaceError, OperationalError
+
+START = datetime(2024, 1, 15, 10, 0, tzinfo=dt_timezone.utc)
+
+
+@pytest.fixture
+def sensor(auth_user):
+    return Sensor.objects.create(owner=auth_user, name="TestSensor", model="TestModel")
+
+
+def _submit(ingest_buffer, sensor_id, count):
+    for minute in range(count):
+        ingest_buffer.submit(
+            sensor_id,
+            temperature=20.0 + minute,
+            humidity=50.0,
+            timestamp=START + timedelta(minutes=minute),
+        )
+
+
+@pytest.mark.django_db
+def test_journal_buffer_group_commits_and_truncates(sensor, tmp_path):
+    ingest_buffer = IngestBuffer(
+        durability="journal", journal_path=str(tmp_path / "ingest.journal"), max_batch=2
+    )
+    journal = Path(ingest_buffer.journal_path)
+
+    _submit(ingest_buffer, sensor.id, 3)
+
+    assert len(journal.read_text().splitlines()) == 3
+    assert Reading.objects.count() == 0
+    assert ingest_buffer.flush() == 2
+    assert journal.stat().st_size > 0
+    assert ingest_buffer.flush() == 1
+    assert journal.stat().st_size == 0
+    assert Reading.objects.filter(sensor=sensor).count() == 3
+
+    stats = ingest_buffer.stats()
+    assert stats["depth"] == 0
+    assert stats["flushes"] == 2
+    assert stats["flushed"] == 3
+    assert stats["journal_syncs"] == 3
+
+
+@pytest.mark.django_db
+def test_journal_is_replayed_and_deleted_sensors_are_skipped(
+    auth_user, sensor, tmp_path
+):
+    gone = Sensor.objects.create(owner=auth_user, name="Gone", model="M")
+    journal = tmp_path / "ingest.journal"
+    journal.write_text(
+        json.dumps([sensor.id, START.isoformat(), 21.0, 40.0])
+        + "\n"
+        + json.dumps([gone.id, START.isoformat(), 22.0, 41.0])
+        + "\n"
+        + '[1, "2024-01'
+    )
+    gone.delete()
+
+    ingest_buffer = IngestBuffer(durability="journal", journal_path=str(journal))
+    assert ingest_buffer.replay() == 2
+    assert ingest_buffer.flush() == 2
+
+    assert list(Reading.objects.values_list("sensor_id", "temperature")) == [
+        (sensor.id, 21.0)
+    ]
+    assert ingest_buffer.stats()["discarded"] == 1
+
+
+@pytest.mark.django_db
+def test_only_orphaned_journals_are_adopted(sensor, tmp_path):
+    base = tmp_path / "ingest.journal"
+    entry = json.dumps([sensor.id, START.isoformat(), 21.0, 40.0]) + "\n"
+    (tmp_path / "ingest.journal.1").write_text(entry)
+    live = open(tmp_path / "ingest.journal.1", "ab")
+    fcntl.flock(live, fcntl.LOCK_EX)
+    (tmp_path / "ingest.journal.2").write_text(entry)
+
+    ingest_buffer = IngestBuffer(durability="journal", journal_path=str(base))
+    assert ingest_buffer.replay() == 1
+    live.close()
+
+    assert not (tmp_path / "ingest.journal.2").exists()
+    assert Path(ingest_buffer.journal_path).read_text() == entry
+    assert ingest_buffer.flush() == 1
+    assert Path(ingest_buffer.journal_path).stat().st_size == 0
+    assert (tmp_path / "ingest.journal.1").read_text() == entry
+
+
+# Like the flusher, outside a transaction, so that failed writes roll back
+@pytest.mark.django_db(transaction=True)
+def test_failing_batches_are_written_apart(sensor):
+    ingest_buffer = IngestBuffer(durability="memory")
+    _submit(ingest_buffer, sensor.id, 2)
+    # Only a constraint would catch a missing value, so it fails the batch
+    ingest_buffer.submit(
+        sensor.id, temperature=None, humidity=50.0, timestamp=START - timedelta(hours=1)
+    )
+
+    assert ingest_buffer.flush() == 3
+
+    stats = ingest_buffer.stats()
+    assert (stats["depth"], stats["flushed"], stats["rejected"]) == (0, 2, 1)
+    assert Reading.objects.filter(sensor=sensor).count() == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_outages_are_retried_without_rejecting(sensor, monkeypatch):
+    ingest_buffer = IngestBuffer(durability="memory")
+    _submit(ingest_buffer, sensor.id, 2)
+    ingest_buffer.submit(
+        sensor.id, temperature=None, humidity=50.0, timestamp=START - timedelta(hours=1)
+    )
+    write = ingest_buffer._write
+
+    def unavailable(readings):
+        raise OperationalError("database is restarting")
+
+    monkeypatch.setattr(ingest_buffer, "_write", unavailable)
+    for _ in range(20):
+        with pytest.raises(OperationalError):
+            ingest_buffer.flush()
+    assert (ingest_buffer.stats()["depth"], ingest_buffer.stats()["rejected"]) == (3, 0)
+
+    # The database goes away again while the failing batch is written apart
+    writes = []
+
+    def failing_halfway(readings):
+        writes.append(len(readings))
+        if len(writes) > 1:
+            raise InterfaceError("connection already closed")
+        return write(readings)
+
+    monkeypatch.setattr(ingest_buffer, "_write", failing_halfway)
+    with pytest.raises(InterfaceError):
+        ingest_buffer.flush()
+    assert (ingest_buffer.stats()["depth"], ingest_buffer.stats()["rejected"]) == (3, 0)
+
+    monkeypatch.setattr(ingest_buffer, "_write", write)
+    assert ingest_buffer.flush() == 3
+    stats = ingest_buffer.stats()
+    assert (stats["depth"], stats["flushed"], stats["rejected"]) == (0, 2, 1)
+    assert Reading.objects.filter(sensor=sensor).count() == 2
+
+
+@pytest.mark.django_db
+def test_buffer_rejects_when_full(sensor):
+    ingest_buffer = IngestBuffer(durability="memory", max_pending=2)
+    _submit(ingest_buffer, sensor.id, 2)
+    with pytest.raises(BufferFull):
+        _submit(ingest_buffer, sensor.id, 1)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_commit_durability_waits_for_flusher(sensor):
+    ingest_buffer = IngestBuffer(durability="commit", max_delay=0.01)
+    ingest_buffer.start()
+    try:
+        _submit(ingest_buffer, sensor.id, 1)
+        assert Reading.objects.filter(sensor=sensor).count() == 1
+    finally:
+        ingest_buffer.stop()
+    assert ingest_buffer.stats()["flushed"] == 1
+
+
+@pytest.mark.django_db
+def test_create_reading_buffered(client, sensor, auth_token, settings, monkeypatch):
+    settings.READINGS_BUFFER_ENABLED = True
+    ingest_buffer = IngestBuffer(durability="memory")
+    monkeypatch.setattr(buffer_module, "_buffer", ingest_buffer)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    response = client.post(
+        f"/sensors/{sensor.id}/readings/",
+        json={"temperature": 21.5, "humidity": 40.0, "timestamp": START.isoformat()},
+        headers=headers,
+    )
+
+    assert response.status_code == 202
+    assert response.json()["durability"] == "memory"
+    assert client.get("/sensors/readings/buffer/", headers=headers).json()["depth"] == 1
+    ingest_buffer.flush()
+    assert Reading.objects.filter(sensor=sensor, temperature=21.5).exists()
@@ -0,0 +1,121 @@
+import pytest
+from asgiref.sync import async_to_sync
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from ninja.testing import TestAsyncClient
+from apps.auth.utils import create_token
+from apps.readings.ingest import write_readings
+from apps.sensors.async_api import router as async_sensors_router
+from apps.sensors.models import Sensor
+from apps.readings.models import Reading
+
+NOW = datetime.now(dt_timezone.utc).replace(microsecond=0)
+
+
+@pytest.fixture(autouse=True)
+def response_cache(settings):
+    settings.SENSORS_CACHE_ENABLED = True
+    cache.clear()
+
+
+@pytest.fixture
+def sensor(auth_user):
+    sensor = Sensor.objects.create(owner=auth_user, name="TestSensor", model="M")
+    write_readings(
+        [
+            Reading(
+                sensor=sensor,
+                temperature=20.0,
+                humidity=50.0,
+                timestamp=NOW - timedelta(days=2),
+            )
+        ]
+    )
+    return sensor
+
+
+def post_reading(client, sensor, auth_token, timestamp):
+    response = client.post(
+        f"/sensors/{sensor.id}/readings/",
+        json={
+            "temperature": 21.0,
+            "humidity": 40.0,
+            "timestamp": timestamp.isoformat(),
+        },
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+    assert response.status_code == 201
+
+
+@pytest.mark.django_db(transaction=True)
+def test_get_sensor_etag(assert_max_queries, client, sensor, auth_token):
+    path = f"/sensors/{sensor.id}/"
+    first = assert_max_queries("get", path, 1)
+    etag = first["ETag"]
+    assert first["Cache-Control"] == "private, no-cache"
+
+    cached = assert_max_queries("get", path, 0)
+    assert cached.json() == first.json() and cached["ETag"] == etag
+
+    not_modified = assert_max_queries("get", path, 0, META={"HTTP_IF_NONE_MATCH": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+
+    client.put(
+        path, json={"model": "M2"}, headers={"Authorization": f"Bearer {auth_token}"}
+    )
+    updated = assert_max_queries("get", path, 1, META={"HTTP_IF_NONE_MATCH": etag})
+    assert updated.status_code == 200 and updated.json()["model"] == "M2"
+    assert updated["ETag"] != etag
+
+
+@pytest.mark.django_db(transaction=True)
+def test_closed_ranges_survive_live_ingest(client, sensor, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    until = (NOW - timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    closed = f"/sensors/{sensor.id}/readings/?timestamp_to={until}"
+    live = f"/sensors/{sensor.id}/readings/aggregate/?bucket=1d"
+    closed_etag = client.get(closed, headers=headers)["ETag"]
+    live_etag = client.get(live, headers=headers)["ETag"]
+
+    post_reading(client, sensor, auth_token, NOW)
+    assert client.get(closed, headers=headers)["ETag"] == closed_etag
+    response = client.get(live, headers=headers)
+    assert response["ETag"] != live_etag
+    assert sum(bucket["count"] for bucket in response.json()) == 2
+
+    # A late reading inside the closed range invalidates it
+    post_reading(client, sensor, auth_token, NOW - timedelta(days=3))
+    response = client.get(closed, headers={**headers, "If-None-Match": closed_etag})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cache_is_per_owner_and_representation(client, sensor, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    path = f"/sensors/{sensor.id}/readings/?layout=columnar"
+    as_json = client.get(path, headers=headers)
+    as_msgpack = client.get(path, headers={**headers, "Accept": "application/msgpack"})
+    assert as_msgpack["Content-Type"] == "application/msgpack"
+    assert as_json["ETag"] != as_msgpack["ETag"]
+
+    other = get_user_model().objects.create_user(
+        email="other@example.com", username="other", password="pass"
+    )
+    token = create_token(other.id)
+    response = client.get(
+        path,
+        headers={"Authorization": f"Bearer {token}", "If-None-Match": as_json["ETag"]},
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_views_use_the_cache(sensor, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    get = async_to_sync(TestAsyncClient(async_sensors_router).get)
+    etag = get(f"/{sensor.id}/", headers=headers)["ETag"]
+
+    response = get(f"/{sensor.id}/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
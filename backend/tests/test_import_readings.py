@@ -0,0 +1,109 @@
+import io
+import pytest
+import numpy as np
+from django.core.management import call_command
+from apps.sensors.models import Sensor
+from apps.readings.models import Reading
+from apps.readings.importer import build_frame, parse_timestamps
+
+CSV = """timestamp,device_id,temperature,humidity
+2024-08-01 00:00:00+00:00,device-001,23.75,45.29
+2024-08-01 00:01:00+00:00,device-001,23.46,46.46
+2024-08-01 00:01:00+00:00,device-001,23.50,46.50
+2024-08-01T02:02:00+02:00,device-001,23.10,47.00
+2024-08-01 00:03:00Z,device-002,not-a-number,47.00
+2024-08-01 00:04:00+00:00,unknown,20.00,40.00
+"""
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "readings.csv"
+    path.write_text(CSV)
+    return path
+
+
+def test_parse_timestamps_normalizes_to_utc():
+    parsed = parse_timestamps(
+        np.array(
+            [
+                "2024-08-01 00:00:00+00:00",
+                "2024-08-01T00:00:00Z",
+                "2024-08-01T02:00:00+02:00",
+            ]
+        )
+    )
+
+    assert (parsed == np.datetime64("2024-08-01T00:00:00", "us")).all()
+
+
+def test_parse_timestamps_turns_malformed_values_into_nat():
+    parsed = parse_timestamps(
+        np.array(["2024-08-01 00:00:00", "yesterday", "", "2024-08-01T25:00+02:00"])
+    )
+
+    assert parsed[0] == np.datetime64("2024-08-01T00:00:00", "us")
+    assert np.isnat(parsed[1:]).all()
+
+
+def test_build_frame_skips_malformed_timestamps_and_short_rows():
+    columns = {"timestamp": 0, "device_id": 1, "temperature": 2, "humidity": 3}
+    rows = [
+        ["2024-08-01 00:00:00+00:00", "device-001", "23.75", "45.29"],
+        ["not-a-date", "device-001", "23.46", "46.46"],
+        ["", "device-001", "23.50", "46.50"],
+        ["2024-08-01 00:02:00+00:00", "device-001"],
+    ]
+
+    frame, skipped = build_frame(rows, columns, {"device-001": 1})
+
+    assert len(frame) == 1
+    assert skipped == 3
+
+
+@pytest.mark.django_db
+def test_import_readings(csv_file, auth_user):
+    sensor = Sensor.objects.create(owner=auth_user, name="device-001", model="M")
+    Sensor.objects.create(owner=auth_user, name="device-002", model="M")
+    out = io.StringIO()
+
+    call_command(
+        "import_readings",
+        str(csv_file),
+        owner=auth_user.email,
+        chunk_size=2,
+        stdout=out,
+    )
+
+    assert Reading.objects.count() == 3
+    assert (
+        Reading.objects.get(sensor=sensor, timestamp="2024-08-01T00:01:00Z").temperature
+        == 23.46
+    )
+    assert "Imported 3 of 6 readings" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_import_readings_is_idempotent_and_resumable(csv_file, auth_user):
+    Sensor.objects.create(owner=auth_user, name="device-001", model="M")
+    out = io.StringIO()
+    call_command(
+        "import_readings",
+        str(csv_file),
+        owner=auth_user.email,
+        chunk_size=2,
+        stdout=out,
+    )
+    first_chunk_offset = int(out.getvalue().splitlines()[0].rsplit(" ", 1)[1])
+
+    out = io.StringIO()
+    call_command(
+        "import_readings",
+        str(csv_file),
+        owner=auth_user.email,
+        offset=first_chunk_offset,
+        stdout=out,
+    )
+
+    assert Reading.objects.count() == 3
+    assert "Imported 0 of 4 readings" in out.getvalue()
@@ -0,0 +1,121 @@
+import pstats
+import pytest
+from asgiref.sync import async_to_sync
+from datetime import datetime, timezone as dt_timezone
+from django.test import AsyncClient, Client
+from django.urls import path
+from apps.sensors.models import Sensor
+from apps.readings.ingest import write_readings
+from apps.readings.models import Reading
+from apps.metrics.instrumentation import registry
+from conftest import test_api
+
+# Serve the test API through Django so that requests pass the middleware
+urlpatterns = [path("api/", test_api.urls)]
+pytestmark = pytest.mark.urls(__name__)
+
+ROUTE = 'method="GET",route="/api/sensors/{sensor_id}/readings/"'
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics(settings):
+    registry.clear()
+    settings.METRICS_TOKEN = "scrape-secret"
+
+
+@pytest.fixture
+def sensor(auth_user):
+    sensor = Sensor.objects.create(owner=auth_user, name="Metered", model="M1")
+    write_readings(
+        [
+            Reading(
+                sensor=sensor,
+                temperature=20.0,
+                humidity=50.0,
+                timestamp=datetime(2024, 1, 1, 0, minute, tzinfo=dt_timezone.utc),
+            )
+            for minute in range(3)
+        ]
+    )
+    return sensor
+
+
+def scrape(**kwargs) -> dict:
+    kwargs.setdefault("HTTP_AUTHORIZATION", "Bearer scrape-secret")
+    response = Client().get("/api/metrics/", **kwargs)
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.content.decode().splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+@pytest.mark.django_db
+def test_metrics_per_route(sensor, auth_token):
+    client = Client(HTTP_AUTHORIZATION=f"Bearer {auth_token}")
+    for _ in range(2):
+        assert client.get(f"/api/sensors/{sensor.id}/readings/").status_code == 200
+    columnar = client.get(f"/api/sensors/{sensor.id}/readings/?layout=columnar&limit=2")
+    assert columnar.status_code == 200
+    assert client.get("/api/sensors/999999/readings/").status_code == 404
+
+    samples = scrape()
+    assert samples[f'api_requests_total{{{ROUTE},status="200"}}'] == 3
+    assert samples[f'api_requests_total{{{ROUTE},status="404"}}'] == 1
+    assert samples[f"api_request_duration_seconds_count{{{ROUTE}}}"] == 4
+    assert samples[f'api_request_duration_seconds_bucket{{{ROUTE},le="+Inf"}}'] == 4
+    # The first request loads the user, then each list is an ownership check
+    # plus the page and the 404 stops after the ownership check
+    assert samples[f"api_request_db_queries_sum{{{ROUTE}}}"] == 1 + 2 + 2 + 2 + 1
+    assert samples[f"api_request_db_seconds_sum{{{ROUTE}}}"] > 0
+    assert samples[f"api_response_rows_sum{{{ROUTE}}}"] == 3 + 3 + 2
+    assert samples[f"api_response_rows_count{{{ROUTE}}}"] == 3
+    assert samples[f"api_response_bytes_sum{{{ROUTE}}}"] > 0
+    assert samples[f'api_request_phase_seconds_count{{{ROUTE},phase="auth"}}'] == 4
+    assert samples[f'api_request_phase_seconds_count{{{ROUTE},phase="render"}}'] == 3
+    assert samples['auth_cache_hits_total{cache="token"}'] == 3
+    assert samples["readings_stream_subscribers"] == 0
+
+
+@pytest.mark.django_db
+def test_metrics_token(settings):
+    assert Client().get("/api/metrics/").status_code == 401
+    assert scrape(HTTP_AUTHORIZATION="Bearer scrape-secret")
+
+    # Without a token metrics are only served in development
+    settings.METRICS_TOKEN = ""
+    assert Client().get("/api/metrics/").status_code == 403
+    settings.DEBUG = True
+    assert scrape(HTTP_AUTHORIZATION="")
+
+
+@pytest.mark.django_db
+def test_async_requests_count_their_queries(sensor, auth_token):
+    async def get():
+        return await AsyncClient().get(
+            f"/api/sensors/{sensor.id}/readings/",
+            headers={"Authorization": f"Bearer {auth_token}"},
+        )
+
+    response = async_to_sync(get)()
+    assert response.status_code == 200
+
+    samples = scrape()
+    assert samples[f"api_request_db_queries_sum{{{ROUTE}}}"] == 3
+    assert samples[f"api_response_rows_sum{{{ROUTE}}}"] == 3
+
+
+@pytest.mark.django_db
+def test_slow_requests_are_profiled(sensor, auth_token, settings, tmp_path):
+    settings.METRICS_PROFILE_RATE = 1.0
+    settings.METRICS_PROFILE_SLOW_SECONDS = 0
+    settings.METRICS_PROFILE_DIR = str(tmp_path)
+    client = Client(HTTP_AUTHORIZATION=f"Bearer {auth_token}")
+    client.get(f"/api/sensors/{sensor.id}/readings/")
+
+    (profile,) = tmp_path.glob("*-GET-api_sensors_sensor_id_readings-*.prof")
+    stats = pstats.Stats(str(profile))
+    assert any(func[2] == "list_readings" for func in stats.stats)
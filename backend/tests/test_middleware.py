@@ -0,0 +1,55 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import AsyncClient, Client
+from django.urls import path
+from config.middleware import BrowserMiddleware
+from conftest import test_api
+
+User = get_user_model()
+
+urlpatterns = [path("admin/", admin.site.urls), path("api/", test_api.urls)]
+pytestmark = pytest.mark.urls(__name__)
+
+
+@pytest.mark.django_db
+def test_api_requests_skip_browser_middleware(settings):
+    # Development settings serve metrics without a token
+    settings.DEBUG = True
+    response = Client().get("/api/metrics/")
+    assert response.status_code == 200
+    assert "X-Frame-Options" not in response
+    assert "Cookie" not in response.get("Vary", "")
+
+    async def get():
+        return await AsyncClient().get("/api/metrics/")
+
+    response = async_to_sync(get)()
+    assert response.status_code == 200
+    assert "X-Frame-Options" not in response
+
+
+@pytest.mark.django_db
+def test_admin_keeps_sessions_and_auth():
+    User.objects.create_superuser(
+        email="admin@example.com", username="admin", password="pass"
+    )
+    client = Client()
+    page = client.get("/admin/login/")
+    assert page.status_code == 200
+    assert page["X-Frame-Options"] == "DENY"
+
+    login = client.post(
+        "/admin/login/", {"username": "admin@example.com", "password": "pass"}
+    )
+    assert login.status_code == 302
+    assert "sessionid" in client.cookies
+    assert client.get("/admin/").status_code == 200
+
+
+def test_hooks_of_wrapped_middleware_are_refused(settings):
+    settings.BROWSER_MIDDLEWARE = ["django.middleware.csrf.CsrfViewMiddleware"]
+    with pytest.raises(ImproperlyConfigured, match="process_view"):
+        BrowserMiddleware(lambda request: None)
@@ -0,0 +1,85 @@
+import pytest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from apps.sensors.models import Sensor
+from apps.readings.ingest import write_readings
+from apps.readings.models import Reading
+
+
+@pytest.fixture
+def sensors(auth_user):
+    now = datetime.now(dt_timezone.utc).replace(microsecond=0)
+    active = Sensor.objects.create(owner=auth_user, name="Active", model="M")
+    idle = Sensor.objects.create(owner=auth_user, name="Idle", model="M")
+    Sensor.objects.create(owner=auth_user, name="Empty", model="M")
+    write_readings(
+        [
+            Reading(sensor=active, temperature=10.0, humidity=40.0, timestamp=now),
+            Reading(
+                sensor=active,
+                temperature=30.0,
+                humidity=60.0,
+                timestamp=now - timedelta(hours=3),
+            ),
+            Reading(
+                sensor=active,
+                temperature=-5.0,
+                humidity=90.0,
+                timestamp=now - timedelta(days=3),
+            ),
+            Reading(
+                sensor=idle,
+                temperature=21.0,
+                humidity=55.0,
+                timestamp=now - timedelta(days=2),
+            ),
+        ]
+    )
+    return now
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("rollups", [True, False])
+def test_sensor_overview(client, auth_token, sensors, settings, rollups):
+    settings.READINGS_ROLLUPS_ENABLED = rollups
+    response = client.get(
+        "/sensors/overview/", headers={"Authorization": f"Bearer {auth_token}"}
+    )
+
+    assert response.status_code == 200
+    items = {item["name"]: item for item in response.json()["items"]}
+    active = items["Active"]
+    assert active["latest"]["temperature"] == 10.0
+    assert datetime.fromisoformat(active["latest"]["timestamp"]) == sensors
+    assert active["window"] == {
+        "count": 2,
+        "temperature_avg": 20.0,
+        "temperature_min": 10.0,
+        "temperature_max": 30.0,
+        "humidity_avg": 50.0,
+        "humidity_min": 40.0,
+        "humidity_max": 60.0,
+    }
+    assert items["Idle"]["latest"]["humidity"] == 55.0
+    assert items["Idle"]["window"] is None
+    assert items["Empty"]["latest"] is None and items["Empty"]["window"] is None
+
+
+@pytest.mark.django_db
+def test_sensor_overview_window_and_paging(client, auth_token, sensors):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = client.get("/sensors/overview/?hours=72&q=idle", headers=headers)
+    [idle] = response.json()["items"]
+    assert idle["window"]["count"] == 1
+
+    first = client.get("/sensors/overview/?limit=2", headers=headers).json()
+    second = client.get(
+        f"/sensors/overview/?limit=2&cursor={first['next']}", headers=headers
+    ).json()
+    assert len(first["items"]) == 2 and second["next"] is None
+    assert {item["name"] for item in first["items"] + second["items"]} == {
+        "Active",
+        "Idle",
+        "Empty",
+    }
+
+    assert client.get("/sensors/overview/?hours=0", headers=headers).status_code == 422
@@ -0,0 +1,105 @@
+import struct
+import pytest
+from datetime import datetime, timezone as dt_timezone
+from django.test import Client
+from django.urls import path
+from apps.sensors.models import Sensor
+from apps.readings.models import Reading
+from apps.readings.packed import CONTENT_TYPE
+from conftest import test_api
+
+# Serve the test API through Django so that requests carry a real content type
+urlpatterns = [path("api/", test_api.urls)]
+pytestmark = pytest.mark.urls(__name__)
+
+BASE = datetime(2024, 1, 15, 10, 0, tzinfo=dt_timezone.utc)
+BASE_MS = int(BASE.timestamp() * 1000)
+
+
+def pack(*records) -> bytes:
+    return b"".join(struct.pack("<qff", *record) for record in records)
+
+
+@pytest.fixture
+def sensor(auth_user):
+    return Sensor.objects.create(owner=auth_user, name="Packed", model="P1")
+
+
+@pytest.fixture
+def post(sensor, auth_token):
+    client = Client(HTTP_AUTHORIZATION=f"Bearer {auth_token}")
+
+    def call(body, query=""):
+        return client.post(
+            f"/api/sensors/{sensor.id}/readings/batch/{query}",
+            body,
+            content_type=CONTENT_TYPE,
+        )
+
+    return call
+
+
+@pytest.mark.django_db
+def test_packed_batch(post, sensor):
+    Reading.objects.create(
+        sensor=sensor, temperature=20.0, humidity=60.0, timestamp=BASE
+    )
+
+    response = post(
+        pack(
+            (BASE_MS, 21.0, 61.0),
+            (BASE_MS + 60_000, 21.37, 45.5),
+            (BASE_MS + 60_000, 23.0, 63.0),
+            (BASE_MS + 120_000, float("nan"), 64.0),
+            (2**62, 24.0, 64.0),
+            (BASE_MS + 180_000, -3.2, 99.9),
+        )
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "accepted": 2,
+        "duplicates": 2,
+        "rejected": 2,
+        "errors": [
+            {"index": 3, "detail": "Temperature and humidity must be finite numbers"},
+            {"index": 4, "detail": "Timestamp is out of range"},
+        ],
+    }
+    stored = list(
+        Reading.objects.filter(sensor=sensor)
+        .order_by("timestamp")
+        .values_list("timestamp", "temperature", "humidity")
+    )
+    assert [(ts.minute, t, h) for ts, t, h in stored] == [
+        (0, 20.0, 60.0),
+        (1, 21.37, 45.5),
+        (3, -3.2, 99.9),
+    ]
+
+
+@pytest.mark.django_db
+def test_packed_batch_update_on_conflict(post, sensor):
+    Reading.objects.create(
+        sensor=sensor, temperature=20.0, humidity=60.0, timestamp=BASE
+    )
+
+    response = post(
+        pack((BASE_MS, 21.0, 61.0), (BASE_MS, 22.5, 62.0)), "?on_conflict=update"
+    )
+
+    assert response.status_code == 200
+    assert response.json()["duplicates"] == 2
+    assert Reading.objects.get(sensor=sensor).temperature == 22.5
+
+
+@pytest.mark.django_db
+def test_malformed_packed_batches(post, settings):
+    response = post(pack((BASE_MS, 21.0, 61.0))[:-1])
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Body must be a multiple of 16 bytes, got 15"}
+
+    settings.READINGS_BATCH_MAX_SIZE = 1
+    response = post(pack((BASE_MS, 21.0, 61.0), (BASE_MS + 1, 21.0, 61.0)))
+    assert response.status_code == 400
+    assert not Reading.objects.exists()
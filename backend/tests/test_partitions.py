@@ -0,0 +1,84 @@
+import pytest
+from datetime import datetime, timezone as dt_timezone
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from apps.readings.ingest import write_readings
+from apps.readings.models import Reading, ReadingRollup
+from apps.readings.partitions import (
+    _bounds,
+    add_months,
+    ensure_partitions,
+    list_partitions,
+    month_start,
+    partition_name,
+    split_legacy,
+)
+from apps.sensors.models import Sensor
+
+UTC = dt_timezone.utc
+
+
+def test_month_arithmetic():
+    assert month_start(datetime(2024, 3, 17, 22, 5, tzinfo=UTC)) == datetime(
+        2024, 3, 1, tzinfo=UTC
+    )
+    assert add_months(datetime(2024, 11, 1, tzinfo=UTC), 3) == datetime(
+        2025, 2, 1, tzinfo=UTC
+    )
+    assert add_months(datetime(2024, 1, 1, tzinfo=UTC), -1) == datetime(
+        2023, 12, 1, tzinfo=UTC
+    )
+    assert (
+        partition_name(datetime(2024, 2, 1, tzinfo=UTC)) == "readings_reading_p202402"
+    )
+
+
+def test_partition_bounds_are_parsed():
+    assert _bounds(
+        "FOR VALUES FROM ('2024-01-01 00:00:00+00') TO ('2024-02-01 00:00:00+00')"
+    ) == (datetime(2024, 1, 1, tzinfo=UTC), datetime(2024, 2, 1, tzinfo=UTC))
+    assert _bounds("FOR VALUES FROM (MINVALUE) TO ('2024-02-01 00:00:00+00')") == (
+        None,
+        datetime(2024, 2, 1, tzinfo=UTC),
+    )
+    assert _bounds("DEFAULT") == (None, None)
+
+
+@pytest.mark.skipif(connection.vendor == "postgresql", reason="SQLite behavior")
+@pytest.mark.django_db
+def test_partitioning_is_postgres_only():
+    assert ensure_partitions(3) == []
+    with pytest.raises(CommandError):
+        call_command("partition_readings")
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="Needs partitions")
+@pytest.mark.django_db
+def test_retain_months_respects_sensor_retention(auth_user):
+    sensor = Sensor.objects.create(
+        owner=auth_user, name="Forever", model="M", retention_days=0
+    )
+    old = datetime(2020, 1, 15, tzinfo=UTC)
+    write_readings(
+        [Reading(sensor=sensor, temperature=20.0, humidity=50.0, timestamp=old)]
+    )
+    # Tables with pending foreign key checks cannot be dropped
+    with connection.cursor() as cursor:
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    split_legacy()
+    assert partition_name(month_start(old)) in [p.name for p in list_partitions()]
+
+    call_command("partition_readings", retain_months=1)
+    assert Reading.objects.filter(sensor=sensor).exists()
+
+    sensor.retention_days = 30
+    sensor.save()
+    call_command("partition_readings", retain_months=1)
+
+    assert partition_name(month_start(old)) not in [p.name for p in list_partitions()]
+    assert not Reading.objects.filter(sensor=sensor).exists()
+    resolutions = ReadingRollup.objects.filter(sensor=sensor).values_list(
+        "resolution", flat=True
+    )
+    assert sorted(resolutions) == [ReadingRollup.HOUR, ReadingRollup.DAY]
@@ -0,0 +1,48 @@
+import threading
+import pytest
+from django.db import connection
+from apps.sensors.models import Sensor
+
+pytestmark = [
+    pytest.mark.skipif(
+        not connection.settings_dict["OPTIONS"].get("pool"),
+        reason="needs PostgreSQL with DATABASE_POOL",
+    ),
+    pytest.mark.django_db(transaction=True),
+]
+
+
+def test_closed_connections_go_back_to_the_pool():
+    connection.close()
+    connection.pool.wait()
+    before = connection.pool_stats()
+
+    for _ in range(5):
+        connection.ensure_connection()
+        assert not connection.connection.closed
+        connection.close()
+        assert connection.connection is None
+
+    after = connection.pool_stats()
+    assert after["requests_num"] - before.get("requests_num", 0) == 5
+    assert after["connections_num"] == before["connections_num"]
+
+
+def test_threads_share_one_pool(auth_user):
+    Sensor.objects.create(owner=auth_user, name="Pooled", model="P1")
+    connection.close()
+    seen = []
+
+    def request():
+        # Each thread has its own DatabaseWrapper, like async ORM calls
+        seen.append((Sensor.objects.count(), connection.pool))
+        connection.close()
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == [(1, connection.pool)] * 4
+    assert connection.pool_stats()["pool_size"] <= 4
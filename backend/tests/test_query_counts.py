@@ -0,0 +1,76 @@
+import pytest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from apps.sensors.models import Sensor
+from apps.readings.models import Reading
+
+START = datetime(2024, 1, 15, tzinfo=dt_timezone.utc)
+
+
+@pytest.fixture
+def sensors(auth_user):
+    sensors = [
+        Sensor.objects.create(owner=auth_user, name=f"Sensor{index}", model="Model")
+        for index in range(5)
+    ]
+    Reading.objects.bulk_create(
+        Reading(
+            sensor=sensor,
+            temperature=20.0,
+            humidity=50.0,
+            timestamp=START + timedelta(minutes=minute),
+        )
+        for sensor in sensors
+        for minute in range(20)
+    )
+    return sensors
+
+
+# Query budgets per endpoint with a warm auth cache. Raise a budget only
+# together with a comment explaining the new query.
+ENDPOINT_BUDGETS = [
+    ("get", "/sensors/", 1),
+    ("get", "/sensors/?q=Sensor", 1),
+    ("get", "/sensors/search/?q=sensor", 1),
+    # The page of sensors, then the latest readings and windows of its ids
+    ("get", "/sensors/overview/", 2),
+    ("get", "/sensors/{id}/", 1),
+    ("get", "/sensors/{id}/readings/", 2),
+    ("get", "/sensors/{id}/readings/aggregate/?bucket=1h", 2),
+    ("get", "/sensors/{id}/readings/export/", 2),
+]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("method,path,limit", ENDPOINT_BUDGETS)
+def test_endpoint_query_budget(assert_max_queries, sensors, method, path, limit):
+    response = assert_max_queries(method, path.format(id=sensors[0].id), limit)
+
+    if not response.streaming and "items" in response.json():
+        assert len(response.json()["items"]) > 1
+
+
+@pytest.mark.django_db
+def test_create_reading_query_budget(assert_max_queries, sensors):
+    # ownership check, insert, one rollup upsert per resolution, savepoints
+    assert_max_queries(
+        "post",
+        f"/sensors/{sensors[0].id}/readings/",
+        7,
+        json={"temperature": 1.0, "humidity": 2.0, "timestamp": "2024-02-01T00:00:00Z"},
+    )
+
+
+@pytest.mark.django_db
+def test_batch_query_budget_is_independent_of_size(assert_max_queries, sensors):
+    readings = [
+        {
+            "temperature": 1.0,
+            "humidity": 2.0,
+            "timestamp": (START + timedelta(days=1, minutes=minute)).isoformat(),
+        }
+        for minute in range(150)
+    ]
+
+    assert_max_queries(
+        "post", f"/sensors/{sensors[0].id}/readings/batch/", 8, json=readings
+    )
@@ -1,8 +1,12 @@
+import json
+import msgpack
 import pytest
 from django.contrib.auth import get_user_model
 from apps.sensors.models import Sensor
+from apps.readings.ingest import write_readings
 from apps.readings.models import Reading
-from datetime import datetime, timedelta
+from apps.readings.signals import readings_created
+from datetime import datetime, timedelta, timezone as dt_timezone
 
 User = get_user_model()
 
@@ -40,7 +44,7 @@ def test_list_readings(client, sensor, auth_token):
     )
 
     assert response.status_code == 200
-    assert len(response.json()) >= 1
+    assert len(response.json()["items"]) >= 1
 
 
 @pytest.mark.django_db
@@ -63,4 +67,402 @@ def test_filter_readings_by_date(client, sensor, auth_token):
     )
 
     assert response.status_code == 200
-    assert len(response.json()) == 1
+    assert len(response.json()["items"]) == 1
+
+
+@pytest.mark.django_db
+def test_create_readings_batch(client, sensor, auth_token):
+    Reading.objects.create(
+        sensor=sensor,
+        temperature=20.0,
+        humidity=60.0,
+        timestamp="2024-01-15T10:00:00Z",
+    )
+
+    response = client.post(
+        f"/sensors/{sensor.id}/readings/batch/",
+        json=[
+            {
+                "temperature": 21.0,
+                "humidity": 61.0,
+                "timestamp": "2024-01-15T10:00:00Z",
+            },
+            {
+                "temperature": 22.0,
+                "humidity": 62.0,
+                "timestamp": "2024-01-15T10:01:00Z",
+            },
+            {
+                "temperature": 23.0,
+                "humidity": 63.0,
+                "timestamp": "2024-01-15T10:01:00Z",
+            },
+            {
+                "temperature": 24.0,
+                "humidity": 64.0,
+                "timestamp": "2024-01-15T10:02:00Z",
+            },
+        ],
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "accepted": 2,
+        "duplicates": 2,
+        "rejected": 0,
+        "errors": [],
+    }
+    assert Reading.objects.filter(sensor=sensor).count() == 3
+    assert (
+        Reading.objects.get(sensor=sensor, timestamp="2024-01-15T10:00:00Z").temperature
+        == 20.0
+    )
+
+
+@pytest.mark.django_db
+def test_create_readings_batch_update_on_conflict(client, sensor, auth_token):
+    Reading.objects.create(
+        sensor=sensor,
+        temperature=20.0,
+        humidity=60.0,
+        timestamp="2024-01-15T10:00:00Z",
+    )
+
+    response = client.post(
+        f"/sensors/{sensor.id}/readings/batch/?on_conflict=update",
+        json=[
+            {
+                "temperature": 21.0,
+                "humidity": 61.0,
+                "timestamp": "2024-01-15T10:00:00Z",
+            },
+        ],
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["duplicates"] == 1
+    assert Reading.objects.get(sensor=sensor).temperature == 21.0
+
+
+@pytest.mark.django_db
+def test_write_readings_reports_only_inserted_rows(sensor):
+    existing = Reading.objects.create(
+        sensor=sensor,
+        temperature=20.0,
+        humidity=60.0,
+        timestamp=datetime(2024, 1, 15, tzinfo=dt_timezone.utc),
+    )
+    received = []
+
+    def receiver(sender, readings, replaced, **kwargs):
+        received.append((readings, replaced))
+
+    readings_created.connect(receiver, sender=Reading)
+    try:
+        overlap = write_readings(
+            [
+                Reading(
+                    sensor=sensor,
+                    temperature=temperature,
+                    humidity=50.0,
+                    timestamp=datetime(year, 1, 15, tzinfo=dt_timezone.utc),
+                )
+                for year, temperature in [(2000, 1.0), (2024, 2.0), (2048, 3.0)]
+            ]
+        )
+    finally:
+        readings_created.disconnect(receiver, sender=Reading)
+
+    assert overlap == 1
+    [(fresh, replaced)] = received
+    assert [reading.temperature for reading in fresh] == [1.0, 3.0]
+    assert all(reading.id and reading.id != existing.id for reading in fresh)
+    assert replaced == []
+    assert Reading.objects.get(id=existing.id).temperature == 20.0
+
+
+@pytest.mark.django_db
+def test_create_readings_batch_multi_sensor(client, auth_user, sensor, auth_token):
+    other_user = User.objects.create_user(
+        email="other@example.com", username="other", password="pass"
+    )
+    other_sensor = Sensor.objects.create(owner=other_user, name="Other", model="M")
+    second = Sensor.objects.create(owner=auth_user, name="Second", model="M")
+
+    response = client.post(
+        "/sensors/readings/batch/",
+        json=[
+            {
+                "sensor_id": sensor.id,
+                "temperature": 21.0,
+                "humidity": 61.0,
+                "timestamp": "2024-01-15T10:00:00Z",
+            },
+            {
+                "sensor_id": second.id,
+                "temperature": 22.0,
+                "humidity": 62.0,
+                "timestamp": "2024-01-15T10:00:00Z",
+            },
+            {
+                "sensor_id": other_sensor.id,
+                "temperature": 23.0,
+                "humidity": 63.0,
+                "timestamp": "2024-01-15T10:00:00Z",
+            },
+        ],
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["accepted"] == 2
+    assert body["rejected"] == 1
+    assert body["errors"] == [{"index": 2, "detail": "Sensor not found"}]
+    assert not Reading.objects.filter(sensor=other_sensor).exists()
+
+
+@pytest.mark.django_db
+def test_aggregate_readings(client, sensor, auth_token):
+    client.post(
+        f"/sensors/{sensor.id}/readings/batch/",
+        json=[
+            {
+                "temperature": 20.0,
+                "humidity": 50.0,
+                "timestamp": "2024-01-15T10:00:00Z",
+            },
+            {
+                "temperature": 22.0,
+                "humidity": 50.0,
+                "timestamp": "2024-01-15T10:30:00Z",
+            },
+            {
+                "temperature": 30.0,
+                "humidity": 50.0,
+                "timestamp": "2024-01-15T11:00:00Z",
+            },
+        ],
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+
+    response = client.get(
+        f"/sensors/{sensor.id}/readings/aggregate/?bucket=1h&agg=avg,max,count",
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {
+            "bucket": "2024-01-15T10:00:00Z",
+            "count": 2,
+            "temperature_avg": 21.0,
+            "temperature_max": 22.0,
+            "humidity_avg": 50.0,
+            "humidity_max": 50.0,
+        },
+        {
+            "bucket": "2024-01-15T11:00:00Z",
+            "count": 1,
+            "temperature_avg": 30.0,
+            "temperature_max": 30.0,
+            "humidity_avg": 50.0,
+            "humidity_max": 50.0,
+        },
+    ]
+
+
+@pytest.mark.django_db
+def test_aggregate_readings_invalid_bucket(client, sensor, auth_token):
+    response = client.get(
+        f"/sensors/{sensor.id}/readings/aggregate/?bucket=hourly",
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_list_readings_cursor_pagination(client, sensor, auth_token):
+    start = datetime(2024, 1, 15, 10, 0, tzinfo=dt_timezone.utc)
+    Reading.objects.bulk_create(
+        Reading(
+            sensor=sensor,
+            temperature=float(minute),
+            humidity=50.0,
+            timestamp=start + timedelta(minutes=minute),
+        )
+        for minute in range(5)
+    )
+
+    seen = []
+    url = f"/sensors/{sensor.id}/readings/?limit=2"
+    while url:
+        response = client.get(url, headers={"Authorization": f"Bearer {auth_token}"})
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body["items"]) <= 2
+        seen += [item["temperature"] for item in body["items"]]
+        url = (
+            body["next"]
+            and f"/sensors/{sensor.id}/readings/?limit=2&cursor={body['next']}"
+        )
+
+    assert seen == [4.0, 3.0, 2.0, 1.0, 0.0]
+
+
+@pytest.mark.django_db
+def test_list_readings_invalid_cursor(client, sensor, auth_token):
+    response = client.get(
+        f"/sensors/{sensor.id}/readings/?cursor=garbage",
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_export_readings(client, sensor, auth_token):
+    start = datetime(2024, 1, 15, 10, 0, tzinfo=dt_timezone.utc)
+    Reading.objects.bulk_create(
+        Reading(
+            sensor=sensor,
+            temperature=20.0 + minute,
+            humidity=50.0,
+            timestamp=start + timedelta(minutes=minute),
+        )
+        for minute in range(3)
+    )
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    ndjson = client.get(f"/sensors/{sensor.id}/readings/export/", headers=headers)
+    csv_response = client.get(
+        f"/sensors/{sensor.id}/readings/export/?format=csv", headers=headers
+    )
+
+    assert ndjson.streaming
+    assert ndjson["Content-Type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in ndjson.content.decode().splitlines()]
+    assert [line["temperature"] for line in lines] == [20.0, 21.0, 22.0]
+    assert lines[0]["timestamp"] == "2024-01-15T10:00:00Z"
+
+    rows = csv_response.content.decode().splitlines()
+    assert rows[0] == "id,timestamp,temperature,humidity"
+    assert rows[1].endswith(",2024-01-15T10:00:00Z,20.0,50.0")
+    assert len(rows) == 4
+
+
+@pytest.mark.django_db
+def test_list_readings_columnar_layout(client, sensor, auth_token):
+    start = datetime(2024, 1, 15, 10, 0, tzinfo=dt_timezone.utc)
+    Reading.objects.bulk_create(
+        Reading(
+            sensor=sensor,
+            temperature=20.0 + minute,
+            humidity=50.0,
+            timestamp=start + timedelta(minutes=minute),
+        )
+        for minute in range(3)
+    )
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    columnar = client.get(
+        f"/sensors/{sensor.id}/readings/?layout=columnar&limit=2", headers=headers
+    )
+    packed = client.get(
+        f"/sensors/{sensor.id}/readings/?limit=2",
+        headers={**headers, "Accept": "application/msgpack"},
+    )
+
+    body = columnar.json()
+    assert body["sensor_id"] == sensor.id
+    assert body["temperature"] == [22.0, 21.0]
+    assert body["timestamp"][1] == int(start.timestamp() * 1000) + 60_000
+    assert packed["Content-Type"] == "application/msgpack"
+    assert msgpack.unpackb(packed.content) == body
+
+    rest = client.get(
+        f"/sensors/{sensor.id}/readings/?layout=columnar&cursor={body['next']}",
+        headers=headers,
+    ).json()
+    assert rest["temperature"] == [20.0]
+    assert rest["next"] is None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_list_readings_downsampled(client, sensor, auth_token, method):
+    start = datetime(2024, 1, 15, tzinfo=dt_timezone.utc)
+    Reading.objects.bulk_create(
+        Reading(
+            sensor=sensor,
+            temperature=90.0 if minute == 137 else 20.0 + (minute % 7) * 0.1,
+            humidity=5.0 if minute == 251 else 50.0,
+            timestamp=start + timedelta(minutes=minute),
+        )
+        for minute in range(400)
+    )
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    response = client.get(
+        f"/sensors/{sensor.id}/readings/?max_points=40&method={method}",
+        headers=headers,
+    )
+    columnar = client.get(
+        f"/sensors/{sensor.id}/readings/?max_points=40&method={method}"
+        "&layout=columnar",
+        headers=headers,
+    ).json()
+
+    body = response.json()
+    assert response.status_code == 200
+    assert body["next"] is None
+    assert 3 <= len(body["items"]) <= 40
+    assert max(item["temperature"] for item in body["items"]) == 90.0
+    assert min(item["humidity"] for item in body["items"]) == 5.0
+    timestamps = [item["timestamp"] for item in body["items"]]
+    assert timestamps == sorted(timestamps, reverse=True)
+    assert columnar["temperature"] == [item["temperature"] for item in body["items"]]
+
+    # Three samples per series is the least that keeps the shape
+    response = client.get(
+        f"/sensors/{sensor.id}/readings/?max_points=6&method={method}",
+        headers=headers,
+    )
+    assert len(response.json()["items"]) <= 6
+
+
+@pytest.mark.django_db
+def test_list_readings_downsample_limits(client, sensor, auth_token, settings):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = client.get(
+        f"/sensors/{sensor.id}/readings/?max_points=5", headers=headers
+    )
+    assert response.status_code == 422
+
+    settings.READINGS_DOWNSAMPLE_MAX_ROWS = 10
+    start = datetime(2024, 1, 15, tzinfo=dt_timezone.utc)
+    Reading.objects.bulk_create(
+        Reading(
+            sensor=sensor,
+            temperature=20.0,
+            humidity=50.0,
+            timestamp=start + timedelta(minutes=minute),
+        )
+        for minute in range(11)
+    )
+    response = client.get(
+        f"/sensors/{sensor.id}/readings/?max_points=6", headers=headers
+    )
+    assert response.status_code == 400
+    assert "more than 10 readings" in response.json()["detail"]
+
+    response = client.get(
+        f"/sensors/{sensor.id}/readings/?max_points=6"
+        "&timestamp_from=2024-01-15T00:01:00Z",
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert len(response.json()["items"]) <= 6
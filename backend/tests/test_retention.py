@@ -0,0 +1,124 @@
+import io
+import pytest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from apps.sensors.models import Sensor
+from apps.readings.ingest import write_readings
+from apps.readings.models import Reading, ReadingRollup
+from apps.readings.retention import retention_cutoffs
+
+UTC = dt_timezone.utc
+
+
+@pytest.fixture
+def sensor(auth_user):
+    return Sensor.objects.create(owner=auth_user, name="TestSensor", model="TestModel")
+
+
+def write(sensor, timestamps):
+    write_readings(
+        [
+            Reading(sensor=sensor, temperature=20.0 + i, humidity=50.0, timestamp=ts)
+            for i, ts in enumerate(timestamps)
+        ]
+    )
+
+
+@pytest.mark.django_db
+def test_compaction_keeps_hourly_rollups(client, sensor, auth_token):
+    old = datetime(2024, 1, 15, 10, tzinfo=UTC)
+    recent = datetime.now(UTC) - timedelta(hours=1)
+    write(sensor, [old + timedelta(minutes=m) for m in range(0, 120, 10)] + [recent])
+
+    out = io.StringIO()
+    call_command("compact_readings", "--batch-size", "5", stdout=out)
+
+    assert list(Reading.objects.values_list("timestamp", flat=True)) == [recent]
+    assert "reclaimed 12 rows" in out.getvalue()
+    assert not ReadingRollup.objects.filter(
+        resolution=ReadingRollup.MINUTE, bucket_start__lt=recent - timedelta(days=1)
+    ).exists()
+
+    response = client.get(
+        f"/sensors/{sensor.id}/readings/aggregate/?bucket=1h&agg=avg,count"
+        "&timestamp_from=2024-01-15T00:00:00Z&timestamp_to=2024-01-16T00:00:00Z",
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+    assert [
+        (b["bucket"], b["count"], b["temperature_avg"]) for b in response.json()
+    ] == [
+        ("2024-01-15T10:00:00Z", 6, 22.5),
+        ("2024-01-15T11:00:00Z", 6, 28.5),
+    ]
+
+
+@pytest.mark.django_db
+def test_rebuilds_keep_rollups_of_compacted_readings(sensor):
+    old = datetime(2024, 1, 15, 10, tzinfo=UTC)
+    write(sensor, [old + timedelta(minutes=m) for m in range(0, 120, 10)])
+    recent = datetime.now(UTC) - timedelta(hours=1)
+    write(sensor, [recent])
+
+    def totals():
+        return sorted(
+            ReadingRollup.objects.filter(
+                sensor=sensor,
+                resolution__in=[ReadingRollup.HOUR, ReadingRollup.DAY],
+            ).values_list("resolution", "bucket_start", "count", "temperature_sum")
+        )
+
+    call_command("compact_readings", stdout=io.StringIO())
+    compacted = totals()
+    assert (ReadingRollup.HOUR, old, 6, 135.0) in compacted
+
+    call_command("rebuild_rollups", stdout=io.StringIO())
+    assert totals() == compacted
+
+    # Overwriting a reading rebuilds its day, and nothing before it
+    write_readings(
+        [Reading(sensor=sensor, temperature=0.0, humidity=50.0, timestamp=recent)],
+        on_conflict="update",
+    )
+    assert [row for row in totals() if row[1] < recent - timedelta(days=1)] == [
+        row for row in compacted if row[1] < recent - timedelta(days=1)
+    ]
+
+
+@pytest.mark.django_db
+def test_retention_policy_per_sensor(auth_user, sensor, settings):
+    settings.READINGS_RETENTION_DAYS = 30
+    forever = Sensor.objects.create(
+        owner=auth_user, name="Archive", model="TestModel", retention_days=None
+    )
+    longer = Sensor.objects.create(
+        owner=auth_user, name="Longer", model="TestModel", retention_days=365
+    )
+    now = datetime(2024, 6, 1, 12, tzinfo=UTC)
+
+    cutoffs = retention_cutoffs(now=now)
+    assert cutoffs[sensor.id] == datetime(2024, 5, 2, tzinfo=UTC)
+    assert cutoffs[longer.id] == datetime(2023, 6, 2, tzinfo=UTC)
+    assert retention_cutoffs([sensor.id], days=7, now=now) == {
+        sensor.id: datetime(2024, 5, 25, tzinfo=UTC)
+    }
+
+    settings.READINGS_RETENTION_DAYS = 0
+    assert forever.id not in retention_cutoffs(now=now)
+    assert longer.id in retention_cutoffs(now=now)
+
+
+@pytest.mark.django_db
+def test_compaction_rebuilds_rollups_when_disabled(sensor, settings):
+    settings.READINGS_ROLLUPS_ENABLED = False
+    write(sensor, [datetime(2024, 1, 15, 10, m, tzinfo=UTC) for m in range(3)])
+    assert not ReadingRollup.objects.exists()
+
+    with pytest.raises(CommandError):
+        call_command("compact_readings", stdout=io.StringIO())
+    assert Reading.objects.count() == 3
+
+    call_command("compact_readings", "--rebuild", stdout=io.StringIO())
+    assert not Reading.objects.exists()
+    hourly = ReadingRollup.objects.get(resolution=ReadingRollup.HOUR)
+    assert (hourly.count, hourly.temperature_max) == (3, 22.0)
@@ -0,0 +1,165 @@
+import importlib
+import io
+from types import SimpleNamespace
+
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from apps.sensors.models import Sensor
+from apps.readings.models import Reading, ReadingRollup
+
+
+@pytest.fixture
+def sensor(auth_user):
+    return Sensor.objects.create(owner=auth_user, name="TestSensor", model="TestModel")
+
+
+def post_batch(client, sensor, auth_token, readings, **params):
+    query = "&".join(f"{key}={value}" for key, value in params.items())
+    return client.post(
+        f"/sensors/{sensor.id}/readings/batch/?{query}",
+        json=[
+            {"temperature": t, "humidity": h, "timestamp": ts} for ts, t, h in readings
+        ],
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+
+
+def rollup_rows(sensor):
+    return list(
+        ReadingRollup.objects.filter(sensor=sensor)
+        .order_by("resolution", "bucket_start")
+        .values_list(
+            "resolution",
+            "bucket_start",
+            "count",
+            "temperature_sum",
+            "temperature_min",
+            "temperature_max",
+        )
+    )
+
+
+@pytest.mark.django_db
+def test_rollups_are_maintained_on_ingest(client, sensor, auth_token):
+    post_batch(
+        client,
+        sensor,
+        auth_token,
+        [
+            ("2024-01-15T10:00:10Z", 20.0, 50.0),
+            ("2024-01-15T10:00:40Z", 24.0, 50.0),
+            ("2024-01-15T11:30:00Z", 30.0, 50.0),
+        ],
+    )
+    client.post(
+        f"/sensors/{sensor.id}/readings/",
+        json={
+            "temperature": 18.0,
+            "humidity": 40.0,
+            "timestamp": "2024-01-15T10:00:50Z",
+        },
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+
+    hour = ReadingRollup.objects.get(
+        sensor=sensor,
+        resolution=ReadingRollup.HOUR,
+        bucket_start="2024-01-15T10:00:00Z",
+    )
+    assert (hour.count, hour.temperature_sum, hour.temperature_min) == (3, 62.0, 18.0)
+    day = ReadingRollup.objects.get(sensor=sensor, resolution=ReadingRollup.DAY)
+    assert (day.count, day.temperature_max, day.humidity_min) == (4, 30.0, 40.0)
+
+
+@pytest.mark.django_db
+def test_rebuild_rollups_matches_incremental(client, sensor, auth_token):
+    post_batch(
+        client,
+        sensor,
+        auth_token,
+        [
+            ("2024-01-15T10:00:10Z", 20.0, 50.0),
+            ("2024-01-15T23:59:00Z", 24.0, 50.0),
+            ("2024-01-16T00:00:00Z", 30.0, 50.0),
+        ],
+    )
+    post_batch(
+        client,
+        sensor,
+        auth_token,
+        [("2024-01-15T10:00:10Z", 26.0, 55.0)],
+        on_conflict="update",
+    )
+    incremental = rollup_rows(sensor)
+
+    ReadingRollup.objects.all().delete()
+    call_command("rebuild_rollups", sensor=[sensor.id], stdout=io.StringIO())
+
+    assert rollup_rows(sensor) == incremental
+    assert (
+        ReadingRollup.objects.get(
+            sensor=sensor,
+            resolution=ReadingRollup.MINUTE,
+            bucket_start="2024-01-15T10:00:00Z",
+        ).temperature_sum
+        == 26.0
+    )
+
+
+@pytest.mark.django_db
+def test_migration_backfills_rollups(client, sensor, auth_token):
+    backfill = importlib.import_module(
+        "apps.readings.migrations.0002_readingrollup"
+    ).backfill_rollups
+    post_batch(
+        client,
+        sensor,
+        auth_token,
+        [
+            ("2024-01-15T10:00:10Z", 20.0, 50.0),
+            ("2024-01-15T10:00:40Z", 22.0, 52.0),
+            ("2024-01-15T23:59:00Z", 24.0, 50.0),
+            ("2024-01-16T00:00:00Z", 30.0, 50.0),
+        ],
+    )
+    incremental = rollup_rows(sensor)
+
+    ReadingRollup.objects.all().delete()
+    backfill(apps, SimpleNamespace(connection=connection))
+
+    assert rollup_rows(sensor) == incremental
+
+
+@pytest.mark.django_db
+def test_aggregate_combines_rollups_with_raw_edges(client, sensor, auth_token):
+    post_batch(
+        client,
+        sensor,
+        auth_token,
+        [
+            ("2024-01-15T09:59:00Z", 10.0, 50.0),
+            ("2024-01-15T10:10:00Z", 20.0, 50.0),
+            ("2024-01-15T11:30:00Z", 30.0, 50.0),
+            ("2024-01-15T12:30:00Z", 40.0, 50.0),
+        ],
+    )
+    # Rows written behind the API's back are only visible to the raw edges
+    Reading.objects.filter(timestamp="2024-01-15T11:30:00Z").update(temperature=99.0)
+
+    response = client.get(
+        f"/sensors/{sensor.id}/readings/aggregate/?bucket=2h&agg=max,count"
+        "&timestamp_from=2024-01-15T10:05:00Z&timestamp_to=2024-01-15T12:00:00Z",
+        headers={"Authorization": f"Bearer {auth_token}"},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {
+            "bucket": "2024-01-15T10:00:00Z",
+            "count": 2,
+            "temperature_max": 30.0,
+            "humidity_max": 50.0,
+        }
+    ]
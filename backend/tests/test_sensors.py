@@ -19,6 +19,30 @@ def test_create_sensor(client, auth_user, auth_token):
 
     assert response.status_code == 201
     assert response.json()["name"] == "Test Sensor"
+    assert response.json()["retention_days"] is None
+
+
+@pytest.mark.django_db
+def test_sensor_retention_days(client, auth_user, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = client.post(
+        "/sensors/",
+        json={"name": "Archive", "model": "TestModel", "retention_days": 365},
+        headers=headers,
+    )
+    assert response.status_code == 201
+    sensor_id = response.json()["id"]
+
+    response = client.put(
+        f"/sensors/{sensor_id}/", json={"retention_days": 0}, headers=headers
+    )
+    assert response.status_code == 422
+
+    response = client.put(
+        f"/sensors/{sensor_id}/", json={"retention_days": None}, headers=headers
+    )
+    assert response.json()["retention_days"] is None
+    assert Sensor.objects.get(id=sensor_id).retention_days is None
 
 
 @pytest.mark.django_db
@@ -34,6 +58,24 @@ def test_list_sensors(client, auth_user, auth_token):
     assert len(response.json()["items"]) == 2
 
 
+@pytest.mark.django_db
+def test_list_sensors_cursor_pagination(client, auth_user, auth_token):
+    for index in range(3):
+        Sensor.objects.create(owner=auth_user, name=f"Sensor{index}", model="Model")
+
+    first = client.get(
+        "/sensors/?limit=2", headers={"Authorization": f"Bearer {auth_token}"}
+    ).json()
+    second = client.get(
+        f"/sensors/?limit=2&cursor={first['next']}",
+        headers={"Authorization": f"Bearer {auth_token}"},
+    ).json()
+
+    assert [s["name"] for s in first["items"]] == ["Sensor2", "Sensor1"]
+    assert [s["name"] for s in second["items"]] == ["Sensor0"]
+    assert second["next"] is None
+
+
 @pytest.mark.django_db
 def test_search_sensors(client, auth_user, auth_token):
     Sensor.objects.create(owner=auth_user, name="device-001", model="EnviroSense")
@@ -63,3 +105,29 @@ def test_delete_sensor(client, auth_user, auth_token):
 def test_unauthorized_access(client):
     response = client.get("/sensors/")
     assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_search_sensors_ranks_matches(client, auth_user, auth_token):
+    for name, model in [
+        ("Basement humidity", "HYG-THERMO"),
+        ("Thermo", "DHT22"),
+        ("Greenhouse", "Thermostat X"),
+        ("Thermometer attic", "DHT22"),
+        ("Garage", "DHT11"),
+    ]:
+        Sensor.objects.create(owner=auth_user, name=name, model=model)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    response = client.get("/sensors/search/?q=thermo", headers=headers)
+    assert response.status_code == 200
+    assert [sensor["name"] for sensor in response.json()] == [
+        "Thermo",
+        "Thermometer attic",
+        "Greenhouse",
+        "Basement humidity",
+    ]
+
+    response = client.get("/sensors/search/?q=thermo&limit=1", headers=headers)
+    assert [sensor["name"] for sensor in response.json()] == ["Thermo"]
+    assert client.get("/sensors/search/?q=", headers=headers).status_code == 422
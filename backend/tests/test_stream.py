@@ -0,0 +1,169 @@
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from apps.readings import stream
+from apps.readings.stream import Hub, aiter_events, iter_events
+from apps.sensors.models import Sensor
+
+
+@pytest.fixture
+def sensor(auth_user):
+    return Sensor.objects.create(owner=auth_user, name="TestSensor", model="TestModel")
+
+
+def _data(frame):
+    return json.loads(frame.split("data: ", 1)[1])
+
+
+def test_subscription_drops_oldest_when_full():
+    hub = Hub(maxsize=3)
+    subscription = hub.subscribe(1)
+    other = hub.subscribe(2)
+
+    hub.publish(1, [{"n": n} for n in range(5)])
+
+    assert subscription.drain() == [{"n": 2}, {"n": 3}, {"n": 4}]
+    assert subscription.dropped == 2
+    assert other.drain() == []
+    subscription.close()
+    other.close()
+    assert hub.stats() == {"sensors": 0, "subscribers": 0, "dropped": 0}
+
+
+@pytest.mark.django_db
+def test_stream_receives_committed_readings(
+    client, sensor, auth_token, django_capture_on_commit_callbacks
+):
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    events = iter_events(sensor.id, heartbeat=0.01)
+    assert next(events) == ": connected\n\n"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post(
+            f"/sensors/{sensor.id}/readings/",
+            json={
+                "temperature": 21.5,
+                "humidity": 40.0,
+                "timestamp": "2024-01-15T10:00:00Z",
+            },
+            headers=headers,
+        )
+        client.post(
+            f"/sensors/{sensor.id}/readings/batch/",
+            json=[
+                {
+                    "temperature": 22.0,
+                    "humidity": 41.0,
+                    "timestamp": "2024-01-15T10:01:00Z",
+                }
+            ],
+            headers=headers,
+        )
+
+    frame = next(events)
+    assert frame.startswith("event: readings\n")
+    assert [m["temperature"] for m in _data(frame)] == [21.5, 22.0]
+    assert _data(frame)[0]["timestamp"] == "2024-01-15T10:00:00Z"
+    assert next(events) == ": heartbeat\n\n"
+
+    events.close()
+    assert not stream.hub.has_subscribers(sensor.id)
+
+
+@pytest.mark.django_db
+def test_readings_are_not_published_without_subscribers(
+    client, sensor, auth_token, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks() as callbacks:
+        client.post(
+            f"/sensors/{sensor.id}/readings/",
+            json={
+                "temperature": 21.5,
+                "humidity": 40.0,
+                "timestamp": "2024-01-15T10:00:00Z",
+            },
+            headers={"Authorization": f"Bearer {auth_token}"},
+        )
+    assert callbacks == []
+
+
+def test_async_stream_reports_dropped_messages():
+    async def collect():
+        events = aiter_events(99, heartbeat=0.01)
+        frames = [await events.__anext__()]
+        stream.hub.publish(99, [{"n": n} for n in range(stream.hub.maxsize + 1)])
+        frames += [await events.__anext__(), await events.__anext__()]
+        await events.aclose()
+        return frames
+
+    frames = async_to_sync(collect)()
+
+    assert frames[1].startswith("event: dropped\n")
+    assert _data(frames[1]) == {"count": 1}
+    assert frames[2].startswith("event: readings\n")
+    assert not stream.hub.has_subscribers(99)
+
+
+@pytest.mark.django_db
+def test_stream_requires_owned_sensor(client, auth_user, auth_token):
+    other = Sensor.objects.create(
+        owner=type(auth_user).objects.create_user(
+            email="other@example.com", username="other", password="pass"
+        ),
+        name="Other",
+        model="M",
+    )
+
+    assert client.get(f"/sensors/{other.id}/readings/stream/").status_code == 401
+    assert (
+        client.get(f"/sensors/{other.id}/readings/stream/?token=bad").status_code == 401
+    )
+    response = client.get(f"/sensors/{other.id}/readings/stream/?token={auth_token}")
+    assert response.status_code == 404
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="Needs NOTIFY")
+@pytest.mark.django_db
+def test_postgres_backend_notifies_only_watched_sensors(
+    client, sensor, auth_token, settings, monkeypatch
+):
+    settings.READINGS_STREAM_BACKEND = "postgres"
+    monkeypatch.setattr(stream, "ensure_listener", lambda: None)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+
+    def notifies(minute):
+        with CaptureQueriesContext(connection) as queries:
+            client.post(
+                f"/sensors/{sensor.id}/readings/",
+                json={
+                    "temperature": 21.5,
+                    "humidity": 40.0,
+                    "timestamp": f"2024-01-15T10:0{minute}:00Z",
+                },
+                headers=headers,
+            )
+        return sum("pg_notify" in query["sql"] for query in queries)
+
+    assert notifies(0) == 0
+    events = iter_events(sensor.id, heartbeat=0.01)
+    next(events)
+    assert notifies(1) == 1
+    events.close()
+    assert notifies(2) == 0
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="Needs advisory locks")
+@pytest.mark.django_db
+def test_watches_cover_bigint_sensor_ids():
+    watches = stream.Watches()
+    large = 2**40 + 7
+    watches.add(large)
+    watches.add(7)
+    assert stream._watched([7, large, 2**31 + 7]) == {7, large}
+
+    watches.discard(large)
+    assert stream._watched([7, large]) == {7}
+    watches.discard(7)
+    assert stream._watched([7]) == set()
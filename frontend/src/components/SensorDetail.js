@@ -34,15 +34,26 @@ function SensorDetail({ token }) {
   const fetchReadings = async () => {
     setLoading(true);
     try {
-      const params = {};
+      const params = { layout: 'columnar', max_points: 2000 };
       if (dateRange.from) params.timestamp_from = dateRange.from;
       if (dateRange.to) params.timestamp_to = dateRange.to;
 
-      const response = await axios.get(`${API_URL}/api/sensors/${id}/readings/`, {
-        headers: { Authorization: `Bearer ${token}` },
-        params
-      });
-      setReadings(response.data);
+      let items = [];
+      let cursor;
+      do {
+        const response = await axios.get(`${API_URL}/api/sensors/${id}/readings/`, {
+          headers: { Authorization: `Bearer ${token}` },
+          params: { ...params, cursor }
+        });
+        const { timestamp, temperature, humidity } = response.data;
+        items = items.concat(timestamp.map((ms, i) => ({
+          timestamp: ms,
+          temperature: temperature[i],
+          humidity: humidity[i]
+        })));
+        cursor = response.data.next;
+      } while (cursor);
+      setReadings(items);
     } catch (err) {
       setError('Failed to load readings');
     } finally {
@@ -55,6 +66,27 @@ function SensorDetail({ token }) {
     fetchReadings();
   }, [id, dateRange]);
 
+  useEffect(() => {
+    // Live updates only make sense for an open-ended range
+    if (dateRange.to) return undefined;
+    const source = new EventSource(
+      `${API_URL}/api/sensors/${id}/readings/stream/?token=${encodeURIComponent(token)}`
+    );
+    source.addEventListener('readings', (event) => {
+      const incoming = JSON.parse(event.data).map(r => ({
+        timestamp: Date.parse(r.timestamp),
+        temperature: r.temperature,
+        humidity: r.humidity
+      }));
+      const seen = new Set(incoming.map(r => r.timestamp));
+      setReadings(current => [...current.filter(r => !seen.has(r.timestamp)), ...incoming]
+        .sort((a, b) => b.timestamp - a.timestamp));
+    });
+    // The server dropped messages for this client; reload the range instead
+    source.addEventListener('dropped', () => fetchReadings());
+    return () => source.close();
+  }, [id, dateRange, token]);
+
   const handleCreateReading = async (e) => {
     e.preventDefault();
     try {
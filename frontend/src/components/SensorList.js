@@ -12,18 +12,19 @@ function SensorList({ token }) {
   const [search, setSearch] = useState('');
   const [showModal, setShowModal] = useState(false);
   const [newSensor, setNewSensor] = useState({ name: '', model: '', description: '' });
-  const [page, setPage] = useState(1);
-  const [totalPages, setTotalPages] = useState(1);
+  const [page, setPage] = useState(0);
+  const [cursors, setCursors] = useState([null]);
+  const [nextCursor, setNextCursor] = useState(null);
 
   const fetchSensors = async () => {
     setLoading(true);
     try {
-      const response = await axios.get(`${API_URL}/api/sensors/`, {
+      const response = await axios.get(`${API_URL}/api/sensors/overview/`, {
         headers: { Authorization: `Bearer ${token}` },
-        params: { page, q: search }
+        params: { cursor: cursors[page] || undefined, q: search }
       });
       setSensors(response.data.items);
-      setTotalPages(Math.ceil(response.data.count / 10));
+      setNextCursor(response.data.next);
     } catch (err) {
       setError('Failed to load sensors');
     } finally {
@@ -80,7 +81,11 @@ function SensorList({ token }) {
           type="text"
           placeholder="Search sensors"
           value={search}
-          onChange={(e) => setSearch(e.target.value)}
+          onChange={(e) => {
+            setSearch(e.target.value);
+            setPage(0);
+            setCursors([null]);
+          }}
         />
       </div>
 
@@ -90,6 +95,18 @@ function SensorList({ token }) {
             <h3>{sensor.name}</h3>
             <p className="model">{sensor.model}</p>
             {sensor.description && <p className="description">{sensor.description}</p>}
+            {sensor.latest && (
+              <p className="latest">
+                {sensor.latest.temperature.toFixed(1)}°C · {sensor.latest.humidity.toFixed(1)}%
+                <span> at {new Date(sensor.latest.timestamp).toLocaleString()}</span>
+              </p>
+            )}
+            {sensor.window && (
+              <p className="window">
+                24h: {sensor.window.temperature_min.toFixed(1)} to{' '}
+                {sensor.window.temperature_max.toFixed(1)}°C
+              </p>
+            )}
             <div className="card-actions">
               <Link to={`/sensors/${sensor.id}`} className="btn btn-primary">View</Link>
               <button className="btn btn-danger" onClick={() => handleDelete(sensor.id)}>Delete</button>
@@ -104,20 +121,23 @@ function SensorList({ token }) {
         </div>
       )}
 
-      {totalPages > 1 && (
+      {(page > 0 || nextCursor) && (
         <div className="pagination">
           <button 
             className="btn btn-primary" 
-            onClick={() => setPage(p => Math.max(1, p - 1))}
-            disabled={page === 1}
+            onClick={() => setPage(p => Math.max(0, p - 1))}
+            disabled={page === 0}
           >
             Previous
           </button>
-          <span>Page {page} of {totalPages}</span>
+          <span>Page {page + 1}</span>
           <button 
             className="btn btn-primary" 
-            onClick={() => setPage(p => Math.min(totalPages, p + 1))}
-            disabled={page === totalPages}
+            onClick={() => {
+              setCursors(c => [...c.slice(0, page + 1), nextCursor]);
+              setPage(p => p + 1);
+            }}
+            disabled={!nextCursor}
           >
             Next
           </button>